@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import CustomUser
+from .models import CustomUser, RevokedToken
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -61,3 +61,10 @@ class CustomUserAdmin(UserAdmin):
             elif db_field.name == "branch":
                 kwargs["queryset"] = request.user.company.branches.all()
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'user', 'revoked_at', 'expires_at')
+    search_fields = ('jti',)
+    raw_id_fields = ('user',)
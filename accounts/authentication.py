@@ -0,0 +1,38 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .tokens import (
+    TOKEN_VERSION_CLAIM, TenantTokenUser, current_token_version,
+    has_tenant_claims, stateless_enabled
+)
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    Okuma isteklerinde (GET/HEAD/OPTIONS) kullanıcıyı veritabanından yüklemeden
+    token claim'lerinden kurar. Rol, şirket veya şube değiştiğinde kullanıcının
+    token_version değeri artar ve eski access token'lar reddedilir.
+    Yazma isteklerinde tam CustomUser yüklenir.
+    """
+    stateless = False
+
+    def authenticate(self, request):
+        self.stateless = request.method in SAFE_METHODS and stateless_enabled()
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.stateless and has_tenant_claims(validated_token):
+            user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+            if user_id is None:
+                raise InvalidToken(_("Token contained no recognizable user identification"))
+            if current_token_version(user_id) != validated_token[TOKEN_VERSION_CLAIM]:
+                raise InvalidToken("Token sürümü güncel değil, lütfen token'ı yenileyin.")
+            return TenantTokenUser(validated_token)
+
+        user = super().get_user(validated_token)
+        version = validated_token.get(TOKEN_VERSION_CLAIM)
+        if version is not None and version != user.token_version:
+            raise InvalidToken("Token sürümü güncel değil, lütfen token'ı yenileyin.")
+        return user
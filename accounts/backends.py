@@ -1,15 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models.functions import Lower
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def password_hash_pool():
+    """ASGI altında PBKDF2 doğrulamasının çalıştığı sınırlı thread havuzu."""
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'LOGIN_HASH_WORKERS', 4),
+                    thread_name_prefix='password-hash'
+                )
+    return _hash_pool
+
 
 class EmailBackend(ModelBackend):
-    def authenticate(self, request, username=None, password=None, **kwargs):
+    """
+    E-posta (büyük/küçük harf duyarsız) veya kullanıcı adıyla giriş.
+    E-posta araması LOWER(email) üzerindeki tekil indeksi kullanan tek bir sorgudur;
+    '@' içeren girdi e-postayla eşleşmezse kullanıcı adı olarak da denenir.
+    """
+
+    def get_login_queryset(self, username):
         UserModel = get_user_model()
-        try:
-            user = UserModel.objects.get(Q(email=username) | Q(username=username))
-        except UserModel.DoesNotExist:
+        if '@' in username:
+            return UserModel._default_manager.alias(email_lower=Lower('email')).filter(
+                email_lower=username.lower()
+            )
+        return self.get_username_queryset(username)
+
+    def get_username_queryset(self, username):
+        UserModel = get_user_model()
+        return UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: username})
+
+    def get_login_user(self, username):
+        user = self.get_login_queryset(username).first()
+        if user is None and '@' in username:
+            # Kullanıcı adı '@' içerebilir (ör. e-postadan farklı eski bir adres); e-posta eşleşmezse ona bakılır
+            user = self.get_username_queryset(username).first()
+        return user
+
+    async def aget_login_user(self, username):
+        user = await self.get_login_queryset(username).afirst()
+        if user is None and '@' in username:
+            user = await self.get_username_queryset(username).afirst()
+        return user
+
+    def _credentials(self, username, kwargs):
+        if username is None:
+            username = kwargs.get(get_user_model().USERNAME_FIELD)
+        return username
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = self._credentials(username, kwargs)
+        if username is None or password is None:
+            return None
+
+        user = self.get_login_user(username)
+        if user is None:
+            # Kullanıcı yokken de hash çalıştırılır; yanıt süresinden kullanıcı varlığı anlaşılmasın
+            get_user_model()().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        username = self._credentials(username, kwargs)
+        if username is None or password is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        user = await self.aget_login_user(username)
+        if user is None:
+            await loop.run_in_executor(password_hash_pool(), get_user_model()().set_password, password)
             return None
 
-        if user.check_password(password):
+        # Olay döngüsü PBKDF2 süresince bloklanmaz; eşzamanlı doğrulama sayısı havuzla sınırlıdır
+        valid = await loop.run_in_executor(password_hash_pool(), user.check_password, password)
+        if valid and self.user_can_authenticate(user):
             return user
-        return None 
\ No newline at end of file
+        return None
@@ -0,0 +1,140 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone as django_timezone
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _config():
+    return {
+        'CAPACITY': 1_000_000,
+        'ERROR_RATE': 0.001,
+        'SYNC_INTERVAL': 5,
+        'SYNC_OVERLAP': 5,
+        'REBUILD_INTERVAL': 3600,
+        **getattr(settings, 'REFRESH_BLACKLIST', {}),
+    }
+
+
+class BloomFilter:
+    """
+    Sabit boyutlu bit dizisi. "Yok" cevabı kesindir, "var" cevabı ERROR_RATE olasılıkla yanlış olabilir.
+    1 milyon kayıt ve %0,1 hata oranı yaklaşık 1,8 MB tutar.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RefreshTokenBlacklist:
+    """
+    İptal edilen refresh token'ların süreç içi görünümü.
+
+    Filtre ilk kullanımda süresi dolmamış kayıtlardan kurulur, SYNC_INTERVAL saniyede bir
+    sadece son senkrondan beri eklenen satırlar (revoked_at indeksi) okunur. Aradaki pencerede
+    başka süreçte döndürülen bir token revoke() içindeki tekil jti indeksine takılır. Filtre "yok" derse
+    tablo sorgulanmaz; "var" derse jti üzerindeki tekil indeksle doğrulanır. Filtreden kayıt
+    silinemediği için REBUILD_INTERVAL dolduğunda veya kapasite aşıldığında yeniden kurulur.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._built_at = 0
+        self._synced_at = 0
+        self._sync_marker = None
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+    def _rebuild(self, config):
+        from .models import RevokedToken
+
+        started = django_timezone.now()
+        active = RevokedToken.objects.filter(expires_at__gt=started)
+        bloom = BloomFilter(max(config['CAPACITY'], active.count() * 2), config['ERROR_RATE'])
+        for jti in active.values_list('jti', flat=True).iterator(chunk_size=10000):
+            bloom.add(jti)
+        self._filter = bloom
+        self._built_at = self._synced_at = time.monotonic()
+        self._sync_marker = started
+
+    def _sync(self, config):
+        from .models import RevokedToken
+
+        # Eşzamanlı işlemler revoked_at sırasıyla commit edilmeyebilir; pencere biraz geriden başlar
+        started = django_timezone.now()
+        since = self._sync_marker - timedelta(seconds=config['SYNC_OVERLAP'])
+        for jti in RevokedToken.objects.filter(revoked_at__gte=since).values_list('jti', flat=True):
+            self._filter.add(jti)
+        self._synced_at = time.monotonic()
+        self._sync_marker = started
+
+    def _current_filter(self):
+        config = _config()
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._filter is None
+                or now - self._built_at >= config['REBUILD_INTERVAL']
+                or self._filter.count > self._filter.capacity
+            ):
+                self._rebuild(config)
+            elif now - self._synced_at >= config['SYNC_INTERVAL']:
+                self._sync(config)
+            return self._filter
+
+    def is_revoked(self, jti):
+        from .models import RevokedToken
+
+        if jti not in self._current_filter():
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, token):
+        """
+        Token'ı iptal eder. Token daha önce iptal edilmişse False döner; tekil jti indeksi
+        aynı refresh token'ın eşzamanlı iki istekle döndürülmesini de engeller.
+        """
+        from .models import RevokedToken
+
+        jti = token[api_settings.JTI_CLAIM]
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti,
+                    user_id=token.payload.get(api_settings.USER_ID_CLAIM),
+                    expires_at=datetime.fromtimestamp(token['exp'], tz=timezone.utc),
+                )
+        except IntegrityError:
+            return False
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        return True
+
+
+refresh_blacklist = RefreshTokenBlacklist()
@@ -0,0 +1,11 @@
+import os
+
+# Şifre hash havuzunun (accounts.provisioning) işçi süreçlerinde çalışan başlatıcı.
+# 'spawn' ile başlayan süreç bu modülü Django kurulmadan içe aktarır; bu yüzden burada
+# model veya uygulama içe aktarması bulunmamalı.
+
+
+def init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
@@ -0,0 +1,44 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from companies.models import Branch, Company
+from accounts.provisioning import parse_rows, provision_users
+
+
+class Command(BaseCommand):
+    help = "CSV veya JSON dosyasındaki kullanıcıları bir şirket/şubeye toplu olarak ekler."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Başlık satırlı CSV veya JSON listesi")
+        parser.add_argument('--company', type=int, required=True)
+        parser.add_argument('--branch', type=int)
+        parser.add_argument('--workers', type=int, help="Hash süreç sayısı (varsayılan: PROVISIONING_HASH_WORKERS)")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--dry-run', action='store_true', help="Sadece doğrular, kayıt oluşturmaz.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        company = Company.objects.select_related('current_plan').filter(pk=options['company']).first()
+        if company is None:
+            raise CommandError("Şirket bulunamadı")
+        branch = None
+        if options['branch']:
+            branch = Branch.objects.filter(pk=options['branch'], company=company).first()
+            if branch is None:
+                raise CommandError("Şube bu şirkete ait değil")
+
+        try:
+            rows = parse_rows(path.read_bytes(), path.name)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Dosya okunamadı: {error}")
+
+        report = provision_users(
+            rows, company, branch, dry_run=options['dry_run'],
+            workers=options['workers'], batch_size=options['batch_size']
+        )
+        for error in report['errors']:
+            self.stderr.write(f"satır {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} kullanıcı oluşturuldu, {report['valid']} geçerli, {len(report['errors'])} hatalı satır"
+            + (" (dry-run)" if options['dry_run'] else "")
+        ))
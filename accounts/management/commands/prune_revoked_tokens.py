@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Süresi dolmuş iptal kayıtlarını küçük partiler halinde siler; her parti ayrı ve kısa bir işlemdir."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--sleep', type=float, default=0, help="Partiler arası bekleme (saniye)")
+        parser.add_argument('--dry-run', action='store_true', help="Sadece silinecek kayıt sayısını yazar.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now()
+        expired = RevokedToken.objects.filter(expires_at__lte=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} kayıt silinecek (dry-run)")
+            return
+
+        deleted = 0
+        while True:
+            # expires_at indeksinden sınırlı sayıda pk alınır; DELETE sadece bu satırları kilitler
+            batch = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            deleted += RevokedToken.objects.filter(pk__in=batch).delete()[0]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"{deleted} süresi dolmuş token kaydı silindi"))
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:31
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_duplicates(apps, schema_editor):
+    """Yalnızca büyük/küçük harfle ayrışan e-postalar varsa tekil kısıt eklenemez; önce elle çözülmeli."""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    duplicates = list(
+        CustomUser.objects.using(schema_editor.connection.alias).exclude(email='')
+        .values(email_lower=Lower('email')).annotate(count=Count('pk')).filter(count__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Büyük/küçük harf dışında aynı olan e-posta adresleri var; "
+            "accounts_user_email_ci_unique eklenmeden önce bu kullanıcıların e-postaları düzeltilmeli: "
+            + ", ".join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_token_version'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('companies', '0003_alter_company_tax_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='accounts_user_email_ci_unique'),
+        ),
+    ]
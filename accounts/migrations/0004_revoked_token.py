@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True, verbose_name='Token Kimliği')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Son Geçerlilik')),
+                ('revoked_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='İptal Tarihi')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revoked_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Kullanıcı')),
+            ],
+            options={
+                'verbose_name': 'İptal Edilen Token',
+                'verbose_name_plural': "İptal Edilen Token'lar",
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:38
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_revoked_token'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('companies', '0003_alter_company_tax_number'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['company', 'id'], name='accounts_user_company_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['company', 'role', 'id'], name='accounts_user_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['company', 'is_active', 'id'], name='accounts_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['branch', 'id'], name='accounts_user_branch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='accounts_user_first_ci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), name='accounts_user_last_ci_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='photo_storage_bytes',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Fotoğraf Depolama (bayt)'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Fotoğraf Boyutları'),
+        ),
+    ]
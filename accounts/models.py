@@ -1,7 +1,11 @@
-from django.db import models
+from functools import partial
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from companies.models import Company, Branch
+from .tokens import store_token_version
 
 class CustomUser(AbstractUser):
     GENDER_CHOICES = (
@@ -66,10 +70,111 @@ class CustomUser(AbstractUser):
         _('Şube Yöneticisi mi?'),
         default=False
     )
+    token_version = models.PositiveIntegerField(
+        _('Token Sürümü'),
+        default=0,
+        editable=False
+    )
+    # {boyut: {biçim: yol}}; fotoğraf yüklendikten sonra arka planda doldurulur (accounts.photos)
+    photo_variants = models.JSONField(
+        _('Fotoğraf Boyutları'),
+        default=dict,
+        blank=True,
+        editable=False
+    )
+    photo_storage_bytes = models.PositiveBigIntegerField(
+        _('Fotoğraf Depolama (bayt)'),
+        default=0,
+        editable=False
+    )
+
+    # Access token'a gömülen alanlar; biri değişince token_version artar
+    TOKEN_CLAIM_FIELDS = (
+        'role', 'is_company_admin', 'is_branch_admin', 'company_id', 'branch_id',
+        'is_active', 'is_superuser', 'is_staff'
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = instance._claim_state()
+        # photo ertelenmişse yüklenen değer bilinmez (None); o durumda variant'a dokunulmaz
+        instance._loaded_photo = (instance.__dict__['photo'] or '') if 'photo' in instance.__dict__ else None
+        return instance
+
+    def _claim_state(self):
+        return tuple(self.__dict__.get(field) for field in self.TOKEN_CLAIM_FIELDS)
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_claims', None)
+        claims_changed = loaded is not None and loaded != self._claim_state()
+        if claims_changed:
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+
+        super().save(*args, **kwargs)
+
+        self._loaded_claims = self._claim_state()
+        if claims_changed:
+            store_token_version(self.pk, self.token_version)
+
+        # Dosya adı kayıt sırasında kesinleşir; değiştiyse variant'lar commit sonrası üretilir
+        loaded_photo = getattr(self, '_loaded_photo', '')
+        update_fields = kwargs.get('update_fields')
+        if loaded_photo is not None and (update_fields is None or 'photo' in update_fields):
+            photo = self.photo.name or ''
+            if photo != loaded_photo:
+                from .photos import schedule_photo_variants
+                transaction.on_commit(partial(schedule_photo_variants, self.pk, photo, loaded_photo))
+            self._loaded_photo = photo
 
     class Meta:
         verbose_name = _('Kullanıcı')
         verbose_name_plural = _('Kullanıcılar')
+        constraints = [
+            # Girişte LOWER(email) ile tek indeksli arama yapılır; boş e-postalar hariç
+            models.UniqueConstraint(
+                Lower('email'),
+                condition=~Q(email=''),
+                name='accounts_user_email_ci_unique',
+            ),
+        ]
+        indexes = [
+            # Kullanıcı rehberi: tenant filtresi + id sırasıyla keyset sayfalama
+            models.Index(fields=['company', 'id'], name='accounts_user_company_idx'),
+            models.Index(fields=['company', 'role', 'id'], name='accounts_user_role_idx'),
+            models.Index(fields=['company', 'is_active', 'id'], name='accounts_user_active_idx'),
+            models.Index(fields=['branch', 'id'], name='accounts_user_branch_idx'),
+            # Ad/soyad önek araması LOWER() aralığı olarak yapılır
+            models.Index(Lower('first_name'), name='accounts_user_first_ci_idx'),
+            models.Index(Lower('last_name'), name='accounts_user_last_ci_idx'),
+        ]
         
     def __str__(self):
-        return f"{self.get_full_name()} - {self.get_role_display()}"
\ No newline at end of file
+        return f"{self.get_full_name()} - {self.get_role_display()}"
+
+class RevokedToken(models.Model):
+    """
+    Rotasyonla veya elle iptal edilen refresh token'lar.
+    Sadece süresi dolmamış kayıtlar anlamlıdır; süresi dolanlar prune_revoked_tokens ile silinir.
+    """
+    jti = models.CharField(_('Token Kimliği'), max_length=255, unique=True)
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='revoked_tokens',
+        null=True,
+        blank=True,
+        verbose_name=_('Kullanıcı')
+    )
+    expires_at = models.DateTimeField(_('Son Geçerlilik'), db_index=True)
+    revoked_at = models.DateTimeField(_('İptal Tarihi'), auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = _('İptal Edilen Token')
+        verbose_name_plural = _('İptal Edilen Token\'lar')
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,54 @@
+import posixpath
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from core.images import delete_files, render_variants, store_variants, submit, variant_paths
+from .profiles import profile_snapshots
+
+
+def process_user_photo(user_id, name, previous_name=''):
+    """
+    Profil fotoğrafının variant'larını üretir, kullanıcıya yazar ve şirketin storage_usage
+    değerini orijinal + variant byte farkı kadar günceller. Eski dosyalar silinir.
+    photo_variants ve photo_storage_bytes yalnızca bu iş tarafından yazılır; kullanıcıyı
+    güncelleyen yollar update_fields ile kaydeder ki bellekteki eski değerler bunları ezmesin.
+    """
+    from companies.models import Company
+    from .models import CustomUser
+
+    variants, total = {}, 0
+    if name:
+        with default_storage.open(name) as source:
+            rendered = render_variants(source)
+        # Variant'lar kullanıcıya özel dizindedir; eski dosyalar silinirken başka kullanıcının aynı içerikli dosyasına dokunulmaz
+        # `variants/` bileşeni üretim medya sunucusunun Cache-Control kuralıyla eşleşir (IMAGE_VARIANTS ayarı)
+        directory = posixpath.join(posixpath.dirname(name), 'variants', str(user_id))
+        variants, variant_bytes = store_variants(rendered, directory)
+        total = default_storage.size(name) + variant_bytes
+
+    current = Q(photo=name) if name else Q(photo='') | Q(photo__isnull=True)
+    with transaction.atomic():
+        row = CustomUser.objects.select_for_update().filter(current, pk=user_id).values(
+            'company_id', 'photo_variants', 'photo_storage_bytes'
+        ).first()
+        if row is None:
+            # Fotoğraf bu iş sırasında tekrar değişti; yeni iş güncel dosyayı işler
+            return
+        CustomUser.objects.filter(pk=user_id).update(photo_variants=variants, photo_storage_bytes=total)
+        delta = total - row['photo_storage_bytes']
+        if row['company_id'] and delta:
+            Company.objects.filter(pk=row['company_id']).update(
+                storage_usage=Greatest(F('storage_usage') + delta, 0)
+            )
+
+    stale = set(variant_paths(row['photo_variants'])) - set(variant_paths(variants))
+    if previous_name and previous_name != name:
+        stale.add(previous_name)
+    delete_files(stale)
+    # update() sinyal tetiklemez; token/verify profil önbelleği elle düşürülür
+    profile_snapshots.on_change('user', user_id)
+
+
+def schedule_photo_variants(user_id, name, previous_name=''):
+    submit(process_user_photo, user_id, name, previous_name)
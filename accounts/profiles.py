@@ -0,0 +1,58 @@
+from django.core.cache import caches
+from django.db import transaction
+from core.cache_versions import bump_version, get_versions
+from .tokens import _config
+
+# Token doğrulamasında dönen profil verisinin önbelleği. Anahtar `profile:<user_id>:<profile_version>`
+# biçimindedir; profile_version kullanıcının, şirketinin ve şubesinin sürümlerinden oluşur.
+# Üçünden biri değişince sürüm artar ve eski anlık görüntüler TIMEOUT ile düşer.
+
+
+class ProfileSnapshotCache:
+
+    @property
+    def cache(self):
+        return caches[_config()['CACHE_ALIAS']]
+
+    @staticmethod
+    def _version_key(kind, pk):
+        return f'profile-version:{kind}:{pk}'
+
+    def profile_version(self, user_id, company_id=None, branch_id=None):
+        parts = [('user', user_id), ('company', company_id), ('branch', branch_id)]
+        keys = [self._version_key(kind, pk) for kind, pk in parts if pk is not None]
+        versions = get_versions(self.cache, keys)
+        return '.'.join(str(versions[key]) for key in keys)
+
+    def invalidate(self, kind, pk):
+        bump_version(self.cache, self._version_key(kind, pk))
+
+    def _load(self, user_id):
+        from .models import CustomUser
+        from .serializers import UserProfileSerializer
+
+        user = CustomUser.objects.select_related('company', 'branch').get(pk=user_id)
+        return user, UserProfileSerializer(user).data
+
+    def get(self, user_id, company_id=None, branch_id=None):
+        """
+        Kullanıcının profil verisi. company_id ve branch_id token claim'lerinden gelir;
+        sıcak önbellekte veritabanına gidilmez. Kullanıcı yoksa CustomUser.DoesNotExist yükselir.
+        """
+        key = f'profile:{user_id}:{self.profile_version(user_id, company_id, branch_id)}'
+        snapshot = self.cache.get(key)
+        if snapshot is None:
+            user, snapshot = self._load(user_id)
+            if (user.company_id, user.branch_id) != (company_id, branch_id):
+                # Claim'ler eski; anahtar güncel şirket/şube sürümleriyle kurulmalı
+                key = f'profile:{user_id}:{self.profile_version(user_id, user.company_id, user.branch_id)}'
+            self.cache.set(key, dict(snapshot), _config()['PROFILE_CACHE_TIMEOUT'])
+        return snapshot
+
+    def on_change(self, kind, pk):
+        self.invalidate(kind, pk)
+        # Commit'ten önce eski veriyi okuyup yazan istekler olabilir; commit sonrası tekrar düşür
+        transaction.on_commit(lambda: self.invalidate(kind, pk))
+
+
+profile_snapshots = ProfileSnapshotCache()
@@ -0,0 +1,233 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+from companies.models import Company
+from companies.stats import record_created
+from .hash_worker import init_worker
+from .models import CustomUser
+
+# Toplu kullanıcı oluşturma (accounts/users/bulk/ ve provision_users komutu).
+# Satırlar bellekte doğrulanır, benzersizlik partiler halinde tek sorguyla kontrol edilir,
+# PBKDF2 hash'leri süreç havuzunda hesaplanır ve kayıtlar bulk_create ile eklenir.
+
+# Bu sayının altındaki şifreler havuz kurmaya değmez, aynı süreçte hash'lenir
+POOL_THRESHOLD = 16
+
+
+class ProvisionRowSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    username = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    password = serializers.CharField(write_only=True)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+    gender = serializers.ChoiceField(choices=CustomUser.GENDER_CHOICES, required=False, allow_blank=True)
+    role = serializers.ChoiceField(choices=('branch_admin', 'employee'), required=False, default='employee')
+
+    def validate(self, attrs):
+        attrs['email'] = attrs['email'].strip()
+        attrs['username'] = (attrs.get('username') or attrs['email']).strip()
+        validate_password(attrs['password'], CustomUser(
+            username=attrs['username'], email=attrs['email'],
+            first_name=attrs['first_name'], last_name=attrs['last_name'],
+        ))
+        return attrs
+
+
+def parse_rows(content, filename=''):
+    """CSV (başlık satırlı) veya JSON listesi; sözlük listesi döner."""
+    if isinstance(content, list):
+        return content
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if filename.endswith('.json') or content.lstrip().startswith('['):
+        rows = json.loads(content)
+        if not isinstance(rows, list):
+            raise ValueError("JSON içeriği liste olmalı")
+        return rows
+    try:
+        return [
+            {key.strip(): (value or '').strip() for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(content))
+        ]
+    except csv.Error as error:
+        # Ör. NUL baytı veya sınırı aşan alan; çağıranlar okuma hatalarını ValueError olarak raporlar
+        raise ValueError(f"CSV hatası: {error}") from error
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _hash_pool(workers):
+    """
+    Süreç başına bir kez kurulan havuz. 'spawn' bağlamı kullanılır: çok iş parçacıklı web
+    sürecinden fork edilen çocuklar başka iş parçacığının tuttuğu kilitlerle kilitlenebilir,
+    ayrıca her istekte havuz kurmanın başlatma maliyeti tekrarlanmaz.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'),),
+            )
+        return pool
+
+
+def hash_passwords(passwords, workers=None):
+    """Şifreleri sırayı koruyarak hash'ler; PBKDF2 CPU'ya bağlı olduğu için süreç havuzu kullanılır."""
+    workers = workers if workers is not None else settings.PROVISIONING_HASH_WORKERS
+    if workers <= 1 or len(passwords) < POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+    pool = _hash_pool(workers)
+    try:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+    except BrokenProcessPool:
+        # Çöken işçi havuzu kullanılamaz hale getirir; sonraki çağrı yenisini kurar
+        with _pools_lock:
+            if _pools.get(workers) is pool:
+                del _pools[workers]
+        raise
+
+
+def _taken(field, values):
+    if field == 'email':
+        return set(CustomUser.objects.annotate(email_lower=Lower('email')).filter(
+            email_lower__in=values
+        ).values_list('email_lower', flat=True))
+    return set(CustomUser.objects.filter(username__in=values).values_list('username', flat=True))
+
+
+def provision_users(rows, company, branch=None, dry_run=False, workers=None, batch_size=None):
+    """
+    Satırları doğrular ve geçerli olanları oluşturur.
+    Dönen rapor: {'valid': n, 'created': n, 'errors': [{'row': satır_no, 'errors': {...}}]}; satır numaraları 1'den başlar.
+    """
+    batch_size = batch_size or settings.PROVISIONING_BATCH_SIZE
+    errors = {}
+    valid = []
+    seen = {'email': set(), 'username': set()}
+
+    for start in range(0, len(rows), batch_size):
+        batch = []
+        for index, row in enumerate(rows[start:start + batch_size], start=start + 1):
+            serializer = ProvisionRowSerializer(data=row if isinstance(row, dict) else {})
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            data = serializer.validated_data
+            keys = {'email': data['email'].lower(), 'username': data['username']}
+            duplicate = [field for field, key in keys.items() if key in seen[field]]
+            if duplicate:
+                errors[index] = {field: ["Dosyada tekrar ediyor."] for field in duplicate}
+                continue
+            for field, key in keys.items():
+                seen[field].add(key)
+            batch.append((index, keys, data))
+
+        # Partideki tüm e-posta ve kullanıcı adları iki sorguda kontrol edilir
+        taken = {field: _taken(field, [keys[field] for _, keys, _ in batch]) for field in seen}
+        for index, keys, data in batch:
+            conflicts = [field for field in seen if keys[field] in taken[field]]
+            if conflicts:
+                errors[index] = {field: ["Bu değer zaten kayıtlı."] for field in conflicts}
+            else:
+                valid.append((index, data))
+
+    # Ön kontrol gereksiz hash'lemeyi önler; kesin kontrol kayıttan önce kilit altında yapılır
+    valid = _within_plan(valid, company, errors)
+
+    if dry_run or not valid:
+        return _report(valid, 0, errors)
+
+    hashes = hash_passwords([data['password'] for _, data in valid], workers)
+    users = [
+        (index, CustomUser(
+            username=data['username'], email=data['email'], password=encoded,
+            first_name=data['first_name'], last_name=data['last_name'],
+            phone=data.get('phone') or None, gender=data.get('gender') or None,
+            role=data['role'], is_branch_admin=data['role'] == 'branch_admin',
+            company=company, branch=branch,
+        ))
+        for (index, data), encoded in zip(valid, hashes)
+    ]
+    with transaction.atomic():
+        # Şirket satırı kilitlenir; eşzamanlı içe aktarmalar sayımı sırayla yapar ve limiti birlikte aşamaz
+        Company.objects.select_for_update().filter(pk=company.pk).values_list('pk', flat=True).first()
+        # Hash'leme sırasında başka bir istek aynı e-posta/kullanıcı adını almış olabilir
+        users = _within_plan(_unclaimed(users, errors), company, errors)
+        created = _create(users, errors, batch_size)
+        record_created('user', created)
+    return _report(users, len(created), errors)
+
+
+def _unclaimed(users, errors):
+    taken = {
+        'email': _taken('email', [user.email.lower() for _, user in users]),
+        'username': _taken('username', [user.username for _, user in users]),
+    }
+    free = []
+    for index, user in users:
+        conflicts = [field for field, key in (('email', user.email.lower()), ('username', user.username)) if key in taken[field]]
+        if conflicts:
+            errors[index] = {field: ["Bu değer zaten kayıtlı."] for field in conflicts}
+        else:
+            free.append((index, user))
+    return free
+
+
+def _create(users, errors, batch_size):
+    """
+    Kullanıcıları toplu ekler. Kilit dışındaki bir kayıt (ör. RegisterView) son kontrolden sonra
+    aynı değeri almışsa satırlar tek tek eklenir ve çakışanlar satır hatası olarak raporlanır.
+    """
+    try:
+        with transaction.atomic():
+            return CustomUser.objects.bulk_create([user for _, user in users], batch_size=batch_size)
+    except IntegrityError:
+        pass
+    created = []
+    for index, user in users:
+        try:
+            with transaction.atomic():
+                user.pk = None
+                user._state.adding = True
+                CustomUser.objects.bulk_create([user])
+        except IntegrityError:
+            errors[index] = {'non_field_errors': ["E-posta veya kullanıcı adı zaten kayıtlı."]}
+        else:
+            created.append(user)
+    return created
+
+
+def _within_plan(items, company, errors):
+    """Planın kullanıcı limitine sığan (satır_no, ...) öğeleri döndürür; kalanları hatalara ekler."""
+    max_users = company.current_plan.max_users if company.current_plan_id else None
+    if max_users is None:
+        return items
+    available = max(0, max_users - CustomUser.objects.filter(company=company).count())
+    for index, _ in items[available:]:
+        errors[index] = {'non_field_errors': ["Planın kullanıcı limiti aşıldı."]}
+    return items[:available]
+
+
+def _report(valid, created, errors):
+    return {
+        'valid': len(valid),
+        'created': created,
+        'errors': [{'row': index, 'errors': errors[index]} for index in sorted(errors)],
+    }
@@ -1,9 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 from companies.serializers import CompanyBasicSerializer, BranchBasicSerializer
 from .models import CustomUser
+from core.images import ImageVariantsField
+from .blacklist import refresh_blacklist
+from .tokens import tenant_claims
 from companies.models import Company, Branch
 
 User = get_user_model()
@@ -19,19 +25,59 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['role'] = user.role
         token['is_company_admin'] = user.is_company_admin
         token['is_branch_admin'] = user.is_branch_admin
+        # Okuma isteklerinde kullanıcıyı sorgusuz kurmak için tenant bilgileri ve sürüm
+        for claim, value in tenant_claims(user).items():
+            token[claim] = value
         
         return token
 
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # last_login ve denetim kaydı (companies.audit) bu sinyalin alıcılarıyla yazılır
+        user_logged_in.send(sender=type(self.user), request=self.context.get('request'), user=self.user)
+        return data
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Access token'ı kullanıcının güncel verisinden yeniden üretir; böylece rol veya
+    şirket değişikliğinden sonra yenilenen token'lar güncel claim'leri taşır.
+    İptal edilmiş refresh token'lar accounts.blacklist üzerinden reddedilir.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if refresh_blacklist.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken('Token iptal edilmiş.')
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = CustomUser.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+
+        fresh = CustomTokenObtainPairSerializer.get_token(user)
+        data = {'access': str(fresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not refresh_blacklist.revoke(refresh):
+                # Aynı token eşzamanlı bir istekte zaten döndürüldü
+                raise InvalidToken('Token iptal edilmiş.')
+            data['refresh'] = str(fresh)
+
+        return data
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
     company_detail = CompanyBasicSerializer(source='company', read_only=True)
     branch_detail = BranchBasicSerializer(source='branch', read_only=True)
+    photo_variants = ImageVariantsField()
 
     class Meta:
         model = CustomUser
         fields = ('id', 'username', 'email', 'password', 'password2', 'first_name', 'last_name',
-                 'phone', 'gender', 'photo', 'role', 'company', 'branch',
+                 'phone', 'gender', 'photo', 'photo_variants', 'role', 'company', 'branch',
                  'company_detail', 'branch_detail', 'is_company_admin', 'is_branch_admin', 'is_active', 'date_joined')
         extra_kwargs = {
             'company': {'write_only': True},
@@ -56,6 +102,26 @@ class UserUpdateSerializer(serializers.ModelSerializer):
                  'gender', 'photo', 'company', 'branch')
         read_only_fields = ('email',)
 
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Yalnızca gelen alanlar yazılır; arka plandaki fotoğraf işinin alanları (accounts.photos) ezilmez
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+class UserDirectorySerializer(serializers.ModelSerializer):
+    """Kullanıcı rehberi satırı; şirket ve şube sadece kimlik ve ad olarak döner."""
+    company_name = serializers.CharField(source='company.name', read_only=True, default=None)
+    branch_name = serializers.CharField(source='branch.name', read_only=True, default=None)
+    photo_variants = ImageVariantsField()
+
+    class Meta:
+        model = CustomUser
+        fields = ('id', 'username', 'email', 'first_name', 'last_name', 'phone', 'photo_variants', 'role',
+                 'company', 'company_name', 'branch', 'branch_name',
+                 'is_company_admin', 'is_branch_admin', 'is_active')
+        read_only_fields = fields
+
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
     new_password = serializers.CharField(required=True, validators=[validate_password])
@@ -69,11 +135,12 @@ class ChangePasswordSerializer(serializers.Serializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     company_detail = CompanyBasicSerializer(source='company', read_only=True)
     branch_detail = BranchBasicSerializer(source='branch', read_only=True)
+    photo_variants = ImageVariantsField()
 
     class Meta:
         model = CustomUser
         fields = ('id', 'username', 'email', 'first_name', 'last_name',
-                 'phone', 'gender', 'photo', 'role', 'company_detail',
+                 'phone', 'gender', 'photo', 'photo_variants', 'role', 'company_detail',
                  'branch_detail', 'is_company_admin', 'is_branch_admin',
                  'date_joined', 'last_login')
         read_only_fields = ('id', 'is_active', 'date_joined')
@@ -86,6 +153,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ('email', 'password', 'password2', 'first_name', 'last_name', 'role', 'company', 'branch')
 
+    def validate_email(self, value):
+        if value and CustomUser.objects.filter(email__iexact=value).exists():
+            raise serializers.ValidationError("Bu e-posta adresi zaten kayıtlı.")
+        return value
+
     def validate(self, attrs):
         if attrs['password'] != attrs['password2']:
             raise serializers.ValidationError({"password": "Şifreler eşleşmiyor"})
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from companies.models import Company, Branch
+from .models import CustomUser
+from .profiles import profile_snapshots
+
+# Profil anlık görüntüleri kullanıcı, şirket veya şube değiştiğinde geçersiz olur
+PROFILE_SOURCES = {CustomUser: 'user', Company: 'company', Branch: 'branch'}
+
+
+def invalidate_profile_snapshots(sender, instance, **kwargs):
+    profile_snapshots.on_change(PROFILE_SOURCES[sender], instance.pk)
+
+
+for model in PROFILE_SOURCES:
+    uid = f'profile-snapshot:{model._meta.label_lower}'
+    post_save.connect(invalidate_profile_snapshots, sender=model, dispatch_uid=uid)
+    post_delete.connect(invalidate_profile_snapshots, sender=model, dispatch_uid=uid)
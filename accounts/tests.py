@@ -1,3 +1,519 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from django.conf import global_settings
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from companies.models import Branch, Company, Plan
+from .backends import EmailBackend
+from .blacklist import BloomFilter, refresh_blacklist
+from .models import CustomUser, RevokedToken
+from .provisioning import _create, _hash_pool, hash_passwords
+from .tokens import TenantTokenUser
+from .views import AsyncTokenObtainView
 
-# Create your tests here.
+
+class TenantTokenTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.user = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='pass12345',
+            company=cls.company
+        )
+
+    def setUp(self):
+        caches['tokens'].clear()
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(
+            '/api/accounts/token/', {'username': 'personel@testtur.com', 'password': 'pass12345'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_hotels(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/records/hotels/')
+        return response, context.captured_queries
+
+    def test_read_requests_skip_user_query(self):
+        access = self.login()['access']
+        self.get_hotels(access)  # token sürümü önbelleğe alınır
+
+        response, queries = self.get_hotels(access)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('accounts_customuser' in query['sql'] for query in queries))
+        self.assertIsInstance(response.wsgi_request.user, TenantTokenUser)
+
+        with override_settings(TOKEN_USER={'STATELESS': False}):
+            _, db_queries = self.get_hotels(access)
+        self.assertEqual(len(db_queries), len(queries) + 1)
+
+    def test_role_change_invalidates_access_token(self):
+        tokens = self.login()
+        self.assertEqual(self.get_hotels(tokens['access'])[0].status_code, 200)
+
+        self.user.is_company_admin = True
+        self.user.save()
+
+        self.assertEqual(self.get_hotels(tokens['access'])[0].status_code, 401)
+        refreshed = self.client.post('/api/accounts/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(refreshed.status_code, 200)
+        response, _ = self.get_hotels(refreshed.data['access'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.wsgi_request.user.is_company_admin)
+
+    def test_last_login_does_not_bump_version(self):
+        version = CustomUser.objects.get(pk=self.user.pk).token_version
+        self.login()
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).token_version, version)
+
+
+class EmailLoginTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='personel', email='Personel@TestTur.com', password='pass12345'
+        )
+
+    def test_case_insensitive_single_query(self):
+        with CaptureQueriesContext(connection) as context:
+            user = EmailBackend().authenticate(None, username='PERSONEL@testtur.com', password='pass12345')
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertIn('LOWER', context.captured_queries[0]['sql'])
+
+        self.assertIsNone(EmailBackend().authenticate(None, username='personel@testtur.com', password='yanlis'))
+        self.assertIsNone(EmailBackend().authenticate(None, username='yok@testtur.com', password='pass12345'))
+        self.assertEqual(EmailBackend().authenticate(None, username='personel', password='pass12345'), self.user)
+
+    def test_username_with_at_sign(self):
+        # Kullanıcı adı başka birinin e-postası değilse kullanıcı adıyla eşleşir
+        user = CustomUser.objects.create_user(
+            username='eski@adres.com', email='yeni@testtur.com', password='pass12345'
+        )
+        self.assertEqual(EmailBackend().authenticate(None, username='eski@adres.com', password='pass12345'), user)
+        self.assertEqual(EmailBackend().authenticate(None, username='yeni@testtur.com', password='pass12345'), user)
+
+    def test_email_unique_ignoring_case(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create_user(username='kopya', email='personel@testtur.com', password='x')
+        # Boş e-postalar kısıta takılmaz
+        CustomUser.objects.create_user(username='bos1', password='x')
+        CustomUser.objects.create_user(username='bos2', password='x')
+
+    async def test_async_login_view(self):
+        view = AsyncTokenObtainView.as_view()
+        factory = AsyncRequestFactory()
+
+        def post(payload):
+            return factory.post('/api/accounts/token/', json.dumps(payload), content_type='application/json')
+
+        response = await view(post({'username': 'personel@TESTTUR.com', 'password': 'pass12345'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', json.loads(response.content))
+
+        response = await view(post({'username': 'personel@testtur.com', 'password': 'yanlis'}))
+        self.assertEqual(response.status_code, 401)
+        response = await view(post({'username': 'personel@testtur.com'}))
+        self.assertEqual(response.status_code, 400)
+
+
+class RefreshBlacklistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='pass12345'
+        )
+
+    def setUp(self):
+        refresh_blacklist.reset()
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post('/api/accounts/token/refresh/', {'refresh': token}, format='json')
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        values = [str(uuid.uuid4()) for _ in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_rotated_token_is_rejected(self):
+        response = self.client.post(
+            '/api/accounts/token/', {'username': 'personel@testtur.com', 'password': 'pass12345'}, format='json'
+        )
+        first = response.data['refresh']
+
+        rotated = self.refresh(first)
+        self.assertEqual(rotated.status_code, 200)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+        self.assertEqual(self.refresh(first).status_code, 401)
+        # Filtre başka bir süreçteki gibi boşken de tekil jti eşzamanlı tekrar kullanımı engeller
+        refresh_blacklist.reset()
+        with override_settings(REFRESH_BLACKLIST={'REBUILD_INTERVAL': 3600, 'SYNC_INTERVAL': 3600}):
+            refresh_blacklist._current_filter()
+            refresh_blacklist._filter = BloomFilter(10, 0.01)
+            self.assertEqual(self.refresh(first).status_code, 401)
+        self.assertEqual(self.refresh(rotated.data['refresh']).status_code, 200)
+
+    def test_unrevoked_token_skips_table_lookup(self):
+        response = self.client.post(
+            '/api/accounts/token/', {'username': 'personel@testtur.com', 'password': 'pass12345'}, format='json'
+        )
+        refresh_blacklist._current_filter()  # filtre kurulur
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+        lookups = [q['sql'] for q in context.captured_queries if 'accounts_revokedtoken' in q['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertTrue(lookups[0].startswith('INSERT'))
+
+    def test_prune_deletes_expired_in_batches(self):
+        now = timezone.now()
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=f'eski{index}', expires_at=now - timedelta(days=1)) for index in range(7)]
+            + [RevokedToken(jti='gecerli', expires_at=now + timedelta(days=1))]
+        )
+        with CaptureQueriesContext(connection) as context:
+            call_command('prune_revoked_tokens', batch_size=3, stdout=io.StringIO())
+        deletes = [q for q in context.captured_queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['gecerli'])
+
+
+class TokenVerifyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.user = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='pass12345',
+            company=cls.company
+        )
+
+    def setUp(self):
+        caches['tokens'].clear()
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/accounts/token/', {'username': 'personel@testtur.com', 'password': 'pass12345'}, format='json'
+        )
+        self.access = response.data['access']
+
+    def verify(self, token=None):
+        return self.client.post('/api/accounts/token/verify/', {'token': token or self.access}, format='json')
+
+    def test_warm_verify_makes_no_queries(self):
+        self.assertEqual(self.verify().status_code, 200)
+        with CaptureQueriesContext(connection) as context:
+            response = self.verify()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(response.data['user']['company_detail']['name'], 'Test Tur')
+
+    def test_company_and_user_changes_refresh_snapshot(self):
+        self.verify()
+        Company.objects.filter(pk=self.company.pk).update(name='Yeni Tur')
+        self.assertEqual(self.verify().data['user']['company_detail']['name'], 'Test Tur')
+
+        self.company.name = 'Yeni Tur'
+        self.company.save()
+        self.assertEqual(self.verify().data['user']['company_detail']['name'], 'Yeni Tur')
+
+        self.user.first_name = 'Ayşe'
+        self.user.save()
+        self.assertEqual(self.verify().data['user']['first_name'], 'Ayşe')
+
+    def test_invalid_and_stale_tokens(self):
+        self.assertEqual(self.verify('gecersiz').status_code, 401)
+        self.user.is_company_admin = True
+        self.user.save()
+        self.assertEqual(self.verify().status_code, 401)
+
+
+class UserDirectoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.other = [
+            Company.objects.create(
+                name=name, tax_number=tax, address='Adres', phone='555',
+                email=f'info@{tax}.com', tenant_id=uuid.uuid4()
+            )
+            for name, tax in (('Test Tur', '1234567890'), ('Diğer Tur', '9876543210'))
+        ]
+        cls.branch = Branch.objects.create(
+            company=cls.company, name='Merkez', email='merkez@testtur.com', phone='555', address='Adres'
+        )
+        cls.admin = CustomUser.objects.create_user(
+            username='yonetici', email='yonetici@testtur.com', password='pass12345',
+            company=cls.company, is_company_admin=True, role='company_admin'
+        )
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'personel{index}', email=f'personel{index}@testtur.com',
+                       first_name='Ali' if index % 2 else 'Veli', last_name='Yılmaz',
+                       company=cls.company, branch=cls.branch, is_active=index != 0)
+            for index in range(6)
+        ])
+        CustomUser.objects.create_user(username='yabanci', email='ali@digertur.com', password='x', company=cls.other,
+                                       first_name='Ali')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, **params):
+        return self.client.get('/api/accounts/users/directory/', params)
+
+    def test_scoped_keyset_pages(self):
+        first = self.get(page_size=4)
+        self.assertEqual(len(first.data['results']), 4)
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get(first.data['next'])
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertIsNone(second.data['next'])
+        usernames = {row['username'] for row in first.data['results'] + second.data['results']}
+        self.assertEqual(len(usernames), 7)
+        self.assertNotIn('yabanci', usernames)
+        self.assertEqual(second.data['results'][-1]['branch_name'], 'Merkez')
+
+    def test_filters_and_prefix_search(self):
+        self.assertEqual(len(self.get(q='al').data['results']), 3)
+        self.assertEqual(len(self.get(q='PERSONEL1').data['results']), 1)
+        self.assertEqual(len(self.get(q='yıl').data['results']), 6)
+        self.assertEqual(len(self.get(is_active='false').data['results']), 1)
+        self.assertEqual(len(self.get(role='company_admin').data['results']), 1)
+        self.assertEqual(len(self.get(branch=self.branch.pk, q='veli').data['results']), 3)
+
+    def test_user_without_company_sees_nobody(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(username='bagimsiz', password='x'))
+        self.assertEqual(self.get().data['results'], [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkProvisionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.branch = Branch.objects.create(
+            company=cls.company, name='Merkez', email='merkez@testtur.com', phone='555', address='Adres'
+        )
+        cls.admin = CustomUser.objects.create_user(
+            username='yonetici', email='yonetici@testtur.com', password='pass12345',
+            company=cls.company, is_company_admin=True, role='company_admin'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_json_rows_report_errors_per_row(self):
+        users = [
+            {'email': 'ayse@testtur.com', 'password': 'Guclu-Sifre-1', 'first_name': 'Ayşe'},
+            {'email': 'YONETICI@testtur.com', 'password': 'Guclu-Sifre-2'},
+            {'email': 'mehmet@testtur.com', 'password': '123'},
+            {'email': 'Ayse@testtur.com', 'password': 'Guclu-Sifre-3'},
+            {'email': 'can@testtur.com', 'password': 'Guclu-Sifre-4', 'role': 'branch_admin'},
+        ]
+        response = self.client.post(
+            '/api/accounts/users/bulk/', {'branch': self.branch.pk, 'users': users}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+
+        ayse = CustomUser.objects.get(email='ayse@testtur.com')
+        self.assertEqual((ayse.company_id, ayse.branch_id, ayse.username), (self.company.pk, self.branch.pk, 'ayse@testtur.com'))
+        self.assertTrue(ayse.check_password('Guclu-Sifre-1'))
+        self.assertTrue(CustomUser.objects.get(email='can@testtur.com').is_branch_admin)
+
+    def test_csv_upload_and_dry_run(self):
+        content = b'email,password,first_name\nali@testtur.com,Guclu-Sifre-1,Ali\nveli@testtur.com,Guclu-Sifre-2,Veli\n'
+        dry = self.client.post('/api/accounts/users/bulk/', {
+            'file': SimpleUploadedFile('personel.csv', content, 'text/csv'), 'dry_run': 'true'
+        })
+        self.assertEqual((dry.status_code, dry.data['valid'], dry.data['created']), (200, 2, 0))
+        self.assertFalse(CustomUser.objects.filter(email='ali@testtur.com').exists())
+
+        response = self.client.post('/api/accounts/users/bulk/', {
+            'file': SimpleUploadedFile('personel.csv', content, 'text/csv')
+        })
+        self.assertEqual(response.data['created'], 2)
+
+    def test_unreadable_csv_is_rejected(self):
+        response = self.client.post('/api/accounts/users/bulk/', {
+            # csv modülünün alan boyutu sınırını aşan satır csv.Error yükseltir
+            'file': SimpleUploadedFile('personel.csv', b'email,password\n"' + b'a' * 200_000 + b'",x\n', 'text/csv')
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('CSV', response.data['error'])
+
+    def test_plan_user_limit(self):
+        plan = Plan.objects.create(
+            name='Başlangıç', plan_type='starter', description='Başlangıç', price=10,
+            max_users=2, max_storage=1, max_branches=1
+        )
+        Company.objects.filter(pk=self.company.pk).update(current_plan=plan)
+        users = [
+            {'email': 'ali@testtur.com', 'password': 'Guclu-Sifre-1'},
+            {'email': 'veli@testtur.com', 'password': 'Guclu-Sifre-2'},
+        ]
+        response = self.client.post('/api/accounts/users/bulk/', {'users': users}, format='json')
+        self.assertEqual((response.status_code, response.data['created']), (201, 1))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2])
+        self.assertEqual(CustomUser.objects.filter(company=self.company).count(), 2)
+
+    def test_employee_cannot_provision(self):
+        employee = CustomUser.objects.create_user(username='personel', password='x', company=self.company)
+        self.client.force_authenticate(employee)
+        response = self.client.post('/api/accounts/users/bulk/', {'users': []}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_conflicting_rows_become_row_errors(self):
+        # Son kontrolden sonra başka bir kayıt aynı e-postayı almış gibi
+        users = [
+            (1, CustomUser(username='yeni-yonetici', email='yonetici@testtur.com', company=self.company)),
+            (2, CustomUser(username='ali', email='ali@testtur.com', company=self.company)),
+        ]
+        errors = {}
+        with transaction.atomic():
+            created = _create(users, errors, batch_size=100)
+        self.assertEqual([user.username for user in created], ['ali'])
+        self.assertEqual(list(errors), [1])
+        self.assertTrue(CustomUser.objects.filter(username='ali').exists())
+
+    @override_settings(PASSWORD_HASHERS=global_settings.PASSWORD_HASHERS)
+    def test_process_pool_preserves_order(self):
+        # 'spawn' işçileri test ayarlarını değil settings modülünü yükler, yani varsayılan PBKDF2 ile hash'ler
+        passwords = [f'sifre-{index}' for index in range(20)]
+        hashes = hash_passwords(passwords, workers=2)
+        user = CustomUser()
+        for index in (0, 7, 19):
+            user.password = hashes[index]
+            self.assertTrue(user.check_password(passwords[index]))
+        # Havuz süreç boyunca bir kez kurulur ve sonraki çağrılarda yeniden kullanılır
+        self.assertIs(_hash_pool(2), _hash_pool(2))
+
+
+def image_upload(name, color, size=(800, 600)):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class PhotoVariantTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.user = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='pass12345', company=cls.company
+        )
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media, IMAGE_VARIANTS={'SIZES': (64,), 'FORMATS': ('webp', 'jpeg'), 'ASYNC': False}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media = media
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/accounts/profile/', {'photo': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_upload_creates_hashed_variants_and_counts_storage(self):
+        self.upload(image_upload('avatar.png', 'red'))
+        user = CustomUser.objects.get(pk=self.user.pk)
+        paths = user.photo_variants['64']
+        self.assertEqual(set(paths), {'webp', 'jpeg'})
+        self.assertRegex(paths['webp'], rf'^user_photos/variants/{self.user.pk}/[0-9a-f]{{16}}-64\.webp$')
+        self.assertTrue(os.path.exists(os.path.join(self.media, paths['jpeg'])))
+
+        stored = sum(os.path.getsize(os.path.join(self.media, path)) for path in [user.photo.name, *paths.values()])
+        self.assertEqual(user.photo_storage_bytes, stored)
+        self.assertEqual(Company.objects.get(pk=self.company.pk).storage_usage, stored)
+
+        self.client.force_authenticate(user)
+        profile = self.client.get('/api/accounts/profile/')
+        self.assertTrue(profile.data['photo_variants']['64']['webp'].endswith(paths['webp']))
+
+    def test_replacing_photo_removes_old_files(self):
+        self.upload(image_upload('avatar.png', 'red'))
+        old = CustomUser.objects.get(pk=self.user.pk)
+        self.upload(image_upload('yeni.png', 'blue', size=(300, 300)))
+        user = CustomUser.objects.get(pk=self.user.pk)
+
+        for path in [old.photo.name, *old.photo_variants['64'].values()]:
+            self.assertFalse(os.path.exists(os.path.join(self.media, path)), path)
+        self.assertNotEqual(user.photo_variants, old.photo_variants)
+        self.assertEqual(Company.objects.get(pk=self.company.pk).storage_usage, user.photo_storage_bytes)
+
+    def test_identical_photos_of_other_users_are_kept(self):
+        other = CustomUser.objects.create_user(
+            username='diger', email='diger@testtur.com', password='pass12345', company=self.company
+        )
+        self.client.force_authenticate(other)
+        self.upload(image_upload('avatar.png', 'red'))
+        self.client.force_authenticate(self.user)
+        self.upload(image_upload('avatar.png', 'red'))
+        self.upload(image_upload('yeni.png', 'blue'))
+
+        other = CustomUser.objects.get(pk=other.pk)
+        for path in other.photo_variants['64'].values():
+            self.assertTrue(os.path.exists(os.path.join(self.media, path)), path)
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertEqual(
+            Company.objects.get(pk=self.company.pk).storage_usage,
+            user.photo_storage_bytes + other.photo_storage_bytes
+        )
+
+    def test_profile_update_keeps_background_fields(self):
+        stale = CustomUser.objects.get(pk=self.user.pk)
+        self.upload(image_upload('avatar.png', 'red'))
+        self.client.force_authenticate(stale)
+        self.client.put('/api/accounts/profile/', {'first_name': 'Ayşe'}, format='multipart')
+
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertEqual(user.first_name, 'Ayşe')
+        self.assertTrue(user.photo_variants)
+        self.assertGreater(user.photo_storage_bytes, 0)
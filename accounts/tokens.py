@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+TOKEN_VERSION_CLAIM = 'token_version'
+# Veritabanına gitmeden istek kullanıcısı kurabilmek için gereken claim'ler
+TENANT_CLAIMS = ('company_id', 'branch_id', 'role', 'is_company_admin', 'is_branch_admin', TOKEN_VERSION_CLAIM)
+
+# Kullanıcı silinmiş ya da pasifse önbelleğe yazılan sürüm; hiçbir token'la eşleşmez
+REVOKED = -1
+
+
+def _config():
+    return {
+        'STATELESS': True,
+        'CACHE_ALIAS': 'tokens',
+        'VERSION_CACHE_TIMEOUT': 60,
+        'PROFILE_CACHE_TIMEOUT': 60 * 60,
+        **getattr(settings, 'TOKEN_USER', {}),
+    }
+
+
+def stateless_enabled():
+    return _config()['STATELESS']
+
+
+def _version_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def current_token_version(user_id):
+    """Kullanıcının güncel token sürümü; önbellekte yoksa tek bir pk sorgusuyla okunur."""
+    config = _config()
+    cache = caches[config['CACHE_ALIAS']]
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = get_user_model().objects.filter(pk=user_id, is_active=True).values_list(
+            'token_version', flat=True
+        ).first()
+        if version is None:
+            version = REVOKED
+        cache.set(_version_key(user_id), version, config['VERSION_CACHE_TIMEOUT'])
+    return version
+
+
+def store_token_version(user_id, version):
+    config = _config()
+    caches[config['CACHE_ALIAS']].set(_version_key(user_id), version, config['VERSION_CACHE_TIMEOUT'])
+
+
+def tenant_claims(user):
+    return {
+        'company_id': user.company_id,
+        'branch_id': user.branch_id,
+        'role': user.role,
+        'is_company_admin': user.is_company_admin,
+        'is_branch_admin': user.is_branch_admin,
+        'is_superuser': user.is_superuser,
+        'is_staff': user.is_staff,
+        TOKEN_VERSION_CLAIM: user.token_version,
+    }
+
+
+def has_tenant_claims(token):
+    return all(claim in token for claim in TENANT_CLAIMS)
+
+
+class TenantTokenUser(TokenUser):
+    """
+    Access token claim'lerinden kurulan istek kullanıcısı.
+    company_id, branch_id ve rol bayrakları sorgusuz okunur; `company`, `branch` veya
+    claim'de olmayan bir alan istendiğinde CustomUser bir kez yüklenir.
+    """
+
+    @cached_property
+    def company_id(self):
+        return self.token.get('company_id')
+
+    @cached_property
+    def branch_id(self):
+        return self.token.get('branch_id')
+
+    @cached_property
+    def is_company_admin(self):
+        return self.token.get('is_company_admin', False)
+
+    @cached_property
+    def is_branch_admin(self):
+        return self.token.get('is_branch_admin', False)
+
+    @cached_property
+    def model_user(self):
+        return get_user_model().objects.select_related('company', 'branch').get(
+            **{api_settings.USER_ID_FIELD: self.id}
+        )
+
+    @cached_property
+    def company(self):
+        return self.model_user.company if self.company_id is not None else None
+
+    @cached_property
+    def branch(self):
+        return self.model_user.branch if self.branch_id is not None else None
+
+    def __eq__(self, other):
+        if isinstance(other, get_user_model()):
+            return self.pk == other.pk
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'token':
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.model_user, attr)
@@ -1,23 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenRefreshView,
-    TokenObtainPairView
-)
 from .views import (
+    AsyncTokenObtainView,
     CustomTokenObtainPairView,
+    CustomTokenRefreshView,
     CustomTokenVerifyView,
     RegisterView,
     UserProfileView,
     ChangePasswordView,
     UserListView,
+    UserDirectoryView,
+    UserBulkProvisionView,
 )
 
 app_name = 'accounts'
 
 urlpatterns = [
     # Authentication endpoints
-    path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/',
+         AsyncTokenObtainView.as_view() if settings.ASYNC_LOGIN else CustomTokenObtainPairView.as_view(),
+         name='token_obtain_pair'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', CustomTokenVerifyView.as_view(), name='token_verify'),
     path('register/', RegisterView.as_view(), name='register'),
     
@@ -25,4 +28,6 @@ urlpatterns = [
     path('profile/', UserProfileView.as_view(), name='user_profile'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('users/', UserListView.as_view(), name='user_list'),
+    path('users/directory/', UserDirectoryView.as_view(), name='user_directory'),
+    path('users/bulk/', UserBulkProvisionView.as_view(), name='user_bulk_provision'),
 ]
\ No newline at end of file
@@ -3,17 +3,36 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenVerifyView
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
-from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
+from rest_framework_simplejwt.tokens import RefreshToken, TokenError, UntypedToken
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model, aauthenticate
+from django.contrib.auth.signals import user_logged_in
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.settings import api_settings
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django_filters.rest_framework import DjangoFilterBackend
+from core.pagination import RequiredKeysetPagination
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from core.tenant import TenantScopedMixin
+from companies.permissions import IsBranchAdmin
 from .serializers import (
     UserSerializer, UserUpdateSerializer, ChangePasswordSerializer,
-    UserProfileSerializer, CustomTokenObtainPairSerializer, RegisterSerializer
+    UserProfileSerializer, CustomTokenObtainPairSerializer, RegisterSerializer,
+    CustomTokenRefreshSerializer, UserDirectorySerializer
 )
+from .blacklist import refresh_blacklist
 from .models import CustomUser
+from .profiles import profile_snapshots
+from .provisioning import parse_rows, provision_users
+from .tokens import TOKEN_VERSION_CLAIM, current_token_version
 from companies.models import Company, Branch
 
 User = get_user_model()
@@ -45,6 +64,72 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncTokenObtainView(View):
+    """
+    ASGI için giriş endpoint'i (CustomTokenObtainPairView ile aynı istek/yanıt).
+
+    Kullanıcı async ORM ile tek sorguda bulunur, şifre doğrulaması olay döngüsünü
+    bloklamadan sınırlı thread havuzunda çalışır.
+    """
+    http_method_names = ['post', 'options']
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'detail': 'Geçersiz JSON.'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'detail': 'Geçersiz JSON.'}, status=400)
+
+        errors = {
+            field: ['Bu alan zorunludur.']
+            for field in ('username', 'password') if not data.get(field)
+        }
+        if errors:
+            return JsonResponse(errors, status=400)
+
+        user = await aauthenticate(request, username=data['username'], password=data['password'])
+        if user is None:
+            return JsonResponse(
+                {'detail': 'No active account found with the given credentials'}, status=401
+            )
+        return JsonResponse(await sync_to_async(self.issue_tokens)(request, user))
+
+    @staticmethod
+    def issue_tokens(request, user):
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        # last_login ve denetim kaydı bu sinyalin alıcılarıyla yazılır
+        user_logged_in.send(sender=type(user), request=request, user=user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+class CustomTokenRefreshView(TokenRefreshView):
+    """
+    Refresh token ile yeni access token alınan endpoint.
+
+    Yeni token kullanıcının güncel rol, şirket ve şube bilgileriyle üretilir.
+    """
+    serializer_class = CustomTokenRefreshSerializer
+
+    @swagger_auto_schema(
+        operation_summary="JWT token yenileyin",
+        operation_description="Refresh token ile güncel claim'leri taşıyan yeni access token alın",
+        responses={
+            200: openapi.Response(
+                description="Token yenilendi",
+                examples={
+                    "application/json": {
+                        "access": "access_token_here",
+                        "refresh": "refresh_token_here"
+                    }
+                }
+            ),
+            401: "Geçersiz refresh token veya pasif kullanıcı"
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
 class RegisterView(generics.CreateAPIView):
     """
     Yeni kullanıcı kaydı için endpoint.
@@ -129,19 +214,31 @@ class ChangePasswordView(generics.UpdateAPIView):
             user = request.user
             if user.check_password(serializer.validated_data['old_password']):
                 user.set_password(serializer.validated_data['new_password'])
-                user.save()
+                user.save(update_fields=['password'])
                 return Response({"message": "Şifre başarıyla değiştirildi"})
             return Response({"error": "Eski şifre yanlış"}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class UserListView(generics.ListAPIView):
+def scope_users(tenant, queryset):
+    """
+    Süper kullanıcı tüm kullanıcıları, şube yöneticisi şubesini, diğerleri şirketini görür.
+    Şirketi olmayan kullanıcılar kimseyi göremez.
+    """
+    if not tenant.is_superuser and tenant.company_id is None:
+        return queryset.none()
+    return tenant.scope(queryset, branch='branch')
+
+class UserListView(TenantScopedMixin, generics.ListAPIView):
     """
     Kullanıcı listesi görüntüleme endpoint'i.
     Yetki seviyesine göre farklı kullanıcıları listeler.
     """
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticated,)
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.select_related('company', 'branch')
+
+    def get_queryset(self):
+        return scope_users(self.tenant, super().get_queryset())
 
     @swagger_auto_schema(
         operation_summary="Kullanıcı listesi",
@@ -168,9 +265,143 @@ class UserListView(generics.ListAPIView):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+class UserDirectoryView(TenantScopedMixin, generics.ListAPIView):
+    """
+    Tenant kapsamlı kullanıcı rehberi.
+
+    Her zaman keyset ile sayfalanır; sayfa süresi toplam kullanıcı sayısından bağımsızdır.
+    `role`, `branch` ve `is_active` indeksli filtrelerdir. `q` ad, soyad veya e-postada
+    büyük/küçük harf duyarsız önek araması yapar; arama LOWER() indeksleri üzerinde
+    aralık sorgusudur, LIKE '%...%' taraması yapılmaz.
+    """
+    serializer_class = UserDirectorySerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = RequiredKeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['role', 'branch', 'is_active']
+    queryset = CustomUser.objects.select_related('company', 'branch').only(
+        'id', 'username', 'email', 'first_name', 'last_name', 'phone', 'photo_variants', 'role',
+        'company__name', 'branch__name', 'is_company_admin', 'is_branch_admin', 'is_active'
+    )
+
+    @staticmethod
+    def prefix_search(queryset, term):
+        term = term.strip().lower()
+        if not term:
+            return queryset
+        # 'ali' -> LOWER(x) >= 'ali' AND LOWER(x) < 'alj'; startswith sonucu kesinleştirir
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+
+        def prefix(field):
+            return Q(**{f'{field}__gte': term, f'{field}__lt': upper, f'{field}__startswith': term})
+
+        return queryset.alias(
+            first_lower=Lower('first_name'), last_lower=Lower('last_name'), email_lower=Lower('email')
+        ).filter(
+            prefix('first_lower') | prefix('last_lower') | (prefix('email_lower') & ~Q(email=''))
+        )
+
+    def get_queryset(self):
+        queryset = scope_users(self.tenant, super().get_queryset())
+        return self.prefix_search(queryset, self.request.query_params.get('q', ''))
+
+    @swagger_auto_schema(
+        operation_summary="Kullanıcı rehberi",
+        operation_description="Şirketinizdeki kullanıcıları sayfalı ve aranabilir şekilde listeleyin",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Ad, soyad veya e-posta öneki",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Önceki yanıttaki `next` cursor değeri",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Sayfa başına kayıt (en fazla 200)",
+                              type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: UserDirectorySerializer(many=True),
+            401: "Kimlik doğrulama gerekli"
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+class UserBulkProvisionView(TenantScopedMixin, APIView):
+    """
+    Şirket veya şubeye toplu kullanıcı ekleme endpoint'i.
+
+    `users` JSON listesi ya da `file` (CSV/JSON) kabul eder. Geçerli satırlar oluşturulur,
+    hatalı satırlar satır numarasıyla raporlanır. Şube yöneticileri sadece kendi şubelerine ekleyebilir.
+    """
+    permission_classes = (IsAuthenticated, IsBranchAdmin)
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
+
+    def get_target(self, request):
+        tenant = self.tenant
+        company_id = request.data.get('company') if tenant.is_superuser else tenant.company_id
+        branch_id = tenant.branch_id if tenant.role == tenant.BRANCH_ADMIN else request.data.get('branch')
+        company = Company.objects.select_related('current_plan').filter(pk=company_id).first() if company_id else None
+        if company is None:
+            return None, None, "Şirket bulunamadı"
+        branch = None
+        if branch_id:
+            branch = Branch.objects.filter(pk=branch_id, company=company).first()
+            if branch is None:
+                return None, None, "Şube bu şirkete ait değil"
+        return company, branch, None
+
+    @swagger_auto_schema(
+        operation_summary="Toplu kullanıcı ekleme",
+        operation_description="CSV dosyası veya JSON listesiyle şirkete/şubeye kullanıcı ekleyin",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'company': openapi.Schema(type=openapi.TYPE_INTEGER, description="Sadece süper kullanıcı için"),
+                'branch': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'dry_run': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                'users': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            }
+        ),
+        responses={
+            201: openapi.Response(
+                description="Kullanıcılar oluşturuldu",
+                examples={
+                    "application/json": {
+                        "valid": 2,
+                        "created": 2,
+                        "errors": [{"row": 3, "errors": {"email": ["Bu değer zaten kayıtlı."]}}]
+                    }
+                }
+            ),
+            400: "Geçersiz dosya veya hiçbir satır geçerli değil",
+            403: "Yetki yok"
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        company, branch, error = self.get_target(request)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = request.FILES.get('file')
+        try:
+            rows = parse_rows(upload.read(), upload.name) if upload else request.data.get('users')
+        except ValueError as e:
+            return Response({"error": f"Dosya okunamadı: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Kullanıcı listesi boş"}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        report = provision_users(rows, company, branch, dry_run=dry_run)
+        if report['created']:
+            return Response(report, status=status.HTTP_201_CREATED)
+        if dry_run or not report['errors']:
+            return Response(report)
+        return Response(report, status=status.HTTP_400_BAD_REQUEST)
+
 class CustomTokenVerifyView(TokenVerifyView):
     """
     Token doğrulama ve kullanıcı bilgilerini döndürme endpoint'i.
+
+    SPA her sayfa geçişinde çağırır; token bir kez çözülür ve profil verisi
+    (kullanıcı, şirket, şube sürümleriyle anahtarlanan) önbellekten döner.
     """
     
     @swagger_auto_schema(
@@ -196,26 +427,29 @@ class CustomTokenVerifyView(TokenVerifyView):
         }
     )
     def post(self, request, *args, **kwargs):
+        token = request.data.get('token')
+        if not token:
+            return Response(
+                {'token_valid': False, 'error': 'Token gönderilmedi'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         try:
-            # Önce standart token doğrulamasını yap
-            response = super().post(request, *args, **kwargs)
-            
-            # Token geçerliyse kullanıcı bilgilerini al
-            from rest_framework_simplejwt.tokens import UntypedToken
-            from rest_framework_simplejwt.exceptions import InvalidToken
-            from django.conf import settings
-            import jwt
-            
-            token = request.data.get('token')
-            decoded_data = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            
-            # User ID'yi al
-            user_id = decoded_data.get('user_id')
-            user = CustomUser.objects.get(id=user_id)
-            
-            # Kullanıcı bilgilerini serialize et
-            user_data = UserProfileSerializer(user).data
-            
+            # İmza ve süre tek seferde doğrulanır; profil sürüm anahtarlı önbellekten okunur
+            validated = UntypedToken(token)
+            user_id = validated.get(api_settings.USER_ID_CLAIM)
+            version = validated.get(TOKEN_VERSION_CLAIM)
+            if version is not None and current_token_version(user_id) != version:
+                raise TokenError("Token sürümü güncel değil")
+            if (
+                validated.get(api_settings.TOKEN_TYPE_CLAIM) == 'refresh'
+                and refresh_blacklist.is_revoked(validated[api_settings.JTI_CLAIM])
+            ):
+                raise TokenError("Token iptal edilmiş")
+
+            user_data = profile_snapshots.get(
+                user_id, validated.get('company_id'), validated.get('branch_id')
+            )
+
             return Response({
                 'token_valid': True,
                 'user': user_data
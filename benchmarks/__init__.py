@@ -0,0 +1,13 @@
+"""
+Sıcak API yolları için performans ölçüm paketi.
+
+Kullanım (proje kök dizininden):
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale full --output sonuc.json
+    python -m benchmarks.run --scale small --update-budgets
+
+Ölçümler ayarlardaki veritabanının test kopyası üzerinde (SQLite ya da yerel PostgreSQL)
+gerçek DRF endpoint'leri çağrılarak yapılır. Sonuçlar JSON olarak yazılır ve
+`benchmarks/budgets.json` içindeki bütçeleri aşan metrik varsa komut 1 ile çıkar.
+"""
@@ -0,0 +1,144 @@
+"""
+Vardiya başı giriş yoğunluğu benchmark'ı.
+
+    python -m benchmarks.login --users 200 --concurrency 32 --seconds 10
+    python -m benchmarks.login --sync        # WSGI yolu (CustomTokenObtainPairView) ile karşılaştırma
+
+Varsayılan olarak ASGI yolu (AsyncTokenObtainView) süreç içi ASGI istemcisiyle sürülür;
+çıktı saniyedeki başarılı giriş sayısı ve gecikme yüzdeliklerini içeren JSON'dur.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Giriş endpoint'i için sürekli yük testi")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--hash-workers', type=int, help="LOGIN_HASH_WORKERS değerini ezer")
+    parser.add_argument('--sync', action='store_true', help="Senkron DRF görünümünü ölç")
+    parser.add_argument('--output', help="Sonuç JSON dosyası (varsayılan: stdout)")
+    return parser.parse_args(argv)
+
+
+def seed_users(count, password):
+    from django.contrib.auth.hashers import make_password
+    from accounts.models import CustomUser
+
+    # Tek hash tüm kullanıcılarda kullanılır; doğrulama maliyeti gerçek girişle aynıdır
+    encoded = make_password(password)
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'vardiya{index}', email=f'Vardiya{index}@Benchmark.local', password=encoded)
+        for index in range(count)
+    ], batch_size=1000)
+    # İstemciler e-postayı farklı büyük/küçük harfle gönderir
+    return [f'vardiya{index}@benchmark.local' for index in range(count)]
+
+
+def summarize(latencies, errors, elapsed, args):
+    from .measure import percentile
+    return {
+        'mode': 'sync' if args.sync else 'asgi',
+        'users': args.users,
+        'concurrency': args.concurrency,
+        'seconds': round(elapsed, 2),
+        'logins': len(latencies),
+        'errors': errors,
+        'logins_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+    }
+
+
+async def drive_async(emails, password, args):
+    from django.test import AsyncClient
+
+    deadline = time.perf_counter() + args.seconds
+    latencies, errors = [], 0
+
+    async def worker(offset):
+        nonlocal errors
+        client = AsyncClient()
+        index = offset
+        while time.perf_counter() < deadline:
+            payload = {'username': emails[index % len(emails)], 'password': password}
+            started = time.perf_counter()
+            response = await client.post('/api/accounts/token/', payload, content_type='application/json')
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+            index += args.concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(args.concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def drive_sync(emails, password, args):
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(offset):
+        client = APIClient()
+        latencies, errors, index = [], 0, offset
+        try:
+            while time.perf_counter() < deadline:
+                payload = {'username': emails[index % len(emails)], 'password': password}
+                started = time.perf_counter()
+                response = client.post('/api/accounts/token/', payload, format='json')
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+                index += args.concurrency
+        finally:
+            connections.close_all()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(worker, range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return [value for latencies, _ in results for value in latencies], sum(e for _, e in results), elapsed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    os.environ['ASYNC_LOGIN'] = '0' if args.sync else '1'
+    if args.hash_workers:
+        os.environ['LOGIN_HASH_WORKERS'] = str(args.hash_workers)
+
+    import django
+    django.setup()
+
+    from .environment import test_database
+
+    password = 'vardiya-pass-123'
+    with test_database():
+        emails = seed_users(args.users, password)
+        if args.sync:
+            latencies, errors, elapsed = drive_sync(emails, password, args)
+        else:
+            latencies, errors, elapsed = asyncio.run(drive_async(emails, password, args))
+
+    output = json.dumps(summarize(latencies, errors, elapsed, args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    else:
+        print(output)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import time
+import tracemalloc
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(samples, fraction):
+    """Sıralı örneklerde en yakın sıra yöntemiyle yüzdelik değer."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _body_size(response):
+    if getattr(response, 'streaming', False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(call, iterations=20, warmup=2):
+    """
+    `call()` bir HTTP yanıtı döndürür. Gecikme ölçümü izleme olmadan yapılır;
+    sorgu sayısı ve bellek tepe değeri ayrı bir çağrıda toplanır.
+    """
+    for _ in range(warmup):
+        _body_size(call())
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = call()
+        size = _body_size(response)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    reset_queries()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            response = call()
+            _body_size(response)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'iterations': iterations,
+        'p50_ms': round(percentile(samples, 0.50), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'queries': len(queries.captured_queries),
+        'peak_kb': round(peak / 1024, 1),
+        'response_kb': round(size / 1024, 1),
+    }
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+
+BUDGETS_PATH = Path(__file__).with_name('budgets.json')
+METRICS = ('p95_ms', 'queries', 'peak_kb', 'response_kb')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sıcak API yolları için benchmark paketi")
+    parser.add_argument('--scale', default='small', help="smoke, small veya full")
+    parser.add_argument('--scenario', action='append', help="Sadece verilen senaryoları çalıştır")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--companies', type=int)
+    parser.add_argument('--hotels', type=int)
+    parser.add_argument('--operations', type=int)
+    parser.add_argument('--output', help="Sonuç JSON dosyası (varsayılan: stdout)")
+    parser.add_argument('--budgets', default=str(BUDGETS_PATH))
+    parser.add_argument('--update-budgets', action='store_true',
+                        help="Ölçülen değerleri bütçe dosyasına yazar")
+    parser.add_argument('--keepdb', action='store_true', help="Test veritabanını silme")
+    return parser.parse_args(argv)
+
+
+def check_budgets(results, budgets):
+    """Bütçeyi aşan metrikleri '<senaryo>.<metrik>: ölçülen > bütçe' biçiminde döndürür."""
+    failures = []
+    for name, budget in budgets.items():
+        measured = results.get(name)
+        if measured is None:
+            continue
+        for metric, limit in budget.items():
+            if measured.get(metric) is not None and measured[metric] > limit:
+                failures.append(f"{name}.{metric}: {measured[metric]} > {limit}")
+    return failures
+
+
+def budgets_from(results):
+    # Gecikme ve bellek makineye göre oynar; ölçülen değerin iki katı bütçe olarak yazılır
+    return {
+        name: {
+            'queries': result['queries'],
+            'p95_ms': round(result['p95_ms'] * 2, 1),
+            'peak_kb': round(result['peak_kb'] * 2, 1),
+            'response_kb': round(result['response_kb'] * 1.1, 1),
+        }
+        for name, result in results.items()
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from .environment import test_database
+    from .measure import measure
+    from .scenarios import SCENARIOS
+    from .seed import seed
+
+    with test_database(keepdb=args.keepdb):
+        context = seed(args.scale, companies=args.companies, hotels=args.hotels, operations=args.operations)
+        results = {}
+        for name in args.scenario or SCENARIOS:
+            call = SCENARIOS[name](context)
+            results[name] = measure(call, iterations=args.iterations, warmup=args.warmup)
+            print(f"{name}: {results[name]}", file=sys.stderr)
+
+    report = {
+        'scale': args.scale,
+        'seed': context['scale'],
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+    budgets_path = Path(args.budgets)
+    all_budgets = json.loads(budgets_path.read_text()) if budgets_path.exists() else {}
+    if args.update_budgets:
+        all_budgets[args.scale] = budgets_from(results)
+        budgets_path.write_text(json.dumps(all_budgets, indent=2, ensure_ascii=False) + '\n')
+        return 0
+
+    failures = check_budgets(results, all_budgets.get(args.scale, {}))
+    for failure in failures:
+        print(f"BÜTÇE AŞILDI {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
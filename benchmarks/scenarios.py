@@ -0,0 +1,53 @@
+from rest_framework.test import APIClient
+
+# Her senaryo (istemci, bağlam) alır ve tek bir isteği çalıştıran fonksiyon döndürür.
+
+
+def _login(context, tenant):
+    client = APIClient()
+    response = client.post(
+        '/api/accounts/token/',
+        {'username': tenant['email'], 'password': context['password']},
+        format='json'
+    )
+    assert response.status_code == 200, response.content
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    return client
+
+
+def operation_detail(context):
+    tenant = context['tenants'][0]
+    client = _login(context, tenant)
+    url = f"/api/operations/operations/{tenant['operation_id']}/"
+    return lambda: client.get(url)
+
+
+def hotel_list(context):
+    client = _login(context, context['tenants'][0])
+    return lambda: client.get('/api/records/hotels/')
+
+
+def hotel_list_page(context):
+    client = _login(context, context['tenants'][0])
+    return lambda: client.get('/api/records/hotels/', {'page_size': 100})
+
+
+def hotel_list_not_modified(context):
+    client = _login(context, context['tenants'][0])
+    etag = client.get('/api/records/hotels/', {'page_size': 100})['ETag']
+    return lambda: client.get('/api/records/hotels/', {'page_size': 100}, HTTP_IF_NONE_MATCH=etag)
+
+
+def login(context):
+    client = APIClient()
+    payload = {'username': context['tenants'][0]['email'], 'password': context['password']}
+    return lambda: client.post('/api/accounts/token/', payload, format='json')
+
+
+SCENARIOS = {
+    'operation_detail': operation_detail,
+    'hotel_list': hotel_list,
+    'hotel_list_page': hotel_list_page,
+    'hotel_list_not_modified': hotel_list_not_modified,
+    'login': login,
+}
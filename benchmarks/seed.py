@@ -0,0 +1,141 @@
+import uuid
+from datetime import date, time, timedelta
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import CustomUser
+from companies.models import Company, Branch, City, Currency
+from records.models import (
+    BuyerCompany, Tour, Hotel, HotelPriceHistory, VehicleSupplier, VehicleType, VehicleCost
+)
+from operations.models import Operation, OperationDay, OperationItem, OperationSubItem
+
+# Ölçek ön ayarları. Değerler şirket (tenant) başınadır.
+SCALES = {
+    'smoke': {
+        'companies': 1, 'hotels': 50, 'price_history': 2,
+        'operations': 5, 'days': 3, 'items': 2, 'subitems': 2,
+    },
+    'small': {
+        'companies': 2, 'hotels': 1000, 'price_history': 3,
+        'operations': 100, 'days': 14, 'items': 5, 'subitems': 4,
+    },
+    'full': {
+        'companies': 1, 'hotels': 10000, 'price_history': 3,
+        'operations': 1000, 'days': 14, 'items': 5, 'subitems': 4,
+    },
+}
+
+PASSWORD = 'benchmark-pass-123'
+BATCH_SIZE = 2000
+
+
+def _history_rows(hotel, count, currency, today):
+    # Ardışık, çakışmayan fiyat dönemleri; sonuncusu bugünü kapsar
+    rows = []
+    for index in range(count):
+        start = today - timedelta(days=90 * (count - index))
+        rows.append(HotelPriceHistory(
+            hotel=hotel, currency=currency, valid_from=start,
+            valid_until=start + timedelta(days=89) if index < count - 1 else hotel.valid_until,
+            single_price=100 + index, double_price=150 + index, triple_price=200 + index
+        ))
+    return rows
+
+
+def seed_tenant(index, scale, city, currency, vehicle_type):
+    """Tek bir şirketi; kullanıcı, otel kataloğu ve operasyon ağacıyla birlikte oluşturur."""
+    today = timezone.now().date()
+    valid_until = today + timedelta(days=365)
+
+    company = Company.objects.create(
+        name=f'Benchmark Tur {index}', tax_number=f'{index:010d}', address='Adres', phone='555',
+        email=f'info{index}@benchmark.local', tenant_id=uuid.uuid4()
+    )
+    branch = Branch.objects.create(
+        company=company, name='Merkez', email=f'merkez{index}@benchmark.local',
+        phone='555', address='Adres', city=city
+    )
+    user = CustomUser.objects.create_user(
+        username=f'admin{index}', email=f'admin{index}@benchmark.local', password=PASSWORD,
+        company=company, branch=branch, is_company_admin=True
+    )
+    buyer = BuyerCompany.objects.create(
+        company=company, name='Alıcı', short_name=f'B{index}', contact='info'
+    )
+
+    # Oteller save() atlanarak toplu yazılır; fiyat geçmişi ayrıca üretilir
+    hotels = Hotel.objects.bulk_create([
+        Hotel(
+            company=company, name=f'Otel {number}', city=city, single_price=100,
+            double_price=150, triple_price=200, currency=currency, valid_until=valid_until
+        )
+        for number in range(scale['hotels'])
+    ], batch_size=BATCH_SIZE)
+    history = []
+    for hotel in hotels:
+        history += _history_rows(hotel, scale['price_history'], currency, today)
+    HotelPriceHistory.objects.bulk_create(history, batch_size=BATCH_SIZE)
+
+    supplier = VehicleSupplier.objects.create(company=company, name='Araç Tedarikçi')
+    supplier.cities.add(city)
+    tour = Tour.objects.create(company=company, name='Şehir Turu', start_city=city, end_city=city)
+    vehicle_cost = VehicleCost.objects.create(
+        company=company, supplier=supplier, tour=tour, car_cost=1, minivan_cost=2,
+        minibus_cost=3, midibus_cost=4, bus_cost=5, currency=currency, valid_until=valid_until
+    )
+
+    start = date(2030, 1, 1)
+    operations = Operation.objects.bulk_create([
+        Operation(
+            company=company, branch=branch, buyer_company=buyer, created_by=user, follow_by=user,
+            reference_number=f'BENCH-{index}-{number}',
+            start_date=start + timedelta(days=number % 300),
+            end_date=start + timedelta(days=number % 300 + scale['days'] - 1)
+        )
+        for number in range(scale['operations'])
+    ], batch_size=BATCH_SIZE)
+
+    days = OperationDay.objects.bulk_create([
+        OperationDay(operation=operation, date=operation.start_date + timedelta(days=offset))
+        for operation in operations
+        for offset in range(scale['days'])
+    ], batch_size=BATCH_SIZE)
+
+    items = OperationItem.objects.bulk_create([
+        OperationItem(
+            operation_day=day, item_type=OperationItem.VEHICLE, pick_time=time(8 + slot),
+            vehicle_type=vehicle_type, vehicle_supplier=supplier, vehicle_cost=vehicle_cost,
+            sales_currency=currency
+        )
+        for day in days
+        for slot in range(scale['items'])
+    ], batch_size=BATCH_SIZE)
+
+    OperationSubItem.objects.bulk_create([
+        OperationSubItem(
+            operation_item=item, ordering=ordering, subitem_type=OperationSubItem.HOTEL,
+            hotel=hotels[(item.pk + ordering) % len(hotels)], room_type='DOUBLE'
+        )
+        for item in items
+        for ordering in range(1, scale['subitems'] + 1)
+    ], batch_size=BATCH_SIZE)
+
+    return {
+        'company_id': company.pk,
+        'email': user.email,
+        'operation_id': operations[0].pk,
+    }
+
+
+def seed(scale_name, **overrides):
+    """Ölçek ön ayarına göre sentetik tenant'ları oluşturur ve senaryo bağlamını döndürür."""
+    scale = {**SCALES[scale_name], **{k: v for k, v in overrides.items() if v is not None}}
+    with transaction.atomic():
+        city = City.objects.create(name='İstanbul', code='IST')
+        currency = Currency.objects.create(code='EUR', name='Euro', symbol='€')
+        vehicle_type = VehicleType.objects.create(name='Minivan')
+        tenants = [
+            seed_tenant(index, scale, city, currency, vehicle_type)
+            for index in range(scale['companies'])
+        ]
+    return {'scale': scale, 'tenants': tenants, 'password': PASSWORD}
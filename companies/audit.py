@@ -0,0 +1,306 @@
+import contextvars
+import datetime
+import logging
+from contextlib import contextmanager
+from functools import partial
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from core.batching import BatchWriter
+from core.tenant import TenantContext, current_request
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# records ve operations modellerindeki değişikliklerin AuditLog kaydı.
+# Model yüklenirken izlenen alanların görüntüsü saklanır; kayıt sonrası fark yalnızca bu
+# görüntüyle karşılaştırılarak çıkarılır. Girdiler transaction commit olunca isteğin
+# kuyruğuna eklenir, istek bitince (istek dışında commit anında) audit_writer'a verilir;
+# audit_writer arka planda tek bulk_create ile yazar. Toplu içe aktarmalar `disabled()`
+# bloğu içinde çalıştırılarak kayıt dışı bırakılabilir.
+
+MISSING = object()
+# İstek dışı (komut, shell) kayıtların IP adresi
+LOCAL_ADDRESS = '127.0.0.1'
+# Ucuz nesne gösterimi için sırayla denenen alanlar; __str__ ilişkili kayıtları sorgulayabilir
+REPR_FIELDS = ('name', 'reference_number', 'title')
+
+_queue = contextvars.ContextVar('audit_queue', default=None)
+_disabled = contextvars.ContextVar('audit_disabled', default=False)
+# register() ile doldurulur: {model: TrackedModel}
+tracked = {}
+
+
+def _config():
+    return {
+        'APPS': ('records', 'operations'),
+        'EXCLUDE': (),
+        'MAX_PENDING': 1000,
+        'FLUSH_INTERVAL': 1.0,
+        'ASYNC': True,
+        **getattr(settings, 'AUDIT', {}),
+    }
+
+
+@contextmanager
+def disabled():
+    """Blok içindeki kayıt/silme işlemleri AuditLog'a yazılmaz (toplu içe aktarmalar için)."""
+    token = _disabled.set(True)
+    try:
+        yield
+    finally:
+        _disabled.reset(token)
+
+
+def _json(value):
+    if value is None or isinstance(value, (str, int, float, bool, dict, list)):
+        return value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    # Decimal, UUID, FieldFile
+    return str(value)
+
+
+class Entry:
+    __slots__ = ('label', 'pk', 'action', 'repr', 'changes', 'company_id', 'parent', 'user_id', 'ip', 'user_agent')
+
+    def __init__(self, label, pk, action, repr, changes, company_id, parent):
+        self.label = label
+        self.pk = pk
+        self.action = action
+        self.repr = repr
+        self.changes = changes
+        self.company_id = company_id
+        self.parent = parent
+        request = current_request()
+        tenant = TenantContext.for_request(request) if request is not None else None
+        self.user_id = tenant.user_id if tenant is not None else None
+        self.ip = (request.META.get('REMOTE_ADDR') if request is not None else None) or LOCAL_ADDRESS
+        self.user_agent = request.META.get('HTTP_USER_AGENT', '') if request is not None else ''
+
+
+class RequestQueue:
+    """İsteğin commit olmuş girdileri; kapandıktan sonra gelen girdiler doğrudan yazıma verilir."""
+    __slots__ = ('entries', 'closed')
+
+    def __init__(self):
+        self.entries = []
+        self.closed = False
+
+    def append(self, entry):
+        if self.closed:
+            audit_writer.add([entry])
+        else:
+            self.entries.append(entry)
+
+    def close(self):
+        self.closed = True
+        if self.entries:
+            audit_writer.add(self.entries)
+
+
+@contextmanager
+def request_queue():
+    """Blok içinde commit olan girdileri toplar ve blok sonunda tek seferde audit_writer'a verir."""
+    queue = RequestQueue()
+    token = _queue.set(queue)
+    try:
+        yield queue
+    finally:
+        _queue.reset(token)
+        queue.close()
+
+
+def enqueue(entry):
+    # Geri alınan transaction'ların girdileri on_commit ile birlikte düşer
+    queue = _queue.get()
+    if queue is not None:
+        transaction.on_commit(partial(queue.append, entry))
+    else:
+        transaction.on_commit(partial(audit_writer.add, [entry]))
+
+
+class TrackedModel:
+    """
+    Bir modelin izlenen alanları ve şirkete giden yolu. Modelde company alanı yoksa
+    `parent` (üst kaydı gösteren zorunlu FK) üzerinden çözülür; `path` modelden şirkete
+    giden sorgu yoludur (ör. 'operation_day__operation__company').
+    """
+
+    def __init__(self, model, parent, path):
+        self.model = model
+        self.label = model._meta.label
+        self.parent = parent
+        self.path = path
+        self.fields = [
+            (field.name, field.attname) for field in model._meta.concrete_fields
+            if not field.primary_key and not getattr(field, 'auto_now', False)
+            and not getattr(field, 'auto_now_add', False)
+        ]
+        uid = f'audit:{model._meta.label_lower}'
+        post_init.connect(self.on_init, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(self.on_save, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self.on_delete, sender=model, weak=False, dispatch_uid=uid)
+
+    def snapshot(self, instance):
+        values = instance.__dict__
+        return tuple(values.get(attname, MISSING) for _, attname in self.fields)
+
+    def on_init(self, sender, instance, **kwargs):
+        instance._audit_state = self.snapshot(instance) if instance.pk is not None else None
+
+    def object_repr(self, instance):
+        for name in REPR_FIELDS:
+            value = instance.__dict__.get(name)
+            if value:
+                return str(value)[:255]
+        return f"{self.model._meta.verbose_name} #{instance.pk}"[:255]
+
+    def entry(self, instance, action, changes):
+        if self.parent is None:
+            company_id, parent = instance.company_id, None
+        else:
+            field, parent_label = self.parent
+            company_id, parent = None, (parent_label, getattr(instance, field.attname))
+        return Entry(self.label, instance.pk, action, self.object_repr(instance), changes, company_id, parent)
+
+    def on_save(self, sender, instance, created, raw=False, **kwargs):
+        new = self.snapshot(instance)
+        old = None if created else getattr(instance, '_audit_state', None)
+        instance._audit_state = new
+        if raw or _disabled.get():
+            return
+        changes = {}
+        for (name, _), before, after in zip(self.fields, old or [None] * len(new), new):
+            if after is MISSING or before is MISSING or before == after:
+                continue
+            before, after = _json(before), _json(after)
+            if before != after:
+                changes[name] = [before, after]
+        if not changes and not created:
+            return
+        enqueue(self.entry(instance, 'create' if created else 'update', changes))
+
+    def on_delete(self, sender, instance, **kwargs):
+        if not _disabled.get():
+            enqueue(self.entry(instance, 'delete', None))
+
+
+def _company_path(model, models, paths):
+    if model in paths:
+        return paths[model]
+    paths[model] = None
+    fields = {field.name: field for field in model._meta.concrete_fields}
+    company = fields.get('company')
+    if company is not None and company.related_model._meta.label == 'companies.Company':
+        paths[model] = (None, 'company')
+        return paths[model]
+    # Şirket alanı yoksa zorunlu FK'lar sırayla denenir (ör. OperationItem -> OperationDay)
+    for field in fields.values():
+        if field.many_to_one and not field.null and field.related_model in models:
+            parent = _company_path(field.related_model, models, paths)
+            if parent is not None:
+                paths[model] = (field, f'{field.name}__{parent[1]}')
+                break
+    return paths[model]
+
+
+def register():
+    config = _config()
+    models = {
+        model for label in config['APPS'] for model in apps.get_app_config(label).get_models()
+        if model._meta.label not in config['EXCLUDE']
+    }
+    paths = {}
+    for model in sorted(models, key=lambda model: model._meta.label):
+        path = _company_path(model, models, paths)
+        if path is None:
+            # Şirkete bağlanamayan kayıtlar (ör. VehicleType) AuditLog'a yazılamaz
+            continue
+        field, lookup = path
+        parent = (field, field.related_model._meta.label) if field is not None else None
+        tracked[model] = TrackedModel(model, parent, lookup)
+    user_logged_in.connect(on_login, dispatch_uid='audit:login')
+    user_logged_out.connect(on_logout, dispatch_uid='audit:logout')
+
+
+def _session_entry(user, action):
+    company_id = getattr(user, 'company_id', None)
+    if company_id is None or _disabled.get():
+        return
+    entry = Entry(user._meta.label, user.pk, action, str(user.get_username())[:255], None, company_id, None)
+    entry.user_id = user.pk
+    enqueue(entry)
+
+
+def on_login(sender, request, user, **kwargs):
+    _session_entry(user, 'login')
+
+
+def on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        _session_entry(user, 'logout')
+
+
+def resolve_companies(entries):
+    """Şirketi üst kayıttan gelen girdileri önce kuyruktaki, sonra veritabanındaki üst kayıtlarla çözer."""
+    known = {(entry.label, entry.pk): entry.company_id for entry in entries if entry.company_id is not None}
+    pending = [entry for entry in entries if entry.company_id is None and entry.parent is not None]
+    changed = True
+    while pending and changed:
+        changed = False
+        for entry in pending:
+            company_id = known.get(entry.parent)
+            if company_id is not None:
+                entry.company_id = known[(entry.label, entry.pk)] = company_id
+                changed = True
+        pending = [entry for entry in pending if entry.company_id is None]
+
+    parents = {}
+    for entry in pending:
+        parents.setdefault(entry.parent[0], set()).add(entry.parent[1])
+    for label, ids in parents.items():
+        model = apps.get_model(label)
+        found = dict(model.objects.filter(pk__in=ids).values_list('pk', tracked[model].path))
+        for entry in pending:
+            if entry.parent[0] == label:
+                entry.company_id = found.get(entry.parent[1])
+
+
+class AuditWriter(BatchWriter):
+    name = 'audit-log'
+
+    def __init__(self):
+        self._entries = []
+        super().__init__()
+
+    def config(self):
+        config = _config()
+        return {'MAX_PENDING': config['MAX_PENDING'], 'INTERVAL': config['FLUSH_INTERVAL'], 'ASYNC': config['ASYNC']}
+
+    def _put(self, entries):
+        self._entries.extend(entries)
+        return len(self._entries)
+
+    def _drain(self):
+        entries, self._entries = self._entries, []
+        return entries
+
+    def write(self, batch):
+        resolve_companies(batch)
+        rows = [
+            AuditLog(
+                company_id=entry.company_id, user_id=entry.user_id, action=entry.action,
+                model_name=entry.label, object_id=str(entry.pk), object_repr=entry.repr,
+                changes=entry.changes, ip_address=entry.ip, user_agent=entry.user_agent
+            )
+            for entry in batch if entry.company_id is not None
+        ]
+        if len(rows) != len(batch):
+            logger.warning("%d denetim kaydının şirketi bulunamadı", len(batch) - len(rows))
+        AuditLog.objects.bulk_create(rows, batch_size=500)
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,189 @@
+import threading
+from collections import OrderedDict
+import time
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import authentication, exceptions
+from core.batching import BatchWriter
+from .models import APIKey, Company
+
+# Makineler arası istekler için API anahtarı doğrulaması. Anahtar `Authorization: Api-Key <anahtar>`
+# veya `X-API-Key` başlığıyla gelir ve SHA-256 özeti üzerinden aranır. Arama sonuçları süreç
+# içinde CACHE_TTL saniye tutulur; last_used_at anahtar başına en fazla LAST_USED_INTERVAL
+# saniyede bir, arka planda toplu UPDATE ile yazılır. Sıcak durumda doğrulama sorgu atmaz.
+
+KEYWORD = 'Api-Key'
+# Önbellekteki anahtar satırından APIKey nesnesi kurmak için okunan alanlar
+KEY_FIELDS = ('id', 'company_id', 'key_name', 'is_active', 'expires_at')
+
+
+def _config():
+    return {
+        'CACHE_TTL': 30,
+        'MAX_ENTRIES': 10_000,
+        'MISS_ENTRIES': 1_000,
+        'LAST_USED_INTERVAL': 60,
+        'FLUSH_INTERVAL': 5.0,
+        'ASYNC': True,
+        **getattr(settings, 'API_KEY_AUTH', {}),
+    }
+
+
+class APIKeyCache:
+    """
+    {özet: (alanlar | None, son_geçerlilik)} için iki LRU. Bulunan anahtarlar MAX_ENTRIES,
+    bilinmeyen özetler ayrı ve küçük MISS_ENTRIES sınırıyla tutulur; rastgele anahtar
+    denemeleri yalnızca birbirini düşürür, geçerli anahtarların kayıtlarına dokunmaz.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._misses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        now = time.monotonic()
+        with self._lock:
+            for entries in (self._entries, self._misses):
+                entry = entries.get(digest)
+                if entry is not None and entry[1] > now:
+                    entries.move_to_end(digest)
+                    return entry[0]
+        values = APIKey.objects.filter(api_key_digest=digest).values(*KEY_FIELDS).first()
+        config = _config()
+        entries, limit = (self._entries, config['MAX_ENTRIES']) if values else (self._misses, config['MISS_ENTRIES'])
+        with self._lock:
+            entries[digest] = (values, now + config['CACHE_TTL'])
+            entries.move_to_end(digest)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+        return values
+
+    def invalidate(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+            self._misses.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._misses.clear()
+
+
+api_key_cache = APIKeyCache()
+
+
+class LastUsedRecorder(BatchWriter):
+    """Kullanılan anahtar kimliklerini toplar; boşaltmada hepsi tek UPDATE ile işaretlenir."""
+    name = 'api-key-last-used'
+
+    def __init__(self):
+        self._pending = set()
+        self._touched = {}
+        super().__init__()
+
+    def config(self):
+        config = _config()
+        return {'MAX_PENDING': config['MAX_ENTRIES'], 'INTERVAL': config['FLUSH_INTERVAL'], 'ASYNC': config['ASYNC']}
+
+    def touch(self, api_key_id):
+        now = time.monotonic()
+        last = self._touched.get(api_key_id)
+        if last is not None and now - last < _config()['LAST_USED_INTERVAL']:
+            return
+        self._touched[api_key_id] = now
+        self.add(api_key_id)
+
+    def _put(self, api_key_id):
+        self._pending.add(api_key_id)
+        return len(self._pending)
+
+    def _drain(self):
+        pending, self._pending = self._pending, set()
+        return pending
+
+    def _reset(self):
+        super()._reset()
+        self._touched = {}
+
+    def write(self, batch):
+        # update() sinyal göndermez; anahtar önbelleği düşmez
+        APIKey.objects.filter(pk__in=batch).update(last_used_at=timezone.now())
+
+
+last_used_recorder = LastUsedRecorder()
+
+
+class APIKeyUser:
+    """
+    API anahtarıyla gelen isteğin kullanıcısı. Anahtarın şirketine üye, yönetici
+    yetkisi olmayan bir kullanıcı gibi davranır; veritabanında karşılığı yoktur.
+    """
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+    is_superuser = False
+    is_staff = False
+    is_company_admin = False
+    is_branch_admin = False
+    role = 'api_key'
+    id = pk = None
+    branch_id = None
+    branch = None
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.company_id = api_key.company_id
+        self.username = f'api-key:{api_key.pk}'
+
+    def __str__(self):
+        return self.username
+
+    @cached_property
+    def company(self):
+        return Company.objects.get(pk=self.company_id)
+
+    def has_perm(self, perm, obj=None):
+        return False
+
+    def has_perms(self, perm_list, obj=None):
+        return False
+
+    def has_module_perms(self, module):
+        return False
+
+
+class APIKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Başarılı doğrulamada (APIKeyUser, APIKey) döner; request.auth bu APIKey'dir.
+    Pasif, süresi dolmuş veya bilinmeyen anahtarlar 401 ile reddedilir.
+    """
+
+    def authenticate(self, request):
+        raw_key = request.META.get('HTTP_X_API_KEY')
+        if not raw_key:
+            header = authentication.get_authorization_header(request).split()
+            if not header or header[0].decode('latin-1').lower() != KEYWORD.lower():
+                return None
+            if len(header) != 2:
+                raise exceptions.AuthenticationFailed("Geçersiz API anahtarı başlığı.")
+            try:
+                raw_key = header[1].decode()
+            except UnicodeError:
+                raise exceptions.AuthenticationFailed("Geçersiz API anahtarı başlığı.")
+
+        values = api_key_cache.get(APIKey.digest(raw_key))
+        if values is None or not values['is_active']:
+            raise exceptions.AuthenticationFailed("Geçersiz veya pasif API anahtarı.")
+        if values['expires_at'] is not None and values['expires_at'] <= timezone.now():
+            raise exceptions.AuthenticationFailed("API anahtarının süresi dolmuş.")
+
+        # Önbellekteki satır paylaşılır; her istek kendi nesnesini kurar
+        api_key = APIKey(**values)
+        api_key._state.adding = False
+        last_used_recorder.touch(api_key.pk)
+        return APIKeyUser(api_key), api_key
+
+    def authenticate_header(self, request):
+        return KEYWORD
@@ -0,0 +1,314 @@
+import datetime
+import logging
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from core.batching import BatchWriter
+from .models import Subscription, Usage, UsageIngestKey
+from .usage import record_created
+
+logger = logging.getLogger(__name__)
+
+# Toplu kullanım ölçümü (usages/ingest/). Olaylar serializer yerine hafif bir döngüyle doğrulanır,
+# istek içinde (abonelik, özellik, gün) bazında toplanır ve süreç tamponuna eklenir. Tampon
+# aynı anahtarları birleştirir; boşaltıldığında anahtar başına tek Usage satırı bulk_create
+# ile yazılır ve günlük/aylık özetlere eklenir. Yazılamayan anahtarlar MAX_RETRIES denemeden
+# sonra loglanıp atılır; tek bir hatalı anahtar diğerlerinin yazılmasını engellemez.
+# Idempotency anahtarları UsageIngestKey tablosunda, olaylarla aynı transaction'da tutulur.
+
+FEATURE_MAX_LENGTH = Usage._meta.get_field('feature').max_length
+# Usage.value IntegerField; olay değerleri ve anahtar toplamları bu aralıkta kalmalı
+VALUE_MIN, VALUE_MAX = connection.ops.integer_field_range('IntegerField')
+IDEMPOTENCY_KEY_MAX_LENGTH = UsageIngestKey._meta.get_field('key').max_length
+
+
+def _in_range(value):
+    return VALUE_MIN <= value <= VALUE_MAX
+
+
+def _config():
+    return {
+        'MAX_PENDING_EVENTS': 50_000,
+        'FLUSH_INTERVAL': 2.0,
+        'MAX_EVENTS_PER_REQUEST': 10_000,
+        'IDEMPOTENCY_TIMEOUT': 60 * 60 * 24,
+        'MAX_RETRIES': 3,
+        'ASYNC': True,
+        **getattr(settings, 'USAGE_INGEST', {}),
+    }
+
+
+class UsageBuffer(BatchWriter):
+    """
+    Anahtarsız istekler {(şirket, abonelik, özellik, gün): [toplam, olay_sayısı]} olarak
+    birleştirilir; birleştirince IntegerField aralığını aşacak toplamlar `_overflow` listesinde
+    ayrı satır olarak bekler. Idempotency anahtarlı istekler {(şirket, anahtar): toplamlar}
+    olarak ayrı tutulur ve anahtar kaydıyla birlikte, aynı transaction'da yazılır.
+    Yazım birimi (anahtar, [(kullanım_anahtarı, toplam, olay_sayısı)]) demetidir.
+    """
+    name = 'usage-ingest'
+
+    def __init__(self):
+        self._pending = {}
+        self._overflow = []
+        self._keyed = {}
+        self._events = 0
+        # Yazılamayan birimlerin başarısız deneme sayısı
+        self._failures = {}
+        self._last_prune = 0.0
+        self.dropped = 0
+        super().__init__()
+
+    def config(self):
+        config = _config()
+        return {
+            'MAX_PENDING': config['MAX_PENDING_EVENTS'],
+            'INTERVAL': config['FLUSH_INTERVAL'],
+            'ASYNC': config['ASYNC'],
+        }
+
+    def _merge(self, totals):
+        for key, (value, events) in totals.items():
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [value, events]
+            elif _in_range(entry[0] + value):
+                entry[0] += value
+                entry[1] += events
+            else:
+                self._overflow.append((key, value, events))
+            self._events += events
+        return self._events
+
+    def _put(self, item):
+        idempotency, totals = item
+        if idempotency is None:
+            return self._merge(totals)
+        if idempotency not in self._keyed:
+            # Aynı süreçte eşzamanlı tekrar; ilk gelen tutulur
+            self._keyed[idempotency] = totals
+            self._events += sum(events for _, events in totals.values())
+        return self._events
+
+    def _requeue(self, unit):
+        idempotency, items = unit
+        if idempotency is None:
+            for key, value, events in items:
+                self._merge({key: (value, events)})
+        else:
+            self._put((idempotency, {key: (value, events) for key, value, events in items}))
+
+    def _drain(self):
+        units = [(None, [(key, value, events)]) for key, (value, events) in self._pending.items()]
+        units += [(None, [item]) for item in self._overflow]
+        units += [
+            (idempotency, [(key, value, events) for key, (value, events) in totals.items()])
+            for idempotency, totals in self._keyed.items()
+        ]
+        self._pending, self._overflow, self._keyed, self._events = {}, [], {}, 0
+        return units
+
+    def _reset(self):
+        super()._reset()
+        self._failures = {}
+
+    def is_pending(self, idempotency):
+        with self._lock:
+            return idempotency in self._keyed
+
+    @staticmethod
+    def _save(units):
+        keyed = [idempotency for idempotency, _ in units if idempotency is not None]
+        with transaction.atomic():
+            if keyed:
+                # Başka bir süreç aynı anahtarı daha önce yazdıysa birim tekrar sayılmaz
+                seen = seen_keys(keyed)
+                units = [(idempotency, items) for idempotency, items in units if idempotency not in seen]
+                UsageIngestKey.objects.bulk_create([
+                    UsageIngestKey(company_id=company_id, key=key)
+                    for company_id, key in (idempotency for idempotency, _ in units if idempotency is not None)
+                ])
+            rows = [
+                Usage(company_id=company_id, subscription_id=subscription_id, feature=feature, date=day, value=value)
+                for _, items in units
+                for (company_id, subscription_id, feature, day), value, _ in items
+            ]
+            Usage.objects.bulk_create(rows, batch_size=1000)
+            record_created(rows)
+
+    def _prune(self):
+        # Süresi geçen anahtarlar saatte en fazla bir kez silinir
+        now = time.monotonic()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        cutoff = timezone.now() - datetime.timedelta(seconds=_config()['IDEMPOTENCY_TIMEOUT'])
+        UsageIngestKey.objects.filter(created_at__lt=cutoff).delete()
+
+    def write(self, batch):
+        try:
+            self._save(batch)
+        except Exception:
+            logger.exception("Kullanım tamponu toplu yazılamadı; birimler tek tek deneniyor")
+        else:
+            self._failures = {}
+            self._prune()
+            return
+
+        # Hatalı birim diğerlerini bekletmesin diye her birim ayrı transaction'da yazılır
+        retry = []
+        for unit in batch:
+            idempotency, items = unit
+            unit_id = idempotency if idempotency is not None else items[0][0]
+            try:
+                self._save([unit])
+            except Exception:
+                failures = self._failures.get(unit_id, 0) + 1
+                if failures >= _config()['MAX_RETRIES']:
+                    logger.exception("Kullanım birimi %s %d denemede yazılamadı; atılıyor", unit_id, failures)
+                    self._failures.pop(unit_id, None)
+                    self.dropped += sum(events for _, _, events in items)
+                else:
+                    self._failures[unit_id] = failures
+                    retry.append(unit)
+            else:
+                self._failures.pop(unit_id, None)
+        if retry:
+            with self._lock:
+                for unit in retry:
+                    self._requeue(unit)
+
+    def pending(self):
+        with self._lock:
+            return self._events
+
+
+def seen_keys(idempotencies):
+    """Süresi geçmemiş, yazılmış (şirket, anahtar) çiftleri."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=_config()['IDEMPOTENCY_TIMEOUT'])
+    query = Q()
+    for company_id, key in idempotencies:
+        query |= Q(company_id=company_id, key=key)
+    return set(UsageIngestKey.objects.filter(query, created_at__gte=cutoff).values_list('company_id', 'key'))
+
+
+usage_buffer = UsageBuffer()
+
+
+def coalesce_events(events, today):
+    """
+    Olayları doğrular ve {(abonelik, özellik, gün): [toplam, olay_sayısı]} olarak toplar.
+    Dönen değer (toplamlar, hatalar); hatalar [{'index': sıra, 'errors': {...}}], sıralar 0'dan başlar.
+    """
+    totals = {}
+    errors = []
+    dates = {}
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ["Olay nesne olmalı."]}})
+            continue
+        problems = {}
+        feature = event.get('feature')
+        if not isinstance(feature, str) or not feature or len(feature) > FEATURE_MAX_LENGTH:
+            problems['feature'] = [f"En fazla {FEATURE_MAX_LENGTH} karakterlik metin olmalı."]
+        value = event.get('value', 1)
+        if isinstance(value, bool) or not isinstance(value, int) or not _in_range(value):
+            problems['value'] = [f"{VALUE_MIN} ile {VALUE_MAX} arasında tam sayı olmalı."]
+        subscription = event.get('subscription')
+        if subscription is not None and (isinstance(subscription, bool) or not isinstance(subscription, int)):
+            problems['subscription'] = ["Abonelik kimliği olmalı."]
+        raw_date = event.get('date')
+        day = today
+        if raw_date is not None:
+            day = dates.get(raw_date) if isinstance(raw_date, str) else None
+            if day is None:
+                try:
+                    day = dates[raw_date] = datetime.date.fromisoformat(raw_date)
+                except (TypeError, ValueError):
+                    problems['date'] = ["YYYY-MM-DD biçiminde olmalı."]
+        if problems:
+            errors.append({'index': index, 'errors': problems})
+            continue
+        key = (subscription, feature, day)
+        entry = totals.get(key)
+        if entry is None:
+            totals[key] = [value, 1]
+        elif _in_range(entry[0] + value):
+            entry[0] += value
+            entry[1] += 1
+        else:
+            errors.append({'index': index, 'errors': {'value': ["Aynı gün ve özellik için toplam değer çok büyük."]}})
+    return totals, errors
+
+
+def resolve_subscriptions(company_id, totals):
+    """
+    Abonelik kimliği verilmeyen olayları şirketin aktif aboneliğine bağlar.
+    Dönen değer (şirket anahtarlı toplamlar, hata mesajı).
+    """
+    requested = {subscription for subscription, _, _ in totals if subscription is not None}
+    rows = Subscription.objects.filter(company_id=company_id).filter(
+        Q(pk__in=requested) | Q(is_active=True)
+    ).order_by('-start_date', '-pk').values_list('pk', 'is_active')
+    known = set()
+    default = None
+    for pk, is_active in rows:
+        known.add(pk)
+        if is_active and default is None:
+            default = pk
+    if requested - known:
+        return None, f"Şirkete ait olmayan abonelik: {sorted(requested - known)}"
+
+    resolved = {}
+    for (subscription, feature, day), (value, events) in totals.items():
+        subscription = subscription if subscription is not None else default
+        if subscription is None:
+            return None, "Şirketin aktif aboneliği yok; olaylarda subscription belirtilmeli."
+        entry = resolved.setdefault((company_id, subscription, feature, day), [0, 0])
+        if not _in_range(entry[0] + value):
+            return None, "Aynı abonelik, gün ve özellik için toplam değer çok büyük."
+        entry[0] += value
+        entry[1] += events
+    return resolved, None
+
+
+def ingest(company_id, events, idempotency_key=None, today=None):
+    """
+    Olay listesini tampona ekler. Rapor: {'accepted': n, 'duplicate': bool, 'errors': [...]}.
+    Tek bir olay bile geçersizse hiçbiri eklenmez; aynı idempotency_key ile gelen tekrar
+    istekler IDEMPOTENCY_TIMEOUT boyunca yok sayılır. Anahtar olaylarla aynı transaction'da
+    yazıldığı için yazım başarısız olursa tekrar istek kabul edilir; farklı süreçlere düşen ve
+    ikisi de henüz yazılmamış tekrarlar 202 alır, fakat yazımda yalnızca ilki sayılır.
+    """
+    config = _config()
+    report = {'accepted': 0, 'duplicate': False, 'errors': []}
+    if idempotency_key and len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        report['errors'].append({'index': None, 'errors': {
+            'idempotency_key': [f"En fazla {IDEMPOTENCY_KEY_MAX_LENGTH} karakter olmalı."]
+        }})
+        return report
+    if len(events) > config['MAX_EVENTS_PER_REQUEST']:
+        report['errors'].append({'index': None, 'errors': {
+            'non_field_errors': [f"İstek başına en fazla {config['MAX_EVENTS_PER_REQUEST']} olay gönderilebilir."]
+        }})
+        return report
+
+    totals, report['errors'] = coalesce_events(events, today or timezone.localdate())
+    if report['errors'] or not totals:
+        return report
+    resolved, error = resolve_subscriptions(company_id, totals)
+    if error:
+        report['errors'].append({'index': None, 'errors': {'subscription': [error]}})
+        return report
+
+    idempotency = (company_id, idempotency_key) if idempotency_key else None
+    if idempotency is not None and (usage_buffer.is_pending(idempotency) or seen_keys([idempotency])):
+        # Anahtar bu süreçte bekliyor ya da yazılmış; yazılamazsa tekrar kabul edilir
+        report['duplicate'] = True
+        return report
+
+    usage_buffer.add((idempotency, resolved))
+    report['accepted'] = len(events)
+    return report
@@ -0,0 +1,33 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from companies.models import Company
+from companies.usage import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Günlük ve aylık kullanım özetlerini ham Usage kayıtlarından yeniden kurar. "
+        "Sinyallerin kaçırdığı değişiklikler (toplu update, ham SQL) sonrasında çalıştırılır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', help="Sadece verilen şirket(ler)")
+        parser.add_argument('--since', help="Bu tarihin ayından itibaren kur (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since YYYY-MM-DD biçiminde olmalı")
+
+        company_ids = options['company'] or list(Company.objects.order_by('pk').values_list('pk', flat=True))
+        daily = monthly = 0
+        for start in range(0, len(company_ids), options['batch_size']):
+            batch_daily, batch_monthly = rebuild(company_ids[start:start + options['batch_size']], since)
+            daily += batch_daily
+            monthly += batch_monthly
+
+        self.stdout.write(self.style.SUCCESS(f"{daily} günlük ve {monthly} aylık kullanım özeti kuruldu"))
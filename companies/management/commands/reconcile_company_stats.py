@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from companies.models import Company
+from companies.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Şirket ve şube pano sayaçlarını kaynak tablolardan yeniden sayar. "
+        "Sinyallerin kaçırdığı değişiklikler (toplu update, ham SQL) için periyodik çalıştırılır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', help="Sadece verilen şirket(ler)")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        company_ids = options['company'] or list(Company.objects.order_by('pk').values_list('pk', flat=True))
+        companies = branches = 0
+        for start in range(0, len(company_ids), options['batch_size']):
+            batch_companies, batch_branches = reconcile(company_ids[start:start + options['batch_size']])
+            companies += batch_companies
+            branches += batch_branches
+
+        self.stdout.write(self.style.SUCCESS(f"{companies} şirket ve {branches} şube sayacı uzlaştırıldı"))
@@ -0,0 +1,129 @@
+import logging
+import time
+from collections import deque
+from django.conf import settings
+from core.batching import BatchWriter
+from core.middleware import HybridMiddleware
+from .audit import request_queue
+from .models import APIKey, APIUsage
+
+logger = logging.getLogger(__name__)
+
+# API anahtarıyla yapılan isteklerin APIUsage kaydı. İstek yolunda yalnızca sınırlı bir
+# tampona demet eklenir; arka plan thread'i BATCH_SIZE kayıtta veya FLUSH_INTERVAL saniyede
+# bir bulk_create ile yazar. Tampon doluysa (veritabanı yavaş) yeni kayıtlar atılır ve sayılır.
+# created_at yazma anıdır; istek anından en fazla FLUSH_INTERVAL kadar sonradır.
+
+ENDPOINT_MAX_LENGTH = APIUsage._meta.get_field('endpoint').max_length
+USER_AGENT_MAX_LENGTH = 512
+
+
+def _config():
+    return {
+        'CAPACITY': 10_000,
+        'BATCH_SIZE': 500,
+        'FLUSH_INTERVAL': 0.5,
+        'ASYNC': True,
+        **getattr(settings, 'API_USAGE_LOG', {}),
+    }
+
+
+class APIUsageRecorder(BatchWriter):
+    name = 'api-usage-log'
+
+    def __init__(self):
+        self._buffer = deque()
+        self.dropped = 0
+        self.written = 0
+        self._reported_drops = 0
+        self._capacity = _config()['CAPACITY']
+        super().__init__()
+
+    def config(self):
+        config = _config()
+        self._capacity = config['CAPACITY']
+        return {'MAX_PENDING': config['BATCH_SIZE'], 'INTERVAL': config['FLUSH_INTERVAL'], 'ASYNC': config['ASYNC']}
+
+    def _put(self, record):
+        if len(self._buffer) >= self._capacity:
+            self.dropped += 1
+        else:
+            self._buffer.append(record)
+        return len(self._buffer)
+
+    def _drain(self):
+        batch, self._buffer = self._buffer, deque()
+        return batch
+
+    def write(self, batch):
+        if self.dropped != self._reported_drops:
+            logger.warning("APIUsage tamponu dolu; toplam %d kayıt atıldı", self.dropped)
+            self._reported_drops = self.dropped
+        rows = [
+            APIUsage(
+                api_key_id=api_key_id, endpoint=endpoint, method=method, status_code=status_code,
+                response_time=response_time, ip_address=ip_address, user_agent=user_agent
+            )
+            for api_key_id, endpoint, method, status_code, response_time, ip_address, user_agent in batch
+        ]
+        try:
+            APIUsage.objects.bulk_create(rows, batch_size=_config()['BATCH_SIZE'])
+        except Exception:
+            # Günlük kaydı için tekrar denenmez; kayıplar sayaca eklenir
+            with self._lock:
+                self.dropped += len(rows)
+            raise
+        self.written += len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {'pending': len(self._buffer), 'dropped': self.dropped, 'written': self.written}
+
+
+api_usage_recorder = APIUsageRecorder()
+
+
+class APIUsageMiddleware(HybridMiddleware):
+    """API anahtarıyla kimliği doğrulanan istekleri api_usage_recorder tamponuna ekler."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, started)
+        return response
+
+    def record(self, request, response, started):
+        # DRF kimlik doğrulaması sonucu (request.auth) alttaki HttpRequest'e de yazılır
+        api_key = getattr(request, 'auth', None)
+        if isinstance(api_key, APIKey):
+            api_usage_recorder.add((
+                api_key.pk,
+                request.path[:ENDPOINT_MAX_LENGTH],
+                request.method,
+                response.status_code,
+                (time.perf_counter() - started) * 1000,
+                request.META.get('REMOTE_ADDR') or '0.0.0.0',
+                request.META.get('HTTP_USER_AGENT', '')[:USER_AGENT_MAX_LENGTH],
+            ))
+
+
+class AuditMiddleware(HybridMiddleware):
+    """İsteğin denetim girdilerini (companies.audit) toplar; istek bitince tek seferde yazıma verir."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with request_queue():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_queue():
+            return await self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_currency_alter_branch_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='company',
+            name='tax_number',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True, verbose_name='Tax Number'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_alter_company_tax_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyStats',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='companies.company')),
+                ('branches', models.PositiveIntegerField(default=0, verbose_name='Şube Sayısı')),
+                ('users', models.PositiveIntegerField(default=0, verbose_name='Kullanıcı Sayısı')),
+                ('active_users', models.PositiveIntegerField(default=0, verbose_name='Aktif Kullanıcı Sayısı')),
+                ('active_subscriptions', models.PositiveIntegerField(default=0, verbose_name='Aktif Abonelik Sayısı')),
+                ('active_customers', models.PositiveIntegerField(default=0, verbose_name='Aktif Müşteri Sayısı')),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True, verbose_name='Son Uzlaştırma')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Şirket İstatistiği',
+                'verbose_name_plural': 'Şirket İstatistikleri',
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchStats',
+            fields=[
+                ('branch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='companies.branch')),
+                ('users', models.PositiveIntegerField(default=0, verbose_name='Kullanıcı Sayısı')),
+                ('active_users', models.PositiveIntegerField(default=0, verbose_name='Aktif Kullanıcı Sayısı')),
+                ('active_customers', models.PositiveIntegerField(default=0, verbose_name='Aktif Müşteri Sayısı')),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True, verbose_name='Son Uzlaştırma')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_stats', to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Şube İstatistiği',
+                'verbose_name_plural': 'Şube İstatistikleri',
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_company_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feature', models.CharField(max_length=100, verbose_name='Feature')),
+                ('total', models.BigIntegerField(default=0, verbose_name='Toplam Kullanım')),
+                ('events', models.PositiveIntegerField(default=0, verbose_name='Kayıt Sayısı')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('date', models.DateField(verbose_name='Gün')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Günlük Kullanım Özeti',
+                'verbose_name_plural': 'Günlük Kullanım Özetleri',
+                'default_related_name': 'usage_daily',
+                'constraints': [models.UniqueConstraint(fields=('company', 'date', 'feature'), name='usage_daily_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UsageMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feature', models.CharField(max_length=100, verbose_name='Feature')),
+                ('total', models.BigIntegerField(default=0, verbose_name='Toplam Kullanım')),
+                ('events', models.PositiveIntegerField(default=0, verbose_name='Kayıt Sayısı')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('month', models.DateField(verbose_name='Ay (ilk gün)')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Aylık Kullanım Özeti',
+                'verbose_name_plural': 'Aylık Kullanım Özetleri',
+                'default_related_name': 'usage_monthly',
+                'constraints': [models.UniqueConstraint(fields=('company', 'month', 'feature'), name='usage_monthly_unique')],
+            },
+        ),
+    ]
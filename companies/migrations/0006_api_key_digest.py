@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:57
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_digests(apps, schema_editor):
+    """Mevcut anahtarların SHA-256 özetini yazar."""
+    APIKey = apps.get_model('companies', 'APIKey')
+
+    keys = list(APIKey.objects.filter(api_key_digest__isnull=True).only('pk', 'api_key'))
+    for key in keys:
+        key.api_key_digest = hashlib.sha256(key.api_key.encode()).hexdigest()
+    APIKey.objects.bulk_update(keys, ['api_key_digest'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0005_usage_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='api_key_digest',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True, verbose_name='API Anahtarı Özeti'),
+        ),
+        migrations.RunPython(backfill_digests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0006_api_key_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageIngestKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Anahtar')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_ingest_keys', to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Kullanım Ölçüm Anahtarı',
+                'verbose_name_plural': 'Kullanım Ölçüm Anahtarları',
+                'indexes': [models.Index(fields=['created_at'], name='companies_u_created_46993a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'key'), name='usage_ingest_key_unique')],
+            },
+        ),
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+import secrets
 from django.db import models
 from django.core.validators import MinLengthValidator, MaxLengthValidator
 from django.utils.translation import gettext_lazy as _
@@ -235,6 +237,8 @@ class APIKey(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='api_keys')
     key_name = models.CharField(_("API Anahtarı Adı"), max_length=100)
     api_key = models.CharField(_("API Anahtarı"), max_length=64, unique=True)
+    # Kimlik doğrulama anahtarı bu özet üzerinden arar (companies.authentication)
+    api_key_digest = models.CharField(_("API Anahtarı Özeti"), max_length=64, unique=True, null=True, editable=False)
     is_active = models.BooleanField(_("Aktif mi?"), default=True)
     expires_at = models.DateTimeField(_("Son Kullanma Tarihi"), null=True, blank=True)
     last_used_at = models.DateTimeField(_("Son Kullanım Tarihi"), null=True, blank=True)
@@ -248,6 +252,21 @@ class APIKey(models.Model):
     def __str__(self):
         return f"{self.company.name} - {self.key_name}"
 
+    @staticmethod
+    def digest(raw_key):
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        if not self.api_key:
+            self.api_key = secrets.token_hex(32)
+        digest = self.digest(self.api_key)
+        if digest != self.api_key_digest:
+            self.api_key_digest = digest
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'api_key' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'api_key_digest'}
+        super().save(*args, **kwargs)
+
 class APIUsage(models.Model):
     api_key = models.ForeignKey(APIKey, on_delete=models.CASCADE, related_name='usages')
     endpoint = models.CharField(_("Endpoint"), max_length=255)
@@ -360,4 +379,105 @@ class Integration(models.Model):
         unique_together = ('company', 'integration_type', 'provider')
 
     def __str__(self):
-        return f"{self.company.name} - {self.get_integration_type_display()} - {self.provider}"
\ No newline at end of file
+        return f"{self.company.name} - {self.get_integration_type_display()} - {self.provider}"
+
+class CompanyStats(models.Model):
+    """
+    Şirket panosu sayaçları. companies.stats sinyalleri kayıt değiştikçe farkları
+    uygular; sapmalar `reconcile_company_stats` komutuyla düzeltilir.
+    """
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    branches = models.PositiveIntegerField(_("Şube Sayısı"), default=0)
+    users = models.PositiveIntegerField(_("Kullanıcı Sayısı"), default=0)
+    active_users = models.PositiveIntegerField(_("Aktif Kullanıcı Sayısı"), default=0)
+    active_subscriptions = models.PositiveIntegerField(_("Aktif Abonelik Sayısı"), default=0)
+    active_customers = models.PositiveIntegerField(_("Aktif Müşteri Sayısı"), default=0)
+    reconciled_at = models.DateTimeField(_("Son Uzlaştırma"), null=True, blank=True)
+    updated_at = models.DateTimeField(_("Güncellenme Tarihi"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Şirket İstatistiği")
+        verbose_name_plural = _("Şirket İstatistikleri")
+
+    def __str__(self):
+        return f"{self.company_id} istatistikleri"
+
+class BranchStats(models.Model):
+    branch = models.OneToOneField(Branch, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='branch_stats')
+    users = models.PositiveIntegerField(_("Kullanıcı Sayısı"), default=0)
+    active_users = models.PositiveIntegerField(_("Aktif Kullanıcı Sayısı"), default=0)
+    active_customers = models.PositiveIntegerField(_("Aktif Müşteri Sayısı"), default=0)
+    reconciled_at = models.DateTimeField(_("Son Uzlaştırma"), null=True, blank=True)
+    updated_at = models.DateTimeField(_("Güncellenme Tarihi"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Şube İstatistiği")
+        verbose_name_plural = _("Şube İstatistikleri")
+
+    def __str__(self):
+        return f"{self.branch_id} istatistikleri"
+
+class UsageRollup(models.Model):
+    """
+    Usage kayıtlarının (şirket, özellik, dönem) toplamı. companies.usage sinyalleri
+    kayıt geldikçe farkları uygular; `rebuild_usage_rollups` ham kayıtlardan yeniden kurar.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    feature = models.CharField(_("Feature"), max_length=100)
+    total = models.BigIntegerField(_("Toplam Kullanım"), default=0)
+    events = models.PositiveIntegerField(_("Kayıt Sayısı"), default=0)
+    updated_at = models.DateTimeField(_("Güncellenme Tarihi"), auto_now=True)
+
+    class Meta:
+        abstract = True
+
+class UsageDailyRollup(UsageRollup):
+    date = models.DateField(_("Gün"))
+
+    class Meta:
+        verbose_name = _("Günlük Kullanım Özeti")
+        verbose_name_plural = _("Günlük Kullanım Özetleri")
+        default_related_name = 'usage_daily'
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'date', 'feature'], name='usage_daily_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} - {self.feature} - {self.date}"
+
+class UsageMonthlyRollup(UsageRollup):
+    month = models.DateField(_("Ay (ilk gün)"))
+
+    class Meta:
+        verbose_name = _("Aylık Kullanım Özeti")
+        verbose_name_plural = _("Aylık Kullanım Özetleri")
+        default_related_name = 'usage_monthly'
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'month', 'feature'], name='usage_monthly_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} - {self.feature} - {self.month:%Y-%m}"
+
+class UsageIngestKey(models.Model):
+    """
+    usages/ingest/ isteklerinin Idempotency-Key değerleri. Olaylarla aynı transaction'da
+    yazılır; anahtar yalnızca olaylar kalıcı olunca görülmüş sayılır.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='usage_ingest_keys')
+    key = models.CharField(_("Anahtar"), max_length=255)
+    created_at = models.DateTimeField(_("Oluşturulma Tarihi"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Kullanım Ölçüm Anahtarı")
+        verbose_name_plural = _("Kullanım Ölçüm Anahtarları")
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'key'], name='usage_ingest_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} - {self.key}"
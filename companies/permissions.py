@@ -1,48 +1,49 @@
 from rest_framework import permissions
+from core.tenant import TenantContext
+
+# Yetki kontrolleri istek başına bir kez kurulan tenant bağlamındaki kimlikleri karşılaştırır
 
 class IsCompanyAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_superuser or request.user.is_company_admin
-        )
+        tenant = TenantContext.for_request(request)
+        return tenant.is_superuser or tenant.is_company_admin
 
 class IsBranchAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_superuser or 
-            request.user.is_company_admin or 
-            request.user.is_branch_admin
-        )
+        tenant = TenantContext.for_request(request)
+        return tenant.is_superuser or tenant.is_company_admin or tenant.is_branch_admin
 
 class IsCompanyMember(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.company is not None
+        return TenantContext.for_request(request).company_id is not None
 
 class CanManageCompany(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if not request.user.is_authenticated:
+        tenant = TenantContext.for_request(request)
+        if not tenant.is_authenticated:
             return False
         
-        if request.user.is_superuser:
+        if tenant.is_superuser:
             return True
             
         if request.method in permissions.SAFE_METHODS:
-            return request.user.company == obj
+            return tenant.owns_company(obj.pk)
             
-        return request.user.is_company_admin and request.user.company == obj
+        return tenant.is_company_admin and tenant.owns_company(obj.pk)
 
 class CanManageBranch(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if not request.user.is_authenticated:
+        tenant = TenantContext.for_request(request)
+        if not tenant.is_authenticated:
             return False
             
-        if request.user.is_superuser:
+        if tenant.is_superuser:
             return True
             
         if request.method in permissions.SAFE_METHODS:
-            return request.user.company == obj.company
+            return tenant.owns_company(obj.company_id)
             
-        if request.user.is_company_admin:
-            return request.user.company == obj.company
+        if tenant.is_company_admin:
+            return tenant.owns_company(obj.company_id)
             
-        return request.user.is_branch_admin and request.user.branch == obj 
\ No newline at end of file
+        return tenant.is_branch_admin and tenant.owns_branch(obj.pk)
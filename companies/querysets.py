@@ -0,0 +1,54 @@
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Liste serializer'larının okuduğu sayaçlar. Her sayaç ilişkili tabloda korelasyonlu bir
+# COUNT alt sorgusudur; satır başına ayrı sorgu atılmaz ve iki ters ilişki aynı anda
+# JOIN edilmediği için satırlar çoğalmaz.
+
+
+def count_subquery(queryset, fk, filter=None):
+    counted = queryset.filter(**{fk: OuterRef('pk')}).order_by().values(fk).annotate(
+        total=Count('pk', filter=filter)
+    ).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def with_company_counters(queryset):
+    from accounts.models import CustomUser
+    from .models import Branch
+
+    return queryset.annotate(
+        branches_count=count_subquery(Branch.objects.all(), 'company'),
+        active_users_count=count_subquery(CustomUser.objects.all(), 'company', Q(is_active=True)),
+    )
+
+
+def with_company_detail(queryset):
+    from .models import Branch
+
+    return with_company_counters(queryset).annotate(
+        main_branch_id=Subquery(
+            Branch.objects.filter(company=OuterRef('pk'), name="Merkez").order_by('pk').values('pk')[:1]
+        ),
+    )
+
+
+def with_branch_counters(queryset):
+    from accounts.models import CustomUser
+
+    return queryset.annotate(users_count=count_subquery(CustomUser.objects.all(), 'branch'))
+
+
+def with_plan_counters(queryset):
+    from .models import Company
+
+    return queryset.annotate(
+        active_companies_count=count_subquery(Company.objects.all(), 'current_plan', Q(is_active=True))
+    )
+
+
+def annotated(obj, name, fallback):
+    """Liste sorgusundaki anotasyonu okur; anotasyonsuz örneklerde (create/update) sayacı hesaplar."""
+    if name in obj.__dict__:
+        return obj.__dict__[name]
+    return fallback()
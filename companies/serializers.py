@@ -6,8 +6,10 @@ from .models import (
 )
 import uuid
 from drf_yasg.utils import swagger_serializer_method
+from core.reference_cache import CachedReferenceMixin
+from .querysets import annotated
 
-class CurrencySerializer(serializers.ModelSerializer):
+class CurrencySerializer(CachedReferenceMixin, serializers.ModelSerializer):
     """
     Para birimi için temel serializer.
     Tüm para birimi bilgilerini içerir.
@@ -33,7 +35,7 @@ class CurrencySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Sembol boş olamaz.")
         return value
 
-class CurrencyListSerializer(serializers.ModelSerializer):
+class CurrencyListSerializer(CachedReferenceMixin, serializers.ModelSerializer):
     """
     Para birimi listesi için özet serializer.
     Sadece temel bilgileri içerir.
@@ -43,26 +45,26 @@ class CurrencyListSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'symbol']
         read_only_fields = ['id']
 
-class CitySerializer(serializers.ModelSerializer):
+class CitySerializer(CachedReferenceMixin, serializers.ModelSerializer):
     class Meta:
         model = City
         fields = '__all__'
 
-class DistrictSerializer(serializers.ModelSerializer):
+class DistrictSerializer(CachedReferenceMixin, serializers.ModelSerializer):
     city_detail = CitySerializer(source='city', read_only=True)
 
     class Meta:
         model = District
         fields = ('id', 'name', 'city', 'city_detail', 'code')
 
-class NeighborhoodSerializer(serializers.ModelSerializer):
+class NeighborhoodSerializer(CachedReferenceMixin, serializers.ModelSerializer):
     district_detail = DistrictSerializer(source='district', read_only=True)
 
     class Meta:
         model = Neighborhood
         fields = ('id', 'name', 'district', 'district_detail', 'code')
 
-class PlanSerializer(serializers.ModelSerializer):
+class PlanSerializer(CachedReferenceMixin, serializers.ModelSerializer):
     class Meta:
         model = Plan
         fields = '__all__'
@@ -75,7 +77,7 @@ class PlanDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_active_companies_count(self, obj):
-        return obj.companies.filter(is_active=True).count()
+        return annotated(obj, 'active_companies_count', lambda: obj.companies.filter(is_active=True).count())
 
 # Basit Company Serializer (accounts app için)
 class CompanyBasicSerializer(serializers.ModelSerializer):
@@ -103,10 +105,10 @@ class CompanyListSerializer(serializers.ModelSerializer):
                  'branches_count', 'active_users_count', 'created_at')
 
     def get_branches_count(self, obj):
-        return obj.branches.count()
+        return annotated(obj, 'branches_count', obj.branches.count)
 
     def get_active_users_count(self, obj):
-        return obj.users.filter(is_active=True).count()
+        return annotated(obj, 'active_users_count', lambda: obj.users.filter(is_active=True).count())
 
 class CompanyDetailSerializer(serializers.ModelSerializer):
     city_detail = CitySerializer(source='city', read_only=True)
@@ -132,16 +134,17 @@ class CompanyDetailSerializer(serializers.ModelSerializer):
         if hasattr(self, 'main_branch_id'):
             return self.main_branch_id
         # Mevcut instance için merkez şubeyi bul
-        main_branch = obj.branches.filter(name="Merkez").first()
-        return main_branch.id if main_branch else None
+        return annotated(obj, 'main_branch_id', lambda: obj.branches.filter(name="Merkez").values_list(
+            'id', flat=True
+        ).first())
 
     @swagger_serializer_method(serializer_or_field=serializers.IntegerField())
     def get_branches_count(self, obj):
-        return obj.branches.count()
+        return annotated(obj, 'branches_count', obj.branches.count)
 
     @swagger_serializer_method(serializer_or_field=serializers.IntegerField())
     def get_active_users_count(self, obj):
-        return obj.users.filter(is_active=True).count()
+        return annotated(obj, 'active_users_count', lambda: obj.users.filter(is_active=True).count())
 
     @swagger_serializer_method(serializer_or_field=serializers.FloatField())
     def get_storage_usage_gb(self, obj):
@@ -194,7 +197,7 @@ class BranchListSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'company_name', 'city_name', 'users_count', 'created_at')
 
     def get_users_count(self, obj):
-        return obj.users.count()
+        return annotated(obj, 'users_count', obj.users.count)
 
 class BranchDetailSerializer(serializers.ModelSerializer):
     company_detail = CompanyListSerializer(source='company', read_only=True)
@@ -208,7 +211,7 @@ class BranchDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_users_count(self, obj):
-        return obj.users.count()
+        return annotated(obj, 'users_count', obj.users.count)
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
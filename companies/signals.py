@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from core.reference_cache import reference_cache
+from . import audit, stats, usage
+from .authentication import api_key_cache
+from .models import APIKey, Currency, City, District, Neighborhood, Plan
+
+# Referans tablolar okuma önbelleğinden servis edilir; kayıt değiştiğinde sürüm artırılır
+reference_cache.register(Currency)
+reference_cache.register(City)
+reference_cache.register(District, select_related=['city'])
+reference_cache.register(Neighborhood, select_related=['district__city'])
+reference_cache.register(Plan)
+
+# Pano sayaçları (CompanyStats, BranchStats) kayıt değiştikçe güncellenir
+stats.register()
+
+# Kullanım raporu özetleri (UsageDailyRollup, UsageMonthlyRollup) Usage kayıtlarıyla güncellenir
+usage.register()
+
+
+# records ve operations modellerindeki değişiklikler ve girişler AuditLog'a yazılır
+audit.register()
+
+
+# API anahtarı değişince (pasifleştirme, süre, anahtar yenileme) süreç önbelleği boşaltılır;
+# diğer süreçler CACHE_TTL sonunda güncel satırı okur
+def invalidate_api_keys(sender, instance, **kwargs):
+    api_key_cache.clear()
+
+
+post_save.connect(invalidate_api_keys, sender=APIKey, dispatch_uid='api-key-cache')
+post_delete.connect(invalidate_api_keys, sender=APIKey, dispatch_uid='api-key-cache')
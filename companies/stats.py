@@ -0,0 +1,361 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+from .models import Branch, BranchStats, Company, CompanyStats
+from .querysets import count_subquery
+
+# Şirket ve şube panosu sayaçları (CompanyStats, BranchStats).
+# İzlenen her model yüklenirken ilgili alanlarının görüntüsü saklanır; kayıt/silme sonrası
+# eski ve yeni görüntünün katkı farkı tek UPDATE ile sayaç tablosuna uygulanır.
+# Sayaç satırı yoksa fark atlanır; satır okunurken veya reconcile sırasında sayımla kurulur.
+
+MISSING = object()
+STATS_MODELS = {'company': CompanyStats, 'branch': BranchStats}
+# register() ile doldurulur: {'branch', 'user', 'subscription', 'customer', 'operation'} -> CounterTracker
+trackers = {}
+
+
+def apply_deltas(deltas):
+    """{(kapsam, pk, alan): fark} farklarını kapsam başına tek UPDATE ile uygular."""
+    grouped = {}
+    for (scope, pk, field), delta in deltas.items():
+        if pk is not None and delta:
+            grouped.setdefault(scope, {}).setdefault(field, {})[pk] = delta
+    now = timezone.now()
+    for scope, fields in grouped.items():
+        pks = {pk for changes in fields.values() for pk in changes}
+        updates = {
+            field: Greatest(F(field) + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in changes.items()],
+                default=Value(0),
+                output_field=IntegerField()
+            ), Value(0))
+            for field, changes in fields.items()
+        }
+        STATS_MODELS[scope].objects.filter(pk__in=pks).update(updated_at=now, **updates)
+
+
+class CounterTracker:
+    """
+    Bir modelin sayaçlara katkısını izler. `contributions(states)` verilen alan görüntülerinin
+    katkılarını {(kapsam, pk, alan): adet} Counter'ı olarak döndürür; farklar `apply` ile yazılır.
+    """
+
+    def __init__(self, model, fields, contributions, apply=None, uid_prefix='company-stats'):
+        self.model = model
+        self.fields = fields
+        self.contributions = contributions
+        self.apply = apply or apply_deltas
+        uid = f'{uid_prefix}:{model._meta.label_lower}'
+        post_init.connect(self.on_init, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(self.on_save, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self.on_delete, sender=model, weak=False, dispatch_uid=uid)
+
+    def snapshot(self, instance):
+        return tuple(instance.__dict__.get(field, MISSING) for field in self.fields)
+
+    def on_init(self, sender, instance, **kwargs):
+        instance._stats_state = self.snapshot(instance) if instance.pk is not None else None
+
+    def diff(self, old, new, instance=None):
+        delta = Counter()
+        if new is not None:
+            delta.update(self.contributions([new]))
+        if old is not None:
+            delta.subtract(self.contributions([old]))
+        return delta
+
+    def on_save(self, sender, instance, created, raw=False, **kwargs):
+        new = self.snapshot(instance)
+        old = None if created else getattr(instance, '_stats_state', None)
+        instance._stats_state = new
+        if raw or MISSING in new or (old is not None and MISSING in old) or old == new:
+            # Ertelenmiş alanla kaydedilen örneklerin farkı bilinemez; reconcile düzeltir
+            return
+        self.apply(self.diff(old, new, instance))
+
+    def on_delete(self, sender, instance, **kwargs):
+        old = getattr(instance, '_stats_state', None) or self.snapshot(instance)
+        if MISSING not in old:
+            self.apply(self.diff(old, None, instance))
+
+    def record_created(self, instances):
+        """bulk_create sinyal göndermez; toplu eklemelerden sonra çağrılır."""
+        states = [self.snapshot(instance) for instance in instances]
+        for instance, state in zip(instances, states):
+            instance._stats_state = state
+        self.apply(self.contributions(states))
+
+
+class MoveTracker(CounterTracker):
+    """
+    Yalnızca mevcut kaydın şirket/şube değiştirmesini izler. Oluşturma ve silmede katkı
+    alt kayıtların kendi izleyicilerinden gelir (ör. Operation silinince müşterileri düşer).
+    """
+
+    def on_save(self, sender, instance, created, raw=False, **kwargs):
+        if created:
+            instance._stats_state = self.snapshot(instance)
+            return
+        super().on_save(sender, instance, created, raw=raw, **kwargs)
+
+    def on_delete(self, sender, instance, **kwargs):
+        pass
+
+
+class CustomerTracker(CounterTracker):
+    """
+    OperationCustomer katkısı operasyonun şirket/şubesine yazılır. Bir kayıt/silme geçişinde
+    eski ve yeni görüntünün operasyonları birlikte çözülür: örneğe yüklenmiş operasyon varsa
+    sorgu atılmaz, yoksa tek values_list sorgusu yeterlidir.
+    """
+
+    def diff(self, old, new, instance=None):
+        states = [state for state in (old, new) if state is not None]
+        scopes = operation_scopes({operation_id for operation_id, is_active in states if is_active}, instance)
+        delta = Counter()
+        if new is not None:
+            delta.update(customer_contributions([new], scopes))
+        if old is not None:
+            delta.subtract(customer_contributions([old], scopes))
+        return delta
+
+
+def branch_contributions(states):
+    return Counter(('company', company_id, 'branches') for (company_id,) in states)
+
+
+def user_contributions(states):
+    counts = Counter()
+    for company_id, branch_id, is_active in states:
+        counts[('company', company_id, 'users')] += 1
+        counts[('branch', branch_id, 'users')] += 1
+        if is_active:
+            counts[('company', company_id, 'active_users')] += 1
+            counts[('branch', branch_id, 'active_users')] += 1
+    return counts
+
+
+def subscription_contributions(states):
+    return Counter(('company', company_id, 'active_subscriptions') for company_id, is_active in states if is_active)
+
+
+def operation_scopes(operation_ids, instance=None):
+    """{operation_id: (company_id, branch_id)}; `instance` üzerinde yüklü operasyon sorgusuz kullanılır."""
+    from operations.models import Operation
+
+    scopes = {}
+    operation = instance._state.fields_cache.get('operation') if instance is not None else None
+    if operation is not None and operation.pk in operation_ids:
+        scope = (operation.__dict__.get('company_id', MISSING), operation.__dict__.get('branch_id', MISSING))
+        if MISSING not in scope:
+            scopes[operation.pk] = scope
+    missing = set(operation_ids) - set(scopes)
+    if missing:
+        scopes.update(
+            (pk, (company_id, branch_id))
+            for pk, company_id, branch_id in Operation.objects.filter(pk__in=missing).values_list(
+                'pk', 'company_id', 'branch_id'
+            )
+        )
+    return scopes
+
+
+def customer_contributions(states, scopes=None):
+    active = Counter(operation_id for operation_id, is_active in states if is_active)
+    if not active:
+        return Counter()
+    if scopes is None:
+        scopes = operation_scopes(active)
+    counts = Counter()
+    for operation_id, count in active.items():
+        if operation_id not in scopes:
+            continue
+        company_id, branch_id = scopes[operation_id]
+        counts[('company', company_id, 'active_customers')] += count
+        counts[('branch', branch_id, 'active_customers')] += count
+    return counts
+
+
+def operation_contributions(states):
+    from operations.models import OperationCustomer
+
+    active = dict(
+        OperationCustomer.objects.filter(operation_id__in={pk for pk, _, _ in states}, is_active=True)
+        .values('operation_id').annotate(count=Count('pk')).values_list('operation_id', 'count')
+    )
+    counts = Counter()
+    for pk, company_id, branch_id in states:
+        counts[('company', company_id, 'active_customers')] += active.get(pk, 0)
+        counts[('branch', branch_id, 'active_customers')] += active.get(pk, 0)
+    return counts
+
+
+def create_stats_rows(sender, instance, created, raw=False, **kwargs):
+    # Yeni şirket/şubenin sayaçları sıfırdan başlar; sonraki kayıtlar fark olarak eklenir
+    if not created or raw:
+        return
+    if sender is Company:
+        CompanyStats.objects.get_or_create(company=instance)
+    else:
+        BranchStats.objects.get_or_create(branch=instance, defaults={'company_id': instance.company_id})
+
+
+def register():
+    from accounts.models import CustomUser
+    from operations.models import Operation, OperationCustomer
+    from .models import Subscription
+
+    # Satırlar sayaç güncellemesinden önce kurulmalı; izleyicilerden önce bağlanır
+    post_save.connect(create_stats_rows, sender=Company, dispatch_uid='company-stats:create-company')
+    post_save.connect(create_stats_rows, sender=Branch, dispatch_uid='company-stats:create-branch')
+    trackers.update({
+        'branch': CounterTracker(Branch, ('company_id',), branch_contributions),
+        'user': CounterTracker(CustomUser, ('company_id', 'branch_id', 'is_active'), user_contributions),
+        'subscription': CounterTracker(Subscription, ('company_id', 'is_active'), subscription_contributions),
+        'customer': CustomerTracker(OperationCustomer, ('operation_id', 'is_active'), customer_contributions),
+        # Operasyon başka şirket/şubeye taşınırsa aktif müşterileri de taşınır
+        'operation': MoveTracker(Operation, ('id', 'company_id', 'branch_id'), operation_contributions),
+    })
+
+
+def record_created(kind, instances):
+    """bulk_create ile eklenen kayıtların sayaç katkısını uygular."""
+    trackers[kind].record_created(instances)
+
+
+def company_stat_counts():
+    from accounts.models import CustomUser
+    from operations.models import OperationCustomer
+    from .models import Subscription
+
+    return {
+        'branches': count_subquery(Branch.objects.all(), 'company'),
+        'users': count_subquery(CustomUser.objects.all(), 'company'),
+        'active_users': count_subquery(CustomUser.objects.all(), 'company', Q(is_active=True)),
+        'active_subscriptions': count_subquery(Subscription.objects.all(), 'company', Q(is_active=True)),
+        'active_customers': count_subquery(
+            OperationCustomer.objects.all(), 'operation__company', Q(is_active=True)
+        ),
+    }
+
+
+def branch_stat_counts():
+    from accounts.models import CustomUser
+    from operations.models import OperationCustomer
+
+    return {
+        'users': count_subquery(CustomUser.objects.all(), 'branch'),
+        'active_users': count_subquery(CustomUser.objects.all(), 'branch', Q(is_active=True)),
+        'active_customers': count_subquery(
+            OperationCustomer.objects.all(), 'operation__branch', Q(is_active=True)
+        ),
+    }
+
+
+def reconcile(company_ids=None):
+    """
+    Verilen (veya tüm) şirketlerin ve şubelerinin sayaçlarını kaynak tablolardan sayarak yazar.
+    Şirket başına iki sorgu (sayım + upsert) ve şube için aynısı çalışır.
+    """
+    now = timezone.now()
+    companies = Company.objects.all()
+    branches = Branch.objects.all()
+    if company_ids is not None:
+        companies = companies.filter(pk__in=company_ids)
+        branches = branches.filter(company_id__in=company_ids)
+
+    # Anotasyon adları ters ilişki adlarıyla (branches, users) çakışmasın diye önekle okunur
+    company_fields = company_stat_counts()
+    company_rows = [
+        CompanyStats(
+            company_id=row['pk'], reconciled_at=now, updated_at=now,
+            **{field: row[f'stat_{field}'] for field in company_fields}
+        )
+        for row in companies.values('pk', **{f'stat_{field}': count for field, count in company_fields.items()})
+    ]
+    branch_fields = branch_stat_counts()
+    branch_rows = [
+        BranchStats(
+            branch_id=row['pk'], company_id=row['company_id'], reconciled_at=now, updated_at=now,
+            **{field: row[f'stat_{field}'] for field in branch_fields}
+        )
+        for row in branches.values(
+            'pk', 'company_id', **{f'stat_{field}': count for field, count in branch_fields.items()}
+        )
+    ]
+    with transaction.atomic():
+        CompanyStats.objects.bulk_create(
+            company_rows, update_conflicts=True, unique_fields=['company'],
+            update_fields=[*company_fields, 'reconciled_at', 'updated_at']
+        )
+        BranchStats.objects.bulk_create(
+            branch_rows, update_conflicts=True, unique_fields=['branch'],
+            update_fields=[*branch_fields, 'company', 'reconciled_at', 'updated_at']
+        )
+    return len(company_rows), len(branch_rows)
+
+
+def _cached_stats(instance, model, **lookup):
+    # select_related('stats') ile gelmişse ek sorgu atılmaz
+    stats = instance._state.fields_cache.get('stats', MISSING)
+    if stats is MISSING:
+        stats = model.objects.filter(**lookup).first()
+    return stats
+
+
+def company_stats(company):
+    """Şirketin sayaç satırı; yoksa sayımla kurulur."""
+    stats = _cached_stats(company, CompanyStats, company=company)
+    if stats is None:
+        reconcile([company.pk])
+        stats = CompanyStats.objects.get(company=company)
+    return stats
+
+
+def branch_stats(branch):
+    stats = _cached_stats(branch, BranchStats, branch=branch)
+    if stats is None:
+        reconcile([branch.company_id])
+        stats = BranchStats.objects.get(branch=branch)
+    return stats
+
+
+def company_payload(company, stats):
+    return {
+        'total_branches': stats.branches,
+        'total_users': stats.users,
+        'active_users': stats.active_users,
+        'active_subscriptions': stats.active_subscriptions,
+        'active_customers': stats.active_customers,
+        'storage_usage_gb': round(company.storage_usage / (1024 * 1024 * 1024), 2),
+        'updated_at': stats.updated_at,
+    }
+
+
+def branch_payload(stats):
+    return {
+        'total_users': stats.users,
+        'active_users': stats.active_users,
+        'active_customers': stats.active_customers,
+        'updated_at': stats.updated_at,
+    }
+
+
+def dashboard(company):
+    """Şirket ve tüm şubelerinin sayaçları; şubeler tek sorguda sayaç satırlarıyla okunur."""
+    stats = company_stats(company)
+    branches = list(Branch.objects.filter(company=company).select_related('stats').order_by('pk'))
+    if any(branch._state.fields_cache.get('stats') is None for branch in branches):
+        reconcile([company.pk])
+        branches = list(Branch.objects.filter(company=company).select_related('stats').order_by('pk'))
+    return {
+        **company_payload(company, stats),
+        'branches': [
+            {'id': branch.pk, 'name': branch.name, **branch_payload(branch.stats)}
+            for branch in branches
+        ],
+    }
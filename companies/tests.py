@@ -1,3 +1,627 @@
-from django.test import TestCase
+import uuid
+from asgiref.sync import iscoroutinefunction
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection
+from django.utils import timezone
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from core.reference_cache import reference_cache
+from core.tenant import TenantContext, TenantContextMiddleware, current_tenant
+from records.models import VehicleType
+from records.serializers import VehicleTypeSerializer
+from .models import (
+    City, District, Currency, Company, Branch, BranchStats, CompanyStats, Plan, Subscription,
+    Usage, UsageDailyRollup, UsageIngestKey, UsageMonthlyRollup, APIKey, APIUsage
+)
+from .authentication import APIKeyCache, last_used_recorder
+from .ingest import VALUE_MAX, UsageBuffer, usage_buffer
+from .middleware import APIUsageMiddleware, AuditMiddleware, api_usage_recorder
+from .serializers import DistrictSerializer
 
-# Create your tests here.
+
+class ReferenceCacheTests(TestCase):
+
+    def setUp(self):
+        caches['reference'].clear()
+        self.city = City.objects.create(name='İzmir', code='IZM')
+
+    def test_read_through_and_invalidation(self):
+        currency = Currency.objects.create(code='USD', name='Dolar', symbol='$')
+        self.assertEqual(reference_cache.get(Currency, currency.pk).code, 'USD')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(reference_cache.get(Currency, currency.pk).code, 'USD')
+        self.assertEqual(len(context.captured_queries), 0)
+
+        currency.symbol = 'US$'
+        currency.save()
+        self.assertEqual(reference_cache.get(Currency, currency.pk).symbol, 'US$')
+
+        pk = currency.pk
+        currency.delete()
+        self.assertIsNone(reference_cache.get(Currency, pk))
+
+    def test_nested_serializer_skips_join(self):
+        district = District.objects.create(name='Konak', city=self.city, code='KNK')
+        reference_cache.get(City, self.city.pk)
+
+        district = District.objects.get(pk=district.pk)
+        with CaptureQueriesContext(connection) as context:
+            data = DistrictSerializer(district).data
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(data['city_detail']['name'], 'İzmir')
+
+    def test_vehicle_type_registered(self):
+        vehicle_type = VehicleType.objects.create(name='Otobüs')
+        self.assertTrue(reference_cache.is_registered(VehicleType))
+        self.assertEqual(VehicleTypeSerializer(reference_cache.get(VehicleType, vehicle_type.pk)).data['name'], 'Otobüs')
+
+
+class ReferenceETagTests(TestCase):
+
+    def setUp(self):
+        caches['reference'].clear()
+        City.objects.create(name='İzmir', code='IZM')
+
+    def test_city_list_uses_version_counter(self):
+        client = APIClient()
+        etag = client.get('/api/companies/cities/')['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/companies/cities/', HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 0)
+
+        City.objects.create(name='Ankara', code='ANK')
+        response = client.get('/api/companies/cities/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+
+class TenantContextTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.city = City.objects.create(name='Antalya', code='AYT')
+        cls.companies = [
+            Company.objects.create(
+                name=f'Şirket {index}', tax_number=f'{index:010d}', address='Adres', phone='555',
+                email=f'info{index}@test.com', tenant_id=uuid.uuid4()
+            )
+            for index in range(2)
+        ]
+        cls.branches = [
+            Branch.objects.create(
+                company=company, name='Şube', email=f'sube{company.pk}@test.com',
+                phone='555', address='Adres', city=cls.city
+            )
+            for company in cls.companies
+        ]
+        cls.extra_branch = Branch.objects.create(
+            company=cls.companies[0], name='Şube 2', email='ek-sube@test.com',
+            phone='555', address='Adres', city=cls.city
+        )
+        cls.branch_admin = CustomUser.objects.create_user(
+            username='sube', email='sube@test.com', password='pass12345',
+            company=cls.companies[0], branch=cls.branches[0], is_branch_admin=True
+        )
+        cls.company_admin = CustomUser.objects.create_user(
+            username='yonetici', email='yonetici@test.com', password='pass12345',
+            company=cls.companies[0], is_company_admin=True
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_role_and_ids(self):
+        tenant = TenantContext(self.branch_admin)
+        self.assertEqual(tenant.role, TenantContext.BRANCH_ADMIN)
+        self.assertEqual((tenant.company_id, tenant.branch_id), (self.companies[0].pk, self.branches[0].pk))
+        self.assertEqual(TenantContext(None).role, TenantContext.ANONYMOUS)
+        self.assertIsNone(current_tenant())
+
+    def test_branch_scoping_by_role(self):
+        response = self.client_for(self.branch_admin).get('/api/companies/branches/')
+        self.assertEqual([row['id'] for row in response.data], [self.branches[0].pk])
+
+        response = self.client_for(self.company_admin).get('/api/companies/branches/')
+        self.assertCountEqual(
+            [row['id'] for row in response.data], [self.branches[0].pk, self.extra_branch.pk]
+        )
+
+    def test_object_permission_compares_ids(self):
+        client = self.client_for(self.company_admin)
+        own = client.get(f'/api/companies/companies/{self.companies[0].pk}/')
+        other = client.get(f'/api/companies/companies/{self.companies[1].pk}/')
+        self.assertEqual(own.status_code, 200)
+        self.assertEqual(other.status_code, 404)
+
+        branch_client = self.client_for(self.branch_admin)
+        response = branch_client.patch(f'/api/companies/branches/{self.branches[0].pk}/', {'phone': '444'})
+        self.assertEqual(response.status_code, 200)
+        response = branch_client.patch(f'/api/companies/branches/{self.extra_branch.pk}/', {'phone': '444'})
+        self.assertEqual(response.status_code, 404)
+
+
+    async def test_middlewares_run_async_under_asgi(self):
+        seen = []
+
+        async def view(request):
+            seen.append(current_tenant().company_id)
+            return HttpResponse()
+
+        handler = TenantContextMiddleware(AuditMiddleware(APIUsageMiddleware(view)))
+        self.assertTrue(iscoroutinefunction(handler))
+        request = RequestFactory().get('/')
+        request.user = self.branch_admin
+        response = await handler(request)
+        self.assertEqual((response.status_code, seen), (200, [self.companies[0].pk]))
+        self.assertIsNone(current_tenant())
+
+
+class AnnotatedCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.city = City.objects.create(name='Antalya', code='AYT')
+        cls.plan = Plan.objects.create(
+            name='Pro', plan_type='professional', description='Pro', price=100,
+            max_users=50, max_storage=10, max_branches=5
+        )
+        cls.superuser = CustomUser.objects.create_superuser(
+            username='admin', email='admin@test.com', password='pass12345'
+        )
+        cls.add_companies(2)
+
+    @classmethod
+    def add_companies(cls, count):
+        start = Company.objects.count()
+        for index in range(start, start + count):
+            company = Company.objects.create(
+                name=f'Şirket {index}', tax_number=f'{index:010d}', address='Adres', phone='555',
+                email=f'info{index}@test.com', tenant_id=uuid.uuid4(), city=cls.city, current_plan=cls.plan,
+                is_active=index % 2 == 0
+            )
+            branch = Branch.objects.create(
+                company=company, name='Merkez', email=f'merkez{index}@test.com', phone='555', address='Adres',
+                city=cls.city
+            )
+            for user_index in range(2):
+                CustomUser.objects.create_user(
+                    username=f'personel{index}-{user_index}', email=f'personel{index}-{user_index}@test.com',
+                    password='x', company=company, branch=branch, is_active=user_index == 0
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.superuser)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        _, companies_before = self.count_queries('/api/companies/companies/')
+        _, branches_before = self.count_queries('/api/companies/branches/')
+        self.add_companies(4)
+        companies, companies_after = self.count_queries('/api/companies/companies/')
+        branches, branches_after = self.count_queries('/api/companies/branches/')
+
+        self.assertEqual(companies_before, companies_after)
+        self.assertEqual(branches_before, branches_after)
+        self.assertEqual(len(companies.data), 6)
+        self.assertTrue(all(row['branches_count'] == 1 and row['active_users_count'] == 1 for row in companies.data))
+        self.assertTrue(all(row['users_count'] == 2 for row in branches.data))
+
+    def test_detail_counters(self):
+        company = Company.objects.first()
+        response, _ = self.count_queries(f'/api/companies/companies/{company.pk}/')
+        self.assertEqual(response.data['branches_count'], 1)
+        self.assertEqual(response.data['main_branch_id'], company.branches.get().pk)
+
+        response, _ = self.count_queries(f'/api/companies/plans/{self.plan.pk}/')
+        self.assertEqual(response.data['active_companies_count'], 1)
+
+
+class CompanyStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = Plan.objects.create(
+            name='Pro', plan_type='professional', description='Pro', price=100,
+            max_users=50, max_storage=10, max_branches=5
+        )
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.branches = [
+            Branch.objects.create(company=cls.company, name=name, email=f'{name.lower()}@testtur.com',
+                                  phone='555', address='Adres')
+            for name in ('Merkez', 'Sahil')
+        ]
+        cls.admin = CustomUser.objects.create_user(
+            username='yonetici', email='yonetici@testtur.com', password='pass12345',
+            company=cls.company, branch=cls.branches[0], is_company_admin=True
+        )
+
+    def counters(self):
+        company = CompanyStats.objects.get(company=self.company)
+        branches = {stats.branch_id: stats for stats in BranchStats.objects.filter(company=self.company)}
+        return company, branches
+
+    def test_signals_apply_increments(self):
+        user = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='x',
+            company=self.company, branch=self.branches[0]
+        )
+        Subscription.objects.create(
+            company=self.company, plan=self.plan, subscription_type='monthly',
+            start_date=date(2030, 1, 1), end_date=date(2030, 2, 1)
+        )
+        company, branches = self.counters()
+        self.assertEqual((company.branches, company.users, company.active_users, company.active_subscriptions),
+                         (2, 2, 2, 1))
+        self.assertEqual(branches[self.branches[0].pk].users, 2)
+
+        user.branch = self.branches[1]
+        user.is_active = False
+        user.save()
+        company, branches = self.counters()
+        self.assertEqual((company.users, company.active_users), (2, 1))
+        self.assertEqual((branches[self.branches[0].pk].users, branches[self.branches[1].pk].users), (1, 1))
+        self.assertEqual(branches[self.branches[1].pk].active_users, 0)
+
+        user.delete()
+        company, branches = self.counters()
+        self.assertEqual((company.users, branches[self.branches[1].pk].users), (1, 0))
+
+    def test_statistics_and_dashboard_read_counters(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'/api/companies/companies/{self.company.pk}/statistics/')
+        self.assertEqual(response.data['total_branches'], 2)
+        self.assertEqual(len([q for q in context.captured_queries if 'stats' in q['sql']]), 1)
+
+        response = client.get(f'/api/companies/companies/{self.company.pk}/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([branch['total_users'] for branch in response.data['branches']], [1, 0])
+
+    def test_reconcile_repairs_drift_and_missing_rows(self):
+        CompanyStats.objects.filter(company=self.company).update(users=40, active_users=40)
+        BranchStats.objects.filter(branch=self.branches[1]).delete()
+        call_command('reconcile_company_stats', stdout=StringIO())
+        company, branches = self.counters()
+        self.assertEqual((company.users, company.active_users), (1, 1))
+        self.assertIn(self.branches[1].pk, branches)
+        self.assertIsNotNone(company.reconciled_at)
+
+
+class UsageRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        plan = Plan.objects.create(
+            name='Pro', plan_type='professional', description='Pro', price=100,
+            max_users=50, max_storage=10, max_branches=5
+        )
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.subscription = Subscription.objects.create(
+            company=cls.company, plan=plan, subscription_type='monthly',
+            start_date=date(2030, 1, 1), end_date=date(2031, 1, 1)
+        )
+        cls.admin = CustomUser.objects.create_user(
+            username='yonetici', email='yonetici@testtur.com', password='pass12345',
+            company=cls.company, is_company_admin=True
+        )
+
+    def usage(self, feature, day, value):
+        return Usage.objects.create(
+            company=self.company, subscription=self.subscription, feature=feature, date=day, value=value
+        )
+
+    def report(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        return client.get(f'/api/companies/companies/{self.company.pk}/usage-report/', params)
+
+    def test_rollups_follow_usage_changes(self):
+        first = self.usage('api_calls', date(2030, 1, 5), 10)
+        self.usage('api_calls', date(2030, 1, 20), 5)
+        first.value = 7
+        first.date = date(2030, 2, 1)
+        first.save()
+        self.usage('sms', date(2030, 2, 1), 3).delete()
+
+        daily = {(row.feature, row.date): (row.total, row.events) for row in UsageDailyRollup.objects.all()}
+        self.assertEqual(daily[('api_calls', date(2030, 1, 5))], (0, 0))
+        self.assertEqual(daily[('api_calls', date(2030, 2, 1))], (7, 1))
+        monthly = {(row.feature, row.month): (row.total, row.events) for row in UsageMonthlyRollup.objects.all()}
+        self.assertEqual(monthly[('api_calls', date(2030, 1, 1))], (5, 1))
+        self.assertEqual(monthly[('api_calls', date(2030, 2, 1))], (7, 1))
+        self.assertEqual(monthly[('sms', date(2030, 2, 1))], (0, 0))
+
+    def test_report_combines_monthly_and_edge_days(self):
+        for day, value in ((date(2030, 1, 10), 1), (date(2030, 1, 20), 2), (date(2030, 2, 14), 4), (date(2030, 3, 5), 8)):
+            self.usage('api_calls', day, value)
+        self.usage('sms', date(2030, 2, 1), 16)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.report(start='2030-01-15', end='2030-03-10', feature='api_calls')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in context.captured_queries if 'companies_usage"' in q['sql']])
+        self.assertEqual(
+            [(row['period'], row['total']) for row in response.data['series']],
+            [(date(2030, 1, 1), 2), (date(2030, 2, 1), 4), (date(2030, 3, 1), 8)]
+        )
+        self.assertEqual(response.data['totals'], {'api_calls': {'total': 14, 'events': 3}})
+
+        response = self.report(start='2030-02-01', end='2030-02-28', granularity='day')
+        self.assertEqual(
+            [(row['period'], row['feature']) for row in response.data['series']],
+            [(date(2030, 2, 1), 'sms'), (date(2030, 2, 14), 'api_calls')]
+        )
+        self.assertEqual(self.report(granularity='week').status_code, 400)
+        self.assertEqual(self.report(start='2030-01-01', end='2031-06-01', granularity='day').status_code, 400)
+
+    def test_rebuild_command_restores_rollups(self):
+        self.usage('api_calls', date(2030, 1, 10), 3)
+        self.usage('api_calls', date(2030, 2, 10), 4)
+        UsageDailyRollup.objects.update(total=99)
+        UsageMonthlyRollup.objects.all().delete()
+        call_command('rebuild_usage_rollups', since='2030-01-20', stdout=StringIO())
+        self.assertEqual(
+            sorted(UsageMonthlyRollup.objects.values_list('month', 'total')),
+            [(date(2030, 1, 1), 3), (date(2030, 2, 1), 4)]
+        )
+        self.assertFalse(UsageDailyRollup.objects.filter(total=99).exists())
+
+
+@override_settings(USAGE_INGEST={'ASYNC': False, 'FLUSH_INTERVAL': 3600, 'MAX_PENDING_EVENTS': 10})
+class UsageIngestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        plan = Plan.objects.create(
+            name='Pro', plan_type='professional', description='Pro', price=100,
+            max_users=50, max_storage=10, max_branches=5
+        )
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.subscription = Subscription.objects.create(
+            company=cls.company, plan=plan, subscription_type='monthly',
+            start_date=date(2030, 1, 1), end_date=date(2031, 1, 1)
+        )
+        cls.user = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='pass12345', company=cls.company
+        )
+
+    def setUp(self):
+        usage_buffer.flush()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, events, **headers):
+        return self.client.post('/api/companies/usages/ingest/', {'events': events}, format='json', headers=headers)
+
+    def test_events_are_coalesced_and_retries_ignored(self):
+        events = [
+            {'feature': 'api_calls', 'date': '2030-01-05'},
+            {'feature': 'api_calls', 'date': '2030-01-05', 'value': 4},
+            {'feature': 'sms', 'date': '2030-01-05', 'value': 2},
+        ]
+        response = self.post(events, **{'Idempotency-Key': 'batch-1'})
+        self.assertEqual((response.status_code, response.data['accepted']), (202, 3))
+        response = self.post(events, **{'Idempotency-Key': 'batch-1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['duplicate'])
+        self.assertFalse(Usage.objects.exists())
+
+        usage_buffer.flush()
+        self.assertEqual(
+            sorted(Usage.objects.values_list('feature', 'value', 'subscription_id')),
+            [('api_calls', 5, self.subscription.pk), ('sms', 2, self.subscription.pk)]
+        )
+        self.assertEqual(UsageMonthlyRollup.objects.get(feature='api_calls').total, 5)
+        self.assertTrue(self.post(events, **{'Idempotency-Key': 'batch-1'}).data['duplicate'])
+
+    def test_unwritten_requests_can_be_retried(self):
+        events = [{'feature': 'api_calls', 'date': '2030-01-05'}]
+        self.assertEqual(self.post(events, **{'Idempotency-Key': 'batch-2'}).status_code, 202)
+        # Süreç yazmadan kapandı; anahtar görülmüş sayılmaz
+        usage_buffer.discard()
+        self.assertEqual(self.post(events, **{'Idempotency-Key': 'batch-2'}).status_code, 202)
+        usage_buffer.flush()
+        self.assertEqual(list(Usage.objects.values_list('value', flat=True)), [1])
+
+    def test_retry_buffered_in_another_process_is_counted_once(self):
+        self.post([{'feature': 'api_calls', 'date': '2030-01-05'}], **{'Idempotency-Key': 'batch-3'})
+        other = UsageBuffer()
+        other.add(((self.company.pk, 'batch-3'), {
+            (self.company.pk, self.subscription.pk, 'api_calls', date(2030, 1, 5)): [1, 1]
+        }))
+        usage_buffer.flush()
+        other.flush()
+        self.assertEqual(list(Usage.objects.values_list('value', flat=True)), [1])
+        self.assertEqual(UsageIngestKey.objects.filter(key='batch-3').count(), 1)
+
+    def test_invalid_batch_is_rejected_whole(self):
+        response = self.post([{'feature': 'api_calls'}, {'feature': 'sms', 'value': 'x', 'date': '05.01.2030'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'value', 'date'})
+        response = self.post([{'feature': 'api_calls', 'subscription': self.subscription.pk + 100}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(usage_buffer.pending(), 0)
+
+    def test_out_of_range_values_are_rejected(self):
+        response = self.post([{'feature': 'api_calls', 'value': 2 ** 63}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'value'})
+        response = self.post([{'feature': 'api_calls', 'value': VALUE_MAX}] * 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertEqual(usage_buffer.pending(), 0)
+
+    def test_failing_key_is_dropped_without_blocking_others(self):
+        day = date(2030, 1, 5)
+        dropped = usage_buffer.dropped
+        usage_buffer.add((None, {
+            (self.company.pk, self.subscription.pk, 'bozuk', day): [2 ** 63, 1],
+            (self.company.pk, self.subscription.pk, 'api_calls', day): [3, 1],
+        }))
+        with self.assertLogs('companies.ingest', level='ERROR') as logs:
+            for _ in range(3):
+                usage_buffer.flush()
+        self.assertEqual(list(Usage.objects.values_list('feature', 'value')), [('api_calls', 3)])
+        self.assertEqual((usage_buffer.pending(), usage_buffer.dropped - dropped), (0, 1))
+        self.assertIn('atılıyor', logs.output[-1])
+
+    def test_size_threshold_flushes(self):
+        self.post([{'feature': 'api_calls', 'date': '2030-01-05'}] * 6)
+        self.assertFalse(Usage.objects.exists())
+        self.post([{'feature': 'api_calls', 'date': '2030-01-05'}] * 6)
+        self.assertEqual(list(Usage.objects.values_list('value', flat=True)), [12])
+        self.assertEqual(usage_buffer.pending(), 0)
+
+
+@override_settings(API_USAGE_LOG={'ASYNC': False, 'FLUSH_INTERVAL': 3600, 'BATCH_SIZE': 10, 'CAPACITY': 3})
+class APIUsageMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.api_key = APIKey.objects.create(company=company, key_name='Entegrasyon', api_key='a' * 64)
+
+    def setUp(self):
+        api_usage_recorder.discard()
+        self.factory = RequestFactory()
+
+    def call(self, auth, path='/api/operations/operations/'):
+        def view(request):
+            request.auth = auth
+            return HttpResponse(status=201)
+
+        request = self.factory.post(path, HTTP_USER_AGENT='integration/1.0', REMOTE_ADDR='10.0.0.5')
+        return APIUsageMiddleware(view)(request)
+
+    def test_api_key_requests_are_buffered_and_flushed(self):
+        self.call(self.api_key)
+        self.call(None)
+        self.assertFalse(APIUsage.objects.exists())
+        self.assertEqual(api_usage_recorder.stats()['pending'], 1)
+
+        api_usage_recorder.flush()
+        usage = APIUsage.objects.get()
+        self.assertEqual(
+            (usage.api_key_id, usage.endpoint, usage.method, usage.status_code, usage.ip_address, usage.user_agent),
+            (self.api_key.pk, '/api/operations/operations/', 'POST', 201, '10.0.0.5', 'integration/1.0')
+        )
+        self.assertGreaterEqual(usage.response_time, 0)
+
+    def test_full_buffer_drops_and_counts(self):
+        dropped = api_usage_recorder.stats()['dropped']
+        for _ in range(5):
+            self.call(self.api_key)
+        self.assertEqual(api_usage_recorder.stats()['pending'], 3)
+        self.assertEqual(api_usage_recorder.stats()['dropped'] - dropped, 2)
+        with self.assertLogs('companies.middleware', 'WARNING'):
+            api_usage_recorder.flush()
+        self.assertEqual(APIUsage.objects.count(), 3)
+
+
+@override_settings(
+    API_KEY_AUTH={'ASYNC': False, 'FLUSH_INTERVAL': 3600, 'MAX_ENTRIES': 100, 'CACHE_TTL': 30, 'LAST_USED_INTERVAL': 60},
+    API_USAGE_LOG={'ASYNC': False, 'FLUSH_INTERVAL': 3600, 'BATCH_SIZE': 100, 'CAPACITY': 100}
+)
+class APIKeyAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+
+    def setUp(self):
+        self.api_key = APIKey.objects.create(company=self.company, key_name='Entegrasyon')
+        self.client = APIClient()
+        self.addCleanup(api_usage_recorder.discard)
+
+    def get(self, **headers):
+        return self.client.get('/api/companies/usages/', headers=headers)
+
+    def test_key_is_generated_and_looked_up_by_digest(self):
+        self.assertEqual(len(self.api_key.api_key), 64)
+        self.assertEqual(self.api_key.api_key_digest, APIKey.digest(self.api_key.api_key))
+
+        self.assertEqual(self.get(**{'X-API-Key': self.api_key.api_key}).status_code, 200)
+        with CaptureQueriesContext(connection) as context:
+            response = self.get(Authorization=f'Api-Key {self.api_key.api_key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in context.captured_queries if 'companies_apikey' in q['sql']])
+        self.assertEqual(self.get(**{'X-API-Key': 'b' * 64}).status_code, 401)
+        self.assertEqual(api_usage_recorder.stats()['pending'], 2)
+
+    def test_key_is_not_accepted_outside_metering(self):
+        headers = {'X-API-Key': self.api_key.api_key}
+        self.assertEqual(self.client.get('/api/accounts/profile/', headers=headers).status_code, 401)
+        response = self.client.put(
+            '/api/accounts/change-password/', {'old_password': 'x', 'new_password': 'Yeni-sifre-123'},
+            format='json', headers=headers
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.client.get('/api/companies/companies/', headers=headers).status_code, 401)
+
+    def test_inactive_and_expired_keys_are_rejected(self):
+        headers = {'X-API-Key': self.api_key.api_key}
+        self.assertEqual(self.get(**headers).status_code, 200)
+        self.api_key.is_active = False
+        self.api_key.save()
+        self.assertEqual(self.get(**headers).status_code, 401)
+
+        self.api_key.is_active = True
+        self.api_key.expires_at = timezone.now() - timedelta(minutes=1)
+        self.api_key.save()
+        self.assertEqual(self.get(**headers).status_code, 401)
+
+    def test_unknown_keys_do_not_evict_valid_ones(self):
+        cache = APIKeyCache()
+        digest = APIKey.digest(self.api_key.api_key)
+        with override_settings(API_KEY_AUTH={'MAX_ENTRIES': 2, 'MISS_ENTRIES': 2}):
+            self.assertEqual(cache.get(digest)['id'], self.api_key.pk)
+            for index in range(10):
+                self.assertIsNone(cache.get(APIKey.digest(f'rastgele-{index}')))
+            with self.assertNumQueries(0):
+                self.assertEqual(cache.get(digest)['id'], self.api_key.pk)
+            # Yeni bir bilinmeyen özet en eski kaçırılanı düşürür
+            with self.assertNumQueries(1):
+                cache.get(APIKey.digest('rastgele-0'))
+
+    def test_last_used_at_is_debounced(self):
+        headers = {'X-API-Key': self.api_key.api_key}
+        self.get(**headers)
+        self.get(**headers)
+        self.assertEqual(last_used_recorder.flush(), {self.api_key.pk})
+        self.get(**headers)
+        self.assertFalse(last_used_recorder.flush())
+        self.api_key.refresh_from_db()
+        self.assertIsNotNone(self.api_key.last_used_at)
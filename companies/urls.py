@@ -33,10 +33,18 @@ urlpatterns = [
          CompanyViewSet.as_view({'get': 'statistics'}), 
          name='company-statistics'),
     
+    path('companies/<int:pk>/dashboard/',
+         CompanyViewSet.as_view({'get': 'dashboard'}),
+         name='company-dashboard'),
+
     path('companies/<int:pk>/usage-report/',
          CompanyViewSet.as_view({'get': 'usage_report'}),
          name='company-usage-report'),
          
+    path('usages/ingest/',
+         UsageViewSet.as_view({'post': 'ingest'}),
+         name='usage-ingest'),
+
     path('branches/<int:pk>/statistics/',
          BranchViewSet.as_view({'get': 'statistics'}),
          name='branch-statistics'),
@@ -0,0 +1,225 @@
+import datetime
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest, TruncMonth
+from django.utils import timezone
+from .models import Usage, UsageDailyRollup, UsageMonthlyRollup
+from .stats import CounterTracker
+
+# Kullanım raporları (companies/<pk>/usage-report/) ham Usage kayıtları yerine
+# (şirket, özellik, gün) ve (şirket, özellik, ay) özet tablolarından okunur.
+# Usage kaydı eklendikçe/değiştikçe fark iki tabloya da uygulanır; sapmalar
+# `rebuild_usage_rollups` komutuyla ham kayıtlardan yeniden kurulur.
+
+GRANULARITIES = ('day', 'month')
+# Günlük çözünürlükte tek raporda dönülebilecek en uzun aralık
+MAX_DAILY_DAYS = 366
+DEFAULT_DAILY_DAYS = 30
+DEFAULT_MONTHS = 12
+
+tracker = None
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def usage_contributions(states):
+    to_date = Usage._meta.get_field('date').to_python
+    counts = Counter()
+    for company_id, feature, day, value in states:
+        key = (company_id, feature, to_date(day))
+        counts[(*key, 'total')] += value or 0
+        counts[(*key, 'events')] += 1
+    return counts
+
+
+def _apply(model, period, deltas):
+    """
+    {(şirket, özellik, dönem): {alan: fark}} farklarını uygular. Eksik satırlar sıfırla eklenir,
+    ardından tüm farklar tek UPDATE ile artırılır; eşzamanlı yazıcılar birbirinin farkını ezmez.
+    """
+    def lookup(keys):
+        rows = model.objects.filter(
+            company_id__in={key[0] for key in keys},
+            feature__in={key[1] for key in keys},
+            **{f'{period}__in': {key[2] for key in keys}},
+        ).values_list('pk', 'company_id', 'feature', period)
+        return {(company_id, feature, day): pk for pk, company_id, feature, day in rows}
+
+    ids = lookup(deltas)
+    missing = [key for key in deltas if key not in ids]
+    if missing:
+        model.objects.bulk_create([
+            model(company_id=company_id, feature=feature, **{period: day})
+            for company_id, feature, day in missing
+        ], ignore_conflicts=True)
+        ids.update(lookup(missing))
+
+    updates = {}
+    for field in ('total', 'events'):
+        whens = [When(pk=ids[key], then=Value(changes[field])) for key, changes in deltas.items() if changes[field]]
+        if whens:
+            updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+    if 'events' in updates:
+        updates['events'] = Greatest(updates['events'], Value(0))
+    if updates:
+        model.objects.filter(pk__in=[ids[key] for key in deltas]).update(updated_at=timezone.now(), **updates)
+
+
+def apply_usage(deltas):
+    """{(şirket, özellik, gün, 'total'|'events'): fark} farklarını günlük ve aylık özetlere yazar."""
+    daily = defaultdict(Counter)
+    monthly = defaultdict(Counter)
+    for (company_id, feature, day, field), delta in deltas.items():
+        if company_id is None or not delta:
+            continue
+        daily[(company_id, feature, day)][field] += delta
+        monthly[(company_id, feature, month_start(day))][field] += delta
+    if not daily:
+        return
+    with transaction.atomic():
+        _apply(UsageDailyRollup, 'date', daily)
+        _apply(UsageMonthlyRollup, 'month', monthly)
+
+
+def register():
+    global tracker
+    tracker = CounterTracker(
+        Usage, ('company_id', 'feature', 'date', 'value'), usage_contributions,
+        apply=apply_usage, uid_prefix='usage-rollups'
+    )
+
+
+def record_created(instances):
+    """bulk_create ile eklenen Usage kayıtlarını özetlere ekler."""
+    tracker.record_created(instances)
+
+
+def rebuild(company_ids=None, since=None):
+    """
+    Özetleri ham kayıtlardan yeniden kurar. `since` verilirse o günün ayının başından itibaren
+    kurulur. Dönen değer (günlük_satır, aylık_satır).
+    """
+    usages = Usage.objects.all()
+    daily = UsageDailyRollup.objects.all()
+    monthly = UsageMonthlyRollup.objects.all()
+    if company_ids is not None:
+        usages = usages.filter(company_id__in=company_ids)
+        daily = daily.filter(company_id__in=company_ids)
+        monthly = monthly.filter(company_id__in=company_ids)
+    if since is not None:
+        since = month_start(since)
+        usages = usages.filter(date__gte=since)
+        daily = daily.filter(date__gte=since)
+        monthly = monthly.filter(month__gte=since)
+
+    now = timezone.now()
+    with transaction.atomic():
+        daily.delete()
+        monthly.delete()
+        daily_rows = UsageDailyRollup.objects.bulk_create([
+            UsageDailyRollup(
+                company_id=row['company_id'], feature=row['feature'], date=row['date'],
+                total=row['sum_value'], events=row['events'], updated_at=now
+            )
+            for row in usages.values('company_id', 'feature', 'date').annotate(
+                sum_value=Sum('value'), events=Count('pk')
+            ).order_by()
+        ], batch_size=1000)
+        # Aylık özet, yeni kurulan günlük özetten toplanır; ham tablo ikinci kez taranmaz
+        monthly_rows = UsageMonthlyRollup.objects.bulk_create([
+            UsageMonthlyRollup(
+                company_id=row['company_id'], feature=row['feature'], month=row['period'],
+                total=row['sum_total'], events=row['sum_events'], updated_at=now
+            )
+            for row in daily.annotate(period=TruncMonth('date')).values('company_id', 'feature', 'period').annotate(
+                sum_total=Sum('total'), sum_events=Sum('events')
+            ).order_by()
+        ], batch_size=1000)
+    return len(daily_rows), len(monthly_rows)
+
+
+def parse_report_params(params, today=None):
+    """
+    Sorgu parametrelerinden (start, end, granularity, features) döndürür.
+    Geçersiz değerlerde ValueError yükselir.
+    """
+    today = today or timezone.localdate()
+    granularity = params.get('granularity') or 'month'
+    if granularity not in GRANULARITIES:
+        raise ValueError("granularity 'day' veya 'month' olmalı.")
+    try:
+        end = datetime.date.fromisoformat(params['end']) if params.get('end') else today
+        if params.get('start'):
+            start = datetime.date.fromisoformat(params['start'])
+        elif granularity == 'day':
+            start = end - datetime.timedelta(days=DEFAULT_DAILY_DAYS - 1)
+        else:
+            start = add_months(end, 1 - DEFAULT_MONTHS)
+    except ValueError:
+        raise ValueError("Tarihler YYYY-MM-DD biçiminde olmalı.")
+    if start > end:
+        raise ValueError("start, end tarihinden sonra olamaz.")
+    if granularity == 'day' and (end - start).days >= MAX_DAILY_DAYS:
+        raise ValueError(f"Günlük raporda aralık en fazla {MAX_DAILY_DAYS} gün olabilir.")
+    features = [feature for value in params.getlist('feature') for feature in value.split(',') if feature]
+    return start, end, granularity, features
+
+
+def _rows(model, period, company, features, **lookup):
+    queryset = model.objects.filter(company=company, **lookup)
+    if features:
+        queryset = queryset.filter(feature__in=features)
+    return queryset.values_list(period, 'feature', 'total', 'events')
+
+
+def usage_report(company, start, end, granularity='month', features=None):
+    """
+    [start, end] aralığının kullanım raporu. Aylık raporda tam kapsanan aylar aylık özetten,
+    aralık kenarındaki kısmi aylar günlük özetten okunur.
+    """
+    if granularity == 'day':
+        rows = _rows(UsageDailyRollup, 'date', company, features, date__range=(start, end))
+    else:
+        stop = end + datetime.timedelta(days=1)
+        first_full = start if start.day == 1 else add_months(start, 1)
+        after_last_full = stop if stop.day == 1 else month_start(end)
+        if first_full < after_last_full:
+            rows = list(_rows(
+                UsageMonthlyRollup, 'month', company, features, month__gte=first_full, month__lt=after_last_full
+            ))
+            edges = [(start, first_full), (after_last_full, stop)]
+        else:
+            rows = []
+            edges = [(start, stop)]
+        for low, high in edges:
+            if low < high:
+                rows.extend(
+                    (month_start(day), feature, total, events)
+                    for day, feature, total, events in _rows(
+                        UsageDailyRollup, 'date', company, features, date__gte=low, date__lt=high
+                    )
+                )
+
+    series = defaultdict(Counter)
+    totals = defaultdict(Counter)
+    for period, feature, total, events in rows:
+        series[(period, feature)].update(total=total, events=events)
+        totals[feature].update(total=total, events=events)
+    return {
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'totals': {feature: dict(values) for feature, values in sorted(totals.items())},
+        'series': [
+            {'period': period, 'feature': feature, 'total': values['total'], 'events': values['events']}
+            for (period, feature), values in sorted(series.items())
+        ],
+    }
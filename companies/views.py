@@ -3,6 +3,7 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -21,6 +22,13 @@ from .serializers import (
     APIKeySerializer, APIUsageSerializer, NotificationSerializer,
     AuditLogSerializer, IntegrationSerializer
 )
+from core.conditional import ConditionalListMixin
+from .authentication import APIKeyAuthentication
+from .ingest import ingest as ingest_usage
+from .usage import parse_report_params, usage_report
+from .stats import branch_payload, branch_stats, company_payload, company_stats, dashboard as stats_dashboard
+from .querysets import with_branch_counters, with_company_counters, with_company_detail, with_plan_counters
+from core.tenant import TenantScopedMixin
 from .permissions import (
     IsCompanyAdmin, IsBranchAdmin, IsCompanyMember,
     CanManageCompany, CanManageBranch
@@ -28,7 +36,7 @@ from .permissions import (
 
 # Create your views here.
 
-class CityViewSet(viewsets.ModelViewSet):
+class CityViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = City.objects.all()
     serializer_class = CitySerializer
     permission_classes = [AllowAny]
@@ -36,7 +44,7 @@ class CityViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'code']
     filterset_fields = ['name', 'code']
 
-class DistrictViewSet(viewsets.ModelViewSet):
+class DistrictViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = District.objects.all()
     serializer_class = DistrictSerializer
     permission_classes = [AllowAny]
@@ -44,7 +52,7 @@ class DistrictViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'code', 'city__name']
     filterset_fields = ['city', 'name', 'code']
 
-class NeighborhoodViewSet(viewsets.ModelViewSet):
+class NeighborhoodViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Neighborhood.objects.all()
     serializer_class = NeighborhoodSerializer
     permission_classes = [AllowAny]
@@ -52,19 +60,25 @@ class NeighborhoodViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'code', 'district__name']
     filterset_fields = ['district', 'name', 'code']
 
-class PlanViewSet(viewsets.ModelViewSet):
+class PlanViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Plan.objects.all()
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['name', 'plan_type']
     filterset_fields = ['plan_type', 'is_active']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            return with_plan_counters(queryset)
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return PlanDetailSerializer
         return PlanSerializer
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     """
     Şirket yönetimi için API endpoint'leri.
     
@@ -81,36 +95,95 @@ class CompanyViewSet(viewsets.ModelViewSet):
     queryset = Company.objects.none()  # Varsayılan boş queryset
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Company.objects.all()
-        elif user.is_company_admin:
-            return Company.objects.filter(id=user.company.id)
-        return Company.objects.none()
+        tenant = self.tenant
+        if tenant.is_superuser:
+            queryset = Company.objects.all()
+        elif tenant.is_company_admin:
+            queryset = Company.objects.filter(id=tenant.company_id)
+        else:
+            return Company.objects.none()
+        # Sayaçlar satır başına sorgu yerine liste sorgusunda alt sorgu olarak hesaplanır
+        if self.action == 'list':
+            return with_company_counters(queryset.select_related('city', 'current_plan'))
+        if self.action == 'retrieve':
+            return with_company_detail(queryset)
+        if self.action in ('statistics', 'dashboard'):
+            return queryset.select_related('stats')
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ['list', 'statistics']:
             return CompanyListSerializer
         return CompanyDetailSerializer
 
+    @swagger_auto_schema(
+        operation_summary="Şirket istatistikleri",
+        operation_description="Şirketin sayaç tablosundan okunan istatistikleri (tek sorgu)"
+    )
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
         company = self.get_object()
-        stats = {
-            'total_branches': company.branches.count(),
-            'active_users': company.users.filter(is_active=True).count(),
-            'storage_usage_gb': round(company.storage_usage / (1024 * 1024 * 1024), 2),
-            'active_subscriptions': company.subscriptions.filter(is_active=True).count(),
+        return Response(company_payload(company, company_stats(company)))
+
+    @swagger_auto_schema(
+        operation_summary="Şirket panosu",
+        operation_description="Şirketin ve tüm şubelerinin istatistiklerini tek istekte döndürür",
+        responses={
+            200: openapi.Response(
+                description="Pano verisi",
+                examples={
+                    "application/json": {
+                        "total_branches": 2,
+                        "active_users": 12,
+                        "branches": [{"id": 1, "name": "Merkez", "total_users": 8, "active_users": 7}]
+                    }
+                }
+            )
         }
-        return Response(stats)
+    )
+    @action(detail=True, methods=['get'])
+    def dashboard(self, request, pk=None):
+        return Response(stats_dashboard(self.get_object()))
 
+    @swagger_auto_schema(
+        operation_summary="Kullanım raporu",
+        operation_description="Günlük ve aylık kullanım özetlerinden (ham Usage kayıtları taranmadan) rapor döndürür",
+        manual_parameters=[
+            openapi.Parameter('start', openapi.IN_QUERY, description="Başlangıç tarihi (YYYY-MM-DD)",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('end', openapi.IN_QUERY, description="Bitiş tarihi (YYYY-MM-DD, varsayılan bugün)",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('granularity', openapi.IN_QUERY, description="day veya month (varsayılan month)",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('feature', openapi.IN_QUERY, description="Özellik filtresi (virgülle ayrılmış)",
+                              type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Kullanım raporu",
+                examples={
+                    "application/json": {
+                        "start": "2025-01-01",
+                        "end": "2025-12-31",
+                        "granularity": "month",
+                        "totals": {"api_calls": {"total": 1200, "events": 40}},
+                        "series": [{"period": "2025-01-01", "feature": "api_calls", "total": 100, "events": 4}]
+                    }
+                }
+            ),
+            400: "Geçersiz parametre"
+        }
+    )
     @action(detail=True, methods=['get'])
     def usage_report(self, request, pk=None):
         company = self.get_object()
-        # Kullanım raporu mantığı burada implement edilecek
-        return Response({'message': 'Usage report will be implemented'})
+        try:
+            start, end, granularity, features = parse_report_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(usage_report(company, start, end, granularity, features))
 
-class BranchViewSet(viewsets.ModelViewSet):
+class BranchViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     serializer_class = BranchDetailSerializer
     permission_classes = [IsAuthenticated, CanManageBranch]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
@@ -119,14 +192,22 @@ class BranchViewSet(viewsets.ModelViewSet):
     queryset = Branch.objects.none()  # Varsayılan boş queryset
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Branch.objects.all()
-        elif user.is_company_admin:
-            return Branch.objects.filter(company=user.company)
-        elif user.is_branch_admin:
-            return Branch.objects.filter(id=user.branch.id)
-        return Branch.objects.none()
+        tenant = self.tenant
+        if tenant.is_superuser:
+            queryset = Branch.objects.all()
+        elif tenant.is_company_admin:
+            queryset = Branch.objects.filter(company_id=tenant.company_id)
+        elif tenant.is_branch_admin:
+            queryset = Branch.objects.filter(id=tenant.branch_id)
+        else:
+            return Branch.objects.none()
+        if self.action == 'list':
+            return with_branch_counters(queryset.select_related('company', 'city'))
+        if self.action == 'retrieve':
+            return with_branch_counters(queryset)
+        if self.action == 'statistics':
+            return queryset.select_related('stats')
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -136,13 +217,9 @@ class BranchViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
         branch = self.get_object()
-        stats = {
-            'total_users': branch.users.count(),
-            'active_users': branch.users.filter(is_active=True).count(),
-        }
-        return Response(stats)
+        return Response(branch_payload(branch_stats(branch)))
 
-class SubscriptionViewSet(viewsets.ModelViewSet):
+class SubscriptionViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
@@ -150,25 +227,81 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['company', 'plan', 'status', 'subscription_type']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Subscription.objects.all()
-        return Subscription.objects.filter(company=user.company)
+        return self.tenant.scope(Subscription.objects.all())
 
-class UsageViewSet(viewsets.ModelViewSet):
+class UsageViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = Usage.objects.all()
     serializer_class = UsageSerializer
+    # API anahtarları yalnızca ölçüm uçlarında geçerlidir; APIKeyUser gerçek bir kullanıcı değildir
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, APIKeyAuthentication]
     permission_classes = [IsAuthenticated, IsCompanyMember]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     filterset_fields = ['company', 'feature', 'date']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Usage.objects.all()
-        return Usage.objects.filter(company=user.company)
+        return self.tenant.scope(Usage.objects.all())
 
-class PaymentViewSet(viewsets.ModelViewSet):
+    @swagger_auto_schema(
+        operation_summary="Toplu kullanım ölçümü",
+        operation_description=(
+            "Kullanım olaylarını toplu kabul eder. Olaylar bellekte (abonelik, özellik, gün) bazında "
+            "toplanır ve periyodik olarak yazılır. Aynı Idempotency-Key başlığıyla tekrarlanan istekler sayılmaz."
+        ),
+        manual_parameters=[
+            openapi.Parameter('Idempotency-Key', openapi.IN_HEADER, description="İstek tekrarlarını ayırt eden anahtar",
+                              type=openapi.TYPE_STRING),
+        ],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'company': openapi.Schema(type=openapi.TYPE_INTEGER, description="Sadece süper kullanıcılar için"),
+                'events': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'feature': openapi.Schema(type=openapi.TYPE_STRING),
+                            'value': openapi.Schema(type=openapi.TYPE_INTEGER, default=1),
+                            'date': openapi.Schema(type=openapi.TYPE_STRING, format='date'),
+                            'subscription': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        },
+                        required=['feature']
+                    )
+                ),
+            },
+            required=['events']
+        ),
+        responses={
+            202: "Olaylar kabul edildi",
+            200: "Tekrarlanan istek, olaylar sayılmadı",
+            400: "Geçersiz olay"
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def ingest(self, request):
+        data = request.data
+        events = data if isinstance(data, list) else data.get('events')
+        if not isinstance(events, list):
+            return Response({"error": "events listesi gerekli"}, status=status.HTTP_400_BAD_REQUEST)
+
+        company_id = self.tenant.company_id
+        if self.tenant.is_superuser and isinstance(data, dict) and data.get('company'):
+            try:
+                company_id = int(data['company'])
+            except (TypeError, ValueError):
+                return Response({"error": "Geçersiz şirket"}, status=status.HTTP_400_BAD_REQUEST)
+        if company_id is None:
+            return Response({"error": "Şirket belirtilmeli"}, status=status.HTTP_400_BAD_REQUEST)
+
+        idempotency_key = request.headers.get('Idempotency-Key') or (
+            data.get('idempotency_key') if isinstance(data, dict) else None
+        )
+        report = ingest_usage(company_id, events, idempotency_key)
+        if report['errors']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK if report['duplicate'] else status.HTTP_202_ACCEPTED)
+
+class PaymentViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
@@ -176,23 +309,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
     filterset_fields = ['subscription', 'payment_method', 'is_paid']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Payment.objects.all()
-        return Payment.objects.filter(subscription__company=user.company)
+        return self.tenant.scope(Payment.objects.all(), company='subscription__company')
 
-class APIKeyViewSet(viewsets.ModelViewSet):
+class APIKeyViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = APIKey.objects.all()
     serializer_class = APIKeySerializer
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return APIKey.objects.all()
-        return APIKey.objects.filter(company=user.company)
+        return self.tenant.scope(APIKey.objects.all())
 
-class APIUsageViewSet(viewsets.ModelViewSet):
+class APIUsageViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = APIUsage.objects.all()
     serializer_class = APIUsageSerializer
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
@@ -200,12 +327,9 @@ class APIUsageViewSet(viewsets.ModelViewSet):
     filterset_fields = ['api_key', 'endpoint', 'method', 'status_code']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return APIUsage.objects.all()
-        return APIUsage.objects.filter(api_key__company=user.company)
+        return self.tenant.scope(APIUsage.objects.all(), company='api_key__company')
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
@@ -213,12 +337,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
     filterset_fields = ['type', 'priority', 'is_read']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Notification.objects.all()
-        return Notification.objects.filter(company=user.company)
+        return self.tenant.scope(Notification.objects.all())
 
-class AuditLogViewSet(viewsets.ModelViewSet):
+class AuditLogViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
@@ -226,12 +347,9 @@ class AuditLogViewSet(viewsets.ModelViewSet):
     filterset_fields = ['action', 'model_name', 'user']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return AuditLog.objects.all()
-        return AuditLog.objects.filter(company=user.company)
+        return self.tenant.scope(AuditLog.objects.all())
 
-class IntegrationViewSet(viewsets.ModelViewSet):
+class IntegrationViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     queryset = Integration.objects.all()
     serializer_class = IntegrationSerializer
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
@@ -239,12 +357,9 @@ class IntegrationViewSet(viewsets.ModelViewSet):
     filterset_fields = ['integration_type', 'provider', 'status']
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Integration.objects.all()
-        return Integration.objects.filter(company=user.company)
+        return self.tenant.scope(Integration.objects.all())
 
-class CurrencyViewSet(viewsets.ModelViewSet):
+class CurrencyViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     Para birimi işlemleri için API endpoint'leri.
     
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Giriş endpoint'i ASGI altında async çalışır; şifre doğrulaması sınırlı thread havuzunda yapılır
+os.environ.setdefault('ASYNC_LOGIN', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,111 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Bellek içi yazma tamponları için ortak altyapı. Kayıtlar istek yolunda yalnızca tampona
+# eklenir; boyut eşiğine ulaşıldığında veya `interval` saniyede bir arka plan thread'i
+# tamponu boşaltıp tek seferde yazar. Süreç kapanırken kalan kayıtlar da yazılır.
+
+
+class BatchWriter:
+    """
+    Alt sınıflar `_put(item)` (tampona ekler, bekleyen kayıt sayısını döndürür),
+    `_drain()` (tamponu boşaltıp toplu veriyi döndürür) ve `write(batch)` metotlarını tanımlar.
+    `_put` ve `_drain` kilit altında çağrılır; `write` kilit dışında, tek seferde bir tane çalışır.
+    """
+    name = 'batch-writer'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._last_flush = time.monotonic()
+        atexit.register(self._flush_at_exit)
+
+    def config(self):
+        """{'MAX_PENDING': eşik, 'INTERVAL': saniye, 'ASYNC': bool}; alt sınıf ayarlardan okur."""
+        raise NotImplementedError
+
+    def _put(self, item):
+        raise NotImplementedError
+
+    def _drain(self):
+        raise NotImplementedError
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def _reset(self):
+        """Tampon içeriğini kilit altında boşaltır (fork sonrası çocuk süreçte)."""
+        self._drain()
+
+    def add(self, item):
+        config = self.config()
+        with self._lock:
+            self._check_fork()
+            pending = self._put(item)
+        if config['ASYNC']:
+            self._ensure_thread(config['INTERVAL'])
+            if pending >= config['MAX_PENDING']:
+                self._wake.set()
+        elif pending >= config['MAX_PENDING'] or time.monotonic() - self._last_flush >= config['INTERVAL']:
+            # Thread'siz çalışmada (testler, komutlar) eşikler ekleme sırasında kontrol edilir
+            self.flush()
+        return pending
+
+    def flush(self):
+        """Bekleyen kayıtları hemen yazar; yazılan toplu veriyi döndürür."""
+        with self._flush_lock:
+            with self._lock:
+                self._check_fork()
+                batch = self._drain()
+            self._last_flush = time.monotonic()
+            if batch:
+                self.write(batch)
+            return batch
+
+    def discard(self):
+        """Bekleyen kayıtları yazmadan atar."""
+        with self._lock:
+            return self._drain()
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("%s tamponu kapanışta yazılamadı", self.name)
+
+    def _check_fork(self):
+        # Tampon ve thread üst süreçten kopyalanmışsa (gunicorn --preload) çocukta sıfırlanır
+        pid = os.getpid()
+        if self._pid != pid:
+            if self._pid is not None:
+                self._reset()
+            self._pid = pid
+            self._thread = None
+
+    def _ensure_thread(self, interval):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(interval,), name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("%s tamponu yazılamadı", self.name)
+            finally:
+                connection.close()
@@ -0,0 +1,31 @@
+import time
+
+# Sürümlü önbellek anahtarları için ortak yardımcılar. Önbelleğe alınan değerin anahtarı
+# ilgili sürüm sayaçlarını içerir; sayaç artırılınca eski anahtarlar erişilmez hale gelir
+# ve kendi TIMEOUT'larıyla düşer.
+
+
+def _initial_version():
+    # Sürüm anahtarı düşmüşse eski sürümlerle çakışmaması için zamandan başla
+    return int(time.time() * 1000)
+
+
+def get_versions(cache, keys):
+    """Verilen sürüm anahtarlarının değerleri ({anahtar: sürüm}); eksik olanlar başlatılır."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version())
+            versions[key] = cache.get(key)
+    return versions
+
+
+def get_version(cache, key):
+    return get_versions(cache, [key])[key]
+
+
+def bump_version(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version())
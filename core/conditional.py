@@ -0,0 +1,68 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .reference_cache import reference_cache
+
+
+class ConditionalListMixin:
+    """
+    Liste yanıtları için güçlü ETag ve `If-None-Match` desteği.
+
+    ETag, tenant filtresi ve sorgu parametreleri uygulanmış queryset'in durumundan üretilir:
+    `updated_at` alanı olan modellerde tek bir (count, max(updated_at)) aggregate sorgusu,
+    olmayanlarda (City, District, Currency, ...) reference_cache sürüm sayacı kullanılır.
+    İç içe serialize edilen referans kayıtlar (ör. Hotel.city, Hotel.currency) için ilişkili
+    modellerin sürümleri de eklenir. Fiyat geçmişi değişiklikleri sahibin updated_at'ini
+    ilerletir (records.signals). Eşleşme varsa liste hiç serialize edilmeden 304 döner.
+    """
+    etag_include_date = False  # Yanıt bugünün tarihine bağlıysa (ör. current_price) True yapın
+
+    def get_list_state(self, queryset):
+        model = queryset.model
+        if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+            state = queryset.order_by().aggregate(count=Count('pk'), last=Max('updated_at'))
+            references = sorted({
+                field.related_model for field in model._meta.concrete_fields
+                if field.many_to_one and reference_cache.is_registered(field.related_model)
+            }, key=lambda related: related._meta.label_lower)
+            return [
+                state['count'], state['last'].isoformat() if state['last'] else '',
+                *reference_cache.versions(references),
+            ]
+        if reference_cache.is_registered(model):
+            return ['v', reference_cache.version(model)]
+        return None
+
+    def get_list_etag(self, request, queryset):
+        state = self.get_list_state(queryset)
+        if state is None:
+            return None
+        user = request.user
+        parts = [
+            queryset.model._meta.label_lower,
+            getattr(user, 'company_id', None) if user.is_authenticated and not user.is_superuser else '*',
+            sorted(request.query_params.lists()),
+            *state,
+        ]
+        if self.etag_include_date:
+            parts.append(timezone.now().date().isoformat())
+        return quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:40])
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag(request, self.filter_queryset(self.get_queryset()))
+        if etag is None:
+            return super().list(request, *args, **kwargs)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            # If-None-Match zayıf karşılaştırma kullanır (RFC 9110)
+            client_etags = {tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)}
+            if '*' in client_etags or etag in client_etags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
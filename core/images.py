@@ -0,0 +1,144 @@
+import hashlib
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Yüklenen görsellerden sabit boyutlu küçük kopyalar (variant) üretir.
+# Dosya adları içeriğin hash'ini taşır; içerik değişirse ad da değişir, bu yüzden
+# variant'lar süresiz önbelleklenebilir.
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _config():
+    return {
+        'SIZES': (64, 256),
+        'FORMATS': ('webp', 'jpeg'),
+        'WORKERS': 2,
+        'ASYNC': True,
+        **getattr(settings, 'IMAGE_VARIANTS', {}),
+    }
+
+
+def image_pool():
+    """Variant üretiminin çalıştığı thread havuzu; Pillow yeniden boyutlandırma ve kodlamada GIL'i bırakır."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=_config()['WORKERS'], thread_name_prefix='image-variants')
+    return _pool
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Görsel variant üretimi başarısız: %s%r", func.__name__, args)
+    finally:
+        # Havuz thread'lerinin veritabanı bağlantısı açık kalmasın
+        connection.close()
+
+
+def submit(func, *args):
+    """ASYNC açıksa işi havuza verir, kapalıysa (testler, komutlar) aynı thread'de çalıştırır."""
+    if _config()['ASYNC']:
+        image_pool().submit(_run, func, *args)
+    else:
+        func(*args)
+
+
+def render_variants(source, sizes=None, formats=None):
+    """
+    Görseli kare kırpıp her boyut ve biçim için kodlar: {boyut: {biçim: bytes}}.
+    Görsel okunamazsa boş sözlük döner.
+    """
+    config = _config()
+    sizes = sizes or config['SIZES']
+    formats = formats or config['FORMATS']
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        return {}
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    variants = {}
+    for size in sizes:
+        resized = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        variants[size] = {}
+        for name in formats:
+            pil_format, options = FORMATS[name]
+            frame = resized
+            if pil_format == 'JPEG' and frame.mode == 'RGBA':
+                frame = Image.new('RGB', frame.size, 'white')
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            frame.save(buffer, pil_format, **options)
+            variants[size][name] = buffer.getvalue()
+    return variants
+
+
+def store_variants(variants, directory):
+    """
+    Variant'ları `<directory>/<hash>-<boyut>.<biçim>` adlarıyla kaydeder. Aynı içerik aynı
+    dizinde tek dosyadır; silinebilmeleri için dizin sahibine özel olmalıdır (ör. kullanıcı başına).
+    Dönen değer ({boyut: {biçim: yol}}, toplam_bayt); aynı içerik zaten varsa yeniden yazılmaz.
+    """
+    paths, total = {}, 0
+    for size, encoded in variants.items():
+        paths[str(size)] = {}
+        for name, content in encoded.items():
+            digest = hashlib.sha256(content).hexdigest()[:16]
+            path = posixpath.join(directory, f'{digest}-{size}.{name}')
+            if not default_storage.exists(path):
+                path = default_storage.save(path, ContentFile(content))
+            paths[str(size)][name] = path
+            total += len(content)
+    return paths, total
+
+
+def variant_paths(variants):
+    return [path for formats in (variants or {}).values() for path in formats.values()]
+
+
+def delete_files(paths):
+    for path in paths:
+        if path and default_storage.exists(path):
+            default_storage.delete(path)
+
+
+class ImageVariantsField(serializers.Field):
+    """{boyut: {biçim: yol}} değerini istek varsa mutlak URL'lere çevirir."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+
+        def url(path):
+            location = default_storage.url(path)
+            return request.build_absolute_uri(location) if request is not None else location
+
+        return {size: {name: url(path) for name, path in formats.items()} for size, formats in (value or {}).items()}
@@ -0,0 +1,20 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# WSGI ve ASGI altında çalışabilen middleware tabanı. Zincirde yalnızca senkron bir
+# middleware bulunması, ASGI'de her isteğin middleware sınırında thread'e geçmesine
+# (sync_to_async) neden olur; bu sınıflar zincir async ise kendileri de async çalışır.
+
+
+class HybridMiddleware:
+    """
+    Alt sınıflar __call__ içinde `if self.async_mode: return self.__acall__(request)` ile
+    dallanır ve senkron yolu yazar; __acall__ aynı işi `await self.get_response(request)` ile yapar.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
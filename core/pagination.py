@@ -0,0 +1,153 @@
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    İsteğe bağlı keyset (cursor) sayfalama.
+
+    İstemci `cursor` veya `page_size` göndermezse sayfalama yapılmaz ve eski
+    istemciler düz dizi almaya devam eder. Sıralama `(id)` veya
+    `?order_by=updated_at` ile `(updated_at, id)` çiftidir; sonraki sayfa OFFSET
+    yerine son satırın anahtarından filtrelenir, böylece her sayfa indeksten okunur.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'order_by'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Geçersiz cursor.'
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering_key(self, request, queryset):
+        if request.query_params.get(self.ordering_query_param) == 'updated_at':
+            try:
+                queryset.model._meta.get_field('updated_at')
+                return 'updated_at'
+            except FieldDoesNotExist:
+                pass
+        return 'id'
+
+    def encode_cursor(self, instance):
+        values = [instance.pk]
+        if self.ordering_key == 'updated_at':
+            values = [instance.updated_at.isoformat(), instance.pk]
+        payload = json.dumps({'o': self.ordering_key, 'k': values}).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if payload['o'] != self.ordering_key:
+                raise ValueError
+            if self.ordering_key == 'updated_at':
+                updated_at, pk = payload['k']
+                updated_at = parse_datetime(updated_at)
+                if updated_at is None:
+                    raise ValueError
+                return updated_at, int(pk)
+            return (int(payload['k'][0]),)
+        except (TypeError, ValueError, KeyError, IndexError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering_key = self.get_ordering_key(request, queryset)
+        position = self.decode_cursor(request)
+
+        if self.ordering_key == 'updated_at':
+            queryset = queryset.order_by('updated_at', 'id')
+            if position is not None:
+                updated_at, pk = position
+                queryset = queryset.filter(
+                    Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+                )
+        else:
+            queryset = queryset.order_by('id')
+            if position is not None:
+                queryset = queryset.filter(id__gt=position[0])
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > self.page_size
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Sayfalama cursor değeri (önceki yanıttaki `next`).',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Sayfa başına kayıt (en fazla {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.ordering_query_param,
+                'required': False,
+                'in': 'query',
+                'description': "Keyset sıralaması: 'id' (varsayılan) veya 'updated_at'.",
+                'schema': {'type': 'string', 'enum': ['id', 'updated_at']},
+            },
+        ]
+
+
+class RequiredKeysetPagination(KeysetPagination):
+    """Her zaman sayfalayan keyset sayfalama; büyük tablolarda düz dizi dönülmez."""
+    page_size = 50
+    max_page_size = 200
+
+    def is_requested(self, request):
+        return True
@@ -0,0 +1,107 @@
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from .cache_versions import bump_version, get_version, get_versions
+
+# Nadiren değişen referans tablolar (Currency, City, ...) için okuma önbelleği.
+# Anahtarlar model sürümünü içerir: `ref:<label>:<sürüm>:<pk>`. Kayıt değiştiğinde
+# sürüm artırılır, eski anahtarlar kendiliğinden erişilmez hale gelir ve TIMEOUT ile düşer.
+
+CACHE_ALIAS = 'reference'
+
+
+class ReferenceCache:
+
+    def __init__(self, alias=CACHE_ALIAS):
+        self.alias = alias
+        self.models = {}
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def register(self, model, select_related=()):
+        """Modeli önbelleğe kaydeder ve değişikliklerde sürümü artıran sinyalleri bağlar."""
+        self.models[model._meta.label_lower] = (model, tuple(select_related))
+        uid = f'reference-cache:{model._meta.label_lower}'
+        post_save.connect(self._on_change, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self._on_change, sender=model, weak=False, dispatch_uid=uid)
+
+    def is_registered(self, model):
+        return model._meta.label_lower in self.models
+
+    def _version_key(self, model):
+        return f'ref:{model._meta.label_lower}:version'
+
+    def version(self, model):
+        return get_version(self.cache, self._version_key(model))
+
+    def versions(self, models):
+        """Modellerin sürümleri, verilen sırayla; tek get_many ile okunur."""
+        keys = [self._version_key(model) for model in models]
+        versions = get_versions(self.cache, keys)
+        return [versions[key] for key in keys]
+
+    def invalidate(self, model):
+        bump_version(self.cache, self._version_key(model))
+
+    def _on_change(self, sender, **kwargs):
+        self.invalidate(sender)
+        # Commit'ten önce eski değeri okuyup yazan istekler olabilir; commit sonrası tekrar düşür
+        transaction.on_commit(lambda: self.invalidate(sender))
+
+    def _key(self, model, version, pk):
+        return f'ref:{model._meta.label_lower}:{version}:{pk}'
+
+    def _load(self, model, pks):
+        _, select_related = self.models[model._meta.label_lower]
+        queryset = model._default_manager.filter(pk__in=pks)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        return {obj.pk: obj for obj in queryset}
+
+    def get_many(self, model, pks):
+        """Verilen pk'ları {pk: nesne} olarak döndürür; eksikleri tek sorguda yükler."""
+        pks = {pk for pk in pks if pk is not None}
+        if not pks:
+            return {}
+        version = self.version(model)
+        keys = {self._key(model, version, pk): pk for pk in pks}
+        found = {keys[key]: obj for key, obj in self.cache.get_many(list(keys)).items()}
+        missing = pks - found.keys()
+        if missing:
+            loaded = self._load(model, missing)
+            self.cache.set_many({self._key(model, version, pk): obj for pk, obj in loaded.items()})
+            found.update(loaded)
+        return found
+
+    def get(self, model, pk):
+        return self.get_many(model, [pk]).get(pk)
+
+
+reference_cache = ReferenceCache()
+
+
+class CachedReferenceMixin:
+    """
+    İç içe kullanılan referans serializer'ları için (ör. `CitySerializer(source='city')`).
+    İlişki select_related ile yüklenmemişse nesneyi JOIN yerine önbellekten okur.
+    """
+
+    def get_attribute(self, instance):
+        if isinstance(instance, models.Model) and len(self.source_attrs) == 1:
+            try:
+                field = instance._meta.get_field(self.source_attrs[0])
+            except FieldDoesNotExist:
+                field = None
+            if (
+                field is not None and field.many_to_one
+                and reference_cache.is_registered(field.related_model)
+                and not field.is_cached(instance)
+            ):
+                pk = getattr(instance, field.attname)
+                if pk is None:
+                    return None
+                return reference_cache.get(field.related_model, pk)
+        return super().get_attribute(instance)
@@ -59,6 +59,9 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.tenant.TenantContextMiddleware',  # İstek başına tenant bağlamı
+    'companies.middleware.APIUsageMiddleware',  # API anahtarlı isteklerin APIUsage kaydı
+    'companies.middleware.AuditMiddleware',  # İstek başına denetim kaydı kuyruğu
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -135,6 +138,22 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Yüklenen görsellerin küçük kopyaları (core.images). Dosya adları içerik hash'i taşır;
+# WORKERS thread'li havuzda üretilir, ASYNC kapalıysa istek içinde üretilir.
+# Variant'lar MEDIA_ROOT altında `<yükleme dizini>/variants/<kullanıcı>/` yoluna yazılır
+# (accounts.photos). Django medyayı yalnızca DEBUG'da sunar ve bu yol için
+# `Cache-Control: public, max-age=31536000, immutable` verir (core/urls.py). Üretimde başlığı
+# medya sunucusu vermelidir; yoksa tarayıcılar variant'ları her seferinde doğrular. nginx örneği:
+#     location ~ ^/media/.+/variants/ {
+#         add_header Cache-Control "public, max-age=31536000, immutable";
+#     }
+IMAGE_VARIANTS = {
+    'SIZES': (64, 256),
+    'FORMATS': ('webp', 'jpeg'),
+    'WORKERS': 2,
+    'ASYNC': True,
+}
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -146,12 +165,13 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.TenantJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': None,
+    # İsteğe bağlı keyset sayfalama: `cursor` veya `page_size` gönderilmezse liste düz dizi döner
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
 
 }
 
@@ -162,7 +182,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # last_login, girişte gönderilen user_logged_in sinyalinin django.contrib.auth alıcısıyla yazılır
+    'UPDATE_LAST_LOGIN': False,
 
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -178,9 +199,148 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Token kullanıcısı (accounts.authentication)
+# STATELESS açıkken okuma istekleri kullanıcıyı token claim'lerinden kurar; token_version
+# 'tokens' önbelleğinde VERSION_CACHE_TIMEOUT saniye tutulur. token/verify/ yanıtındaki profil
+# verisi aynı önbellekte PROFILE_CACHE_TIMEOUT saniye tutulur. Çok süreçli kurulumda
+# TOKEN_CACHE_URL ile paylaşılan önbellek verilmelidir (biçim REFERENCE_CACHE_URL ile aynı);
+# verilmezse süreç içi önbellekte geçersiz kılma diğer süreçlere ulaşmaz, bu yüzden profil
+# verisi de sürüm kadar (60 sn) tutulur.
+TOKEN_CACHE_URL = os.environ.get('TOKEN_CACHE_URL', '')
+
+TOKEN_USER = {
+    'STATELESS': True,
+    'CACHE_ALIAS': 'tokens',
+    'VERSION_CACHE_TIMEOUT': 60,
+    'PROFILE_CACHE_TIMEOUT': 60 * 60 if TOKEN_CACHE_URL else 60,
+}
+
+# Refresh token kara listesi (accounts.blacklist)
+# Kontroller süreç içi bloom filtresinden geçer; SYNC_INTERVAL saniyede bir diğer süreçlerin
+# iptalleri okunur, filtre REBUILD_INTERVAL saniyede bir yeniden kurulur.
+# Süresi dolan kayıtlar `python manage.py prune_revoked_tokens` ile silinir.
+REFRESH_BLACKLIST = {
+    'CAPACITY': 1_000_000,
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 5,
+    'REBUILD_INTERVAL': 3600,
+}
+
+# Fiyat aralığı indeksi (records.pricing)
+# PROCESS_CACHE açıkken indeksler süreç içinde paylaşılır ve kayıt kaydedildiğinde geçersiz kılınır.
+PRICE_INDEX = {
+    'PROCESS_CACHE': False,
+    'MAX_ENTRIES': 10000,
+}
+
+# Önbellek Ayarları
+# Referans veriler (para birimi, şehir, ilçe, mahalle, araç tipi, plan) 'reference' önbelleğinden okunur.
+# REFERENCE_CACHE_URL: 'redis://host:6379/1' (Redis protokolü), 'file:///var/tmp/tour-cache' (dosya)
+# veya boş (süreç içi LocMem; testler ve geliştirme için).
+REFERENCE_CACHE_URL = os.environ.get('REFERENCE_CACHE_URL', '')
+
+
+def cache_backend(url, local_name):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+        }
+    if url.startswith('file://'):
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': url[len('file://'):],
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': local_name,
+    }
+
+
+REFERENCE_CACHE_BACKEND = cache_backend(REFERENCE_CACHE_URL, 'reference-data')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reference': {
+        **REFERENCE_CACHE_BACKEND,
+        'TIMEOUT': 60 * 60 * 24,
+        'KEY_PREFIX': 'tour',
+    },
+    'tokens': {
+        **cache_backend(TOKEN_CACHE_URL, 'token-data'),
+        'TIMEOUT': 60 * 60,
+        'KEY_PREFIX': 'tour',
+    },
+}
+
 # Email as Username Settings
 AUTHENTICATION_BACKENDS = ['accounts.backends.EmailBackend']
 
+# ASGI altında (core/asgi.py) /api/accounts/token/ async görünümle servis edilir.
+# LOGIN_HASH_WORKERS eşzamanlı PBKDF2 doğrulaması sayısını sınırlar.
+ASYNC_LOGIN = os.environ.get('ASYNC_LOGIN') == '1'
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 4))
+
+# Toplu kullanıcı oluşturma (accounts.provisioning): şifreler bu kadar süreçte hash'lenir
+PROVISIONING_HASH_WORKERS = int(os.environ.get('PROVISIONING_HASH_WORKERS', os.cpu_count() or 2))
+PROVISIONING_BATCH_SIZE = 500
+
+# Toplu kullanım ölçümü (companies.ingest): olaylar (şirket, abonelik, özellik, gün) bazında
+# bellekte toplanır; MAX_PENDING_EVENTS olaya ulaşınca veya FLUSH_INTERVAL saniyede bir yazılır.
+# Idempotency-Key değerleri paylaşılan önbellek yerine UsageIngestKey tablosunda, olaylarla aynı
+# transaction'da saklanır; tüm süreçler için geçerlidir ve IDEMPOTENCY_TIMEOUT saniye sonra silinir.
+# Yazılamayan bir istek (süreç çökmesi, veritabanı hatası) aynı anahtarla tekrar gönderilebilir.
+USAGE_INGEST = {
+    'MAX_PENDING_EVENTS': 50_000,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_EVENTS_PER_REQUEST': 10_000,
+    'IDEMPOTENCY_TIMEOUT': 60 * 60 * 24,
+    'MAX_RETRIES': 3,
+    'ASYNC': True,
+}
+
+# Katalog delta senkronizasyonu (records.sync): yanıtta her tipten en fazla PAGE_SIZE kayıt
+# bulunur; kalanlar has_more/cursor ile sonraki isteklerde gelir.
+CATALOG_SYNC = {
+    'PAGE_SIZE': 1000,
+}
+
+# API anahtarlı isteklerin kaydı (companies.middleware): en fazla CAPACITY kayıt bekler,
+# BATCH_SIZE kayıtta veya FLUSH_INTERVAL saniyede bir yazılır; tampon doluysa kayıt atılır.
+API_USAGE_LOG = {
+    'CAPACITY': 10_000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 0.5,
+    'ASYNC': True,
+}
+
+# API anahtarı doğrulaması (companies.authentication): özet aramaları süreç içinde CACHE_TTL
+# saniye tutulur; last_used_at anahtar başına en fazla LAST_USED_INTERVAL saniyede bir yazılır.
+# Bulunan anahtarlar MAX_ENTRIES, bilinmeyen özetler ayrı MISS_ENTRIES sınırlı LRU'da tutulur.
+# Önbellek süreç içidir: kaydetme sinyali yalnızca aynı süreçteki kaydı düşürür, bu yüzden
+# is_active=False veya silinen bir anahtar diğer süreçlerde en fazla CACHE_TTL saniye daha
+# geçerli kalır. Ani iptal gerekiyorsa CACHE_TTL düşürülmelidir.
+API_KEY_AUTH = {
+    'CACHE_TTL': 30,
+    'MAX_ENTRIES': 10_000,
+    'MISS_ENTRIES': 1_000,
+    'LAST_USED_INTERVAL': 60,
+    'FLUSH_INTERVAL': 5.0,
+    'ASYNC': True,
+}
+
+# Denetim kaydı (companies.audit): APPS uygulamalarının modelleri izlenir; girdiler
+# MAX_PENDING kayıtta veya FLUSH_INTERVAL saniyede bir arka planda yazılır.
+AUDIT = {
+    'APPS': ('records', 'operations'),
+    'EXCLUDE': ('records.DeletedRecord',),
+    'MAX_PENDING': 1000,
+    'FLUSH_INTERVAL': 1.0,
+    'ASYNC': True,
+}
+
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = True 
 
@@ -192,6 +352,12 @@ SWAGGER_SETTINGS = {
             'type': 'apiKey',
             'name': 'Authorization',
             'in': 'header'
+        },
+        # Yalnızca ölçüm uçlarında (companies UsageViewSet) geçerli
+        'ApiKey': {
+            'type': 'apiKey',
+            'name': 'X-API-Key',
+            'in': 'header'
         }
     },
     'USE_SESSION_AUTH': False,
@@ -0,0 +1,54 @@
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    """
+    Satırları tek tek JSON dizisi olarak yazan renderer.
+    Tüm liste bellekte tutulmaz; her satır serialize edilip hemen gönderilir.
+    """
+
+    def render_rows(self, rows):
+        yield b'['
+        first = True
+        for row in rows:
+            if not first:
+                yield b','
+            first = False
+            yield self.render(row)
+        yield b']'
+
+
+class StreamingListMixin:
+    """
+    `?stream=1` ile liste yanıtını sunucu tarafı iterator'dan akış olarak döndürür.
+    Sayfalama istenmişse (ör. `cursor`) normal liste akışı kullanılır.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def is_stream_requested(self, request):
+        return request.query_params.get(self.stream_query_param) in ('1', 'true')
+
+    def is_page_requested(self, request):
+        paginator = self.paginator
+        if paginator is None:
+            return False
+        if hasattr(paginator, 'is_requested'):
+            return paginator.is_requested(request)
+        return True
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_stream_requested(request) or self.is_page_requested(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = (
+            serializer.to_representation(instance)
+            for instance in queryset.iterator(chunk_size=self.stream_chunk_size)
+        )
+        return StreamingHttpResponse(
+            StreamingJSONRenderer().render_rows(rows),
+            content_type='application/json'
+        )
@@ -0,0 +1,138 @@
+import contextvars
+from django.db.models import F
+from django.utils.functional import cached_property
+from companies.models import Company
+from .middleware import HybridMiddleware
+
+# İstek boyunca geçerli tenant bağlamı. Serializer, sinyal gibi request nesnesine
+# erişemeyen kodlar current_tenant() ile okur.
+_current_request = contextvars.ContextVar('current_request', default=None)
+
+
+class TenantContext:
+    """
+    İstek sahibinin şirket, şube ve rol bilgisi; istek başına bir kez kurulur.
+    Tüm alanlar tamsayı kimliklerdir, model nesnesi yüklenmez.
+    """
+    SUPERUSER = 'superuser'
+    COMPANY_ADMIN = 'company_admin'
+    BRANCH_ADMIN = 'branch_admin'
+    EMPLOYEE = 'employee'
+    ANONYMOUS = 'anonymous'
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user is not None and user.is_authenticated)
+        self.user_id = user.pk if self.is_authenticated else None
+        self.company_id = getattr(user, 'company_id', None) if self.is_authenticated else None
+        self.branch_id = getattr(user, 'branch_id', None) if self.is_authenticated else None
+        self.is_superuser = self.is_authenticated and bool(user.is_superuser)
+        self.is_company_admin = self.is_authenticated and bool(getattr(user, 'is_company_admin', False))
+        self.is_branch_admin = self.is_authenticated and bool(getattr(user, 'is_branch_admin', False))
+
+    def __repr__(self):
+        return f"<TenantContext user={self.user_id} company={self.company_id} branch={self.branch_id} role={self.role}>"
+
+    @property
+    def role(self):
+        if not self.is_authenticated:
+            return self.ANONYMOUS
+        if self.is_superuser:
+            return self.SUPERUSER
+        if self.is_company_admin:
+            return self.COMPANY_ADMIN
+        if self.is_branch_admin:
+            return self.BRANCH_ADMIN
+        return self.EMPLOYEE
+
+    @cached_property
+    def plan_limits(self):
+        """Şirketin güncel planındaki limitler; ilk erişimde tek sorguyla okunur."""
+        if self.company_id is None:
+            return None
+        return Company.objects.filter(pk=self.company_id, current_plan__isnull=False).values(
+            max_users=F('current_plan__max_users'),
+            max_branches=F('current_plan__max_branches'),
+            max_storage=F('current_plan__max_storage'),
+        ).first()
+
+    def owns_company(self, company_id):
+        return self.company_id is not None and self.company_id == company_id
+
+    def owns_branch(self, branch_id):
+        return self.branch_id is not None and self.branch_id == branch_id
+
+    def scope(self, queryset, company='company', branch=None, owner=None):
+        """
+        Rol tabanlı filtre. Süper kullanıcı tüm kayıtları, şirket yöneticisi şirketini,
+        şube yöneticisi `branch` yolu verilmişse şubesini, diğer kullanıcılar `owner`
+        yolu verilmişse kendi kayıtlarını, verilmemişse şirketini görür.
+        """
+        if self.is_superuser:
+            return queryset
+        if not self.is_authenticated:
+            return queryset.none()
+        if self.is_company_admin:
+            return queryset.filter(**{f'{company}_id': self.company_id})
+        if self.is_branch_admin and branch:
+            return queryset.filter(**{f'{branch}_id': self.branch_id})
+        if not self.is_branch_admin and owner:
+            return queryset.filter(**{f'{owner}_id': self.user_id})
+        return queryset.filter(**{f'{company}_id': self.company_id})
+
+    @classmethod
+    def for_request(cls, request):
+        """
+        DRF kimlik doğrulaması middleware'den sonra çalıştığı için bağlam ilk erişimde
+        kurulur ve istek üzerinde saklanır; kullanıcı değişirse yeniden kurulur.
+        """
+        http_request = getattr(request, '_request', request)
+        user = getattr(request, 'user', None)
+        context = http_request.__dict__.get('_tenant_context')
+        if context is None or context.user is not user:
+            context = cls(user)
+            http_request._tenant_context = context
+        return context
+
+
+def current_request():
+    """TenantContextMiddleware içinde işlenen istek; istek dışında (komut, shell) None."""
+    return _current_request.get()
+
+
+def current_tenant():
+    request = _current_request.get()
+    if request is None:
+        return None
+    return TenantContext.for_request(request)
+
+
+class TenantContextMiddleware(HybridMiddleware):
+    """
+    İsteği bağlam değişkenine bağlar; current_tenant() istek bitene kadar bu isteği kullanır.
+    ASGI'de senkron view'lar sync_to_async ile bağlamın kopyasında çalıştığı için değeri görür.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+
+class TenantScopedMixin:
+    """ViewSet'lere `self.tenant` sağlar."""
+
+    @property
+    def tenant(self):
+        return TenantContext.for_request(self.request)
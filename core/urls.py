@@ -15,7 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+from django.urls import path, include, re_path
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import permissions
@@ -69,6 +72,18 @@ urlpatterns = [
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),  # ReDoc UI
 ]
 
+# Görsel variant'larının adları içerik hash'i taşır; süresiz önbelleklenebilir.
+# Bu yol yalnızca DEBUG'da çalışır; üretimde gereken medya sunucusu kuralı IMAGE_VARIANTS
+# ayarının yanında (core/settings.py) anlatılmıştır.
+if settings.DEBUG:
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.*/variants/[^/]+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            cache_control(public=True, max_age=60 * 60 * 24 * 365, immutable=True)(serve),
+            {'document_root': settings.MEDIA_ROOT},
+        ),
+    ]
+
 # Statik dosyalar ve medya dosyaları için ayarlamalar
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
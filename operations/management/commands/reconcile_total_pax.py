@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from companies.querysets import count_subquery
+from operations.models import Operation, OperationCustomer
+
+
+class Command(BaseCommand):
+    help = "Operasyonların total_pax değerini aktif müşteri sayısıyla karşılaştırır ve sapmaları düzeltir."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Sadece sapmaları listeler, yazmaz.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        operations = Operation.objects.annotate(
+            active_count=Count('customers', filter=Q(customers__is_active=True))
+        ).only('id', 'total_pax')
+
+        drifted = []
+        for operation in operations.iterator(chunk_size=options['batch_size']):
+            if operation.total_pax != operation.active_count:
+                self.stdout.write(
+                    f"{operation.pk}: {operation.total_pax} -> {operation.active_count}"
+                )
+                drifted.append(operation.pk)
+
+        if not options['dry_run']:
+            # Sayım UPDATE içinde yeniden yapılır; okuma ile yazma arasında gelen F() artışları kaybolmaz
+            active_count = count_subquery(OperationCustomer.objects.all(), 'operation', Q(is_active=True))
+            size = options['batch_size']
+            for start in range(0, len(drifted), size):
+                Operation.objects.filter(pk__in=drifted[start:start + size]).update(total_pax=active_count)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(drifted)} operasyonda sapma bulundu" + (" (dry-run)" if options['dry_run'] else " ve düzeltildi")
+        ))
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:20
+
+import re
+
+from django.db import migrations, models
+
+REFERENCE_PATTERN = re.compile(r'^(?P<short_name>.*?)(?P<date_code>\d{6})(?P<value>\d{3,})$')
+
+
+def backfill_sequences(apps, schema_editor):
+    """Mevcut referans numaralarından her (kısa ad, ddmmyy) için en yüksek sırayı yazar."""
+    Operation = apps.get_model('operations', 'Operation')
+    ReferenceSequence = apps.get_model('operations', 'ReferenceSequence')
+
+    counters = {}
+    rows = Operation.objects.values_list('reference_number', 'buyer_company__short_name', 'start_date')
+    for reference, short_name, start_date in rows.iterator(chunk_size=2000):
+        if not reference:
+            continue
+        prefix = f"{short_name}{start_date.strftime('%d%m%y')}"
+        suffix = reference[len(prefix):]
+        if reference.startswith(prefix) and suffix.isdigit():
+            key = (short_name, prefix[len(short_name):])
+        else:
+            # Kısa adı sonradan değişmiş alıcıların eski referansları
+            match = REFERENCE_PATTERN.match(reference)
+            if not match:
+                continue
+            key = (match['short_name'], match['date_code'])
+            suffix = match['value']
+        counters[key] = max(counters.get(key, 0), int(suffix))
+
+    ReferenceSequence.objects.bulk_create(
+        [
+            ReferenceSequence(short_name=short_name, date_code=date_code, last_value=value)
+            for (short_name, date_code), value in counters.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('short_name', models.CharField(max_length=50, verbose_name='Short Name')),
+                ('date_code', models.CharField(max_length=6, verbose_name='Date Code')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Last Value')),
+            ],
+            options={
+                'verbose_name': 'Reference Sequence',
+                'verbose_name_plural': 'Reference Sequences',
+                'unique_together': {('short_name', 'date_code')},
+            },
+        ),
+        migrations.RunPython(backfill_sequences, migrations.RunPython.noop),
+    ]
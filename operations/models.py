@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Case, When, Value
+from django.db.models.functions import Greatest
 from django.core.exceptions import ValidationError
 from companies.models import Company, Currency, Branch
 from records.models import (
@@ -7,6 +9,37 @@ from records.models import (
 )
 from accounts.models import CustomUser
 from datetime import timedelta
+
+class ReferenceSequence(models.Model):
+    """
+    (kısa ad, ddmmyy) anahtarı için son verilen referans sıra numarası.
+    Sayaç satırı kilitlenip F() ile artırıldığından eşzamanlı oluşturmalarda çakışma olmaz.
+    """
+    short_name = models.CharField(verbose_name="Short Name", max_length=50)
+    date_code = models.CharField(verbose_name="Date Code", max_length=6)
+    last_value = models.PositiveIntegerField(verbose_name="Last Value", default=0)
+
+    def __str__(self):
+        return f"{self.short_name}{self.date_code} ({self.last_value})"
+
+    @classmethod
+    def next_value(cls, short_name, date_code):
+        with transaction.atomic():
+            sequence, created = cls.objects.select_for_update().get_or_create(
+                short_name=short_name,
+                date_code=date_code,
+                defaults={'last_value': 1}
+            )
+            if created:
+                return sequence.last_value
+            cls.objects.filter(pk=sequence.pk).update(last_value=F('last_value') + 1)
+            return cls.objects.values_list('last_value', flat=True).get(pk=sequence.pk)
+
+    class Meta:
+        verbose_name = "Reference Sequence"
+        verbose_name_plural = "Reference Sequences"
+        unique_together = ('short_name', 'date_code')
+
 class Operation(models.Model):
     DRAFT = 'DRAFT'
     CONFIRMED = 'CONFIRMED'
@@ -59,47 +92,80 @@ class Operation(models.Model):
         if self.end_date < self.start_date:
             raise ValidationError("End date cannot be before start date")
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, shift_days=False, **kwargs):
         is_new = self.pk is None
         old_start_date = None
         old_end_date = None
 
-        # Referans numarası oluşturma
+        # Referans numarası oluşturma: kısa ad + ddmmyy + sıra numarası
         if not self.reference_number:
-            if not self.pk or self.buyer_company.short_name != Operation.objects.get(pk=self.pk).buyer_company.short_name or self.start_date != Operation.objects.get(pk=self.pk).start_date:
-                kisa_ad = self.buyer_company.short_name
-                tarih_format = self.start_date.strftime("%d%m%y")
-
-                # Benzersiz bir referans numarası oluşturana kadar döngü
-                tur_sayisi = 1
-                while True:
-                    potansiyel_referans = f"{kisa_ad}{tarih_format}{str(tur_sayisi).zfill(3)}"
-                    if not Operation.objects.filter(reference_number=potansiyel_referans).exclude(pk=self.pk).exists():
-                        self.reference_number = potansiyel_referans
-                        break
-                    tur_sayisi += 1
-
-        # Gün oluşturma işlemleri
-        if not is_new:
-            old_instance = Operation.objects.get(pk=self.pk)
-            old_start_date = old_instance.start_date
-            old_end_date = old_instance.end_date
-
-        super().save(*args, **kwargs)
-
-        # Yeni kayıt veya tarihler değişmişse günleri oluştur
-        if is_new or old_start_date != self.start_date or old_end_date != self.end_date:
-            if not is_new:
-                self.days.all().delete()
-
-            current_date = self.start_date
-            while current_date <= self.end_date:
-                OperationDay.objects.create(
-                    operation=self,
-                    date=current_date,
-                    is_active=True
-                )
-                current_date += timedelta(days=1)
+            kisa_ad = self.buyer_company.short_name
+            tarih_format = self.start_date.strftime("%d%m%y")
+            tur_sayisi = ReferenceSequence.next_value(kisa_ad, tarih_format)
+            self.reference_number = f"{kisa_ad}{tarih_format}{str(tur_sayisi).zfill(3)}"
+
+        # Gün oluşturma işlemleri (update_fields tarihleri içermiyorsa günlere dokunulmaz)
+        update_fields = kwargs.get('update_fields')
+        dates_may_change = is_new or update_fields is None or {'start_date', 'end_date'} & set(update_fields)
+        if not is_new and dates_may_change:
+            old_start_date, old_end_date = Operation.objects.filter(pk=self.pk).values_list(
+                'start_date', 'end_date'
+            ).get()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Yeni kayıt veya tarihler değişmişse günleri uzlaştır
+            if dates_may_change and (is_new or old_start_date != self.start_date or old_end_date != self.end_date):
+                self.sync_days(old_start_date, shift=shift_days)
+
+    def sync_days(self, old_start_date=None, shift=False):
+        """
+        Operasyon günlerini yeni tarih aralığıyla uzlaştırır.
+
+        Aralık dışında kalan günler (ve öğeleri) silinir, eksik günler toplu oluşturulur,
+        aralıkta kalan günler öğeleriyle korunur. `shift=True` ise mevcut günler önce
+        başlangıç tarihindeki fark kadar kaydırılır; böylece ertelenen bir turun programı
+        kaybolmaz. Gün sayısından bağımsız olarak sabit sayıda sorgu çalışır.
+        """
+        days = list(self.days.only('id', 'operation', 'date'))
+
+        if shift and old_start_date is not None and old_start_date != self.start_date:
+            delta = self.start_date - old_start_date
+            for day in days:
+                day.date += delta
+            OperationDay.objects.bulk_update(days, ['date'])
+
+        in_range = [day for day in days if self.start_date <= day.date <= self.end_date]
+        out_of_range = [day.id for day in days if not self.start_date <= day.date <= self.end_date]
+        if out_of_range:
+            OperationDay.objects.filter(id__in=out_of_range).delete()
+
+        existing_dates = {day.date for day in in_range}
+        missing = []
+        current_date = self.start_date
+        while current_date <= self.end_date:
+            if current_date not in existing_dates:
+                missing.append(OperationDay(operation=self, date=current_date, is_active=True))
+            current_date += timedelta(days=1)
+        if missing:
+            OperationDay.objects.bulk_create(missing)
+
+    @classmethod
+    def adjust_total_pax(cls, deltas):
+        """
+        {operation_id: fark} sözlüğündeki farkları tek bir UPDATE ile total_pax'e uygular.
+        Sayım sorgusu çalışmaz; sapma olursa `reconcile_total_pax` komutu düzeltir.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if pk is not None and delta}
+        if not deltas:
+            return
+        change = Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+            default=Value(0),
+            output_field=models.IntegerField()
+        )
+        cls.objects.filter(pk__in=deltas).update(total_pax=Greatest(F('total_pax') + change, Value(0)))
 
     def __str__(self):
         return f"{self.reference_number} - {self.buyer_company.name} (Follow by: {self.follow_by.get_full_name()})"
@@ -150,32 +216,49 @@ class OperationCustomer(models.Model):
     def __str__(self):
         return self.get_full_name()
 
-    def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # total_pax farkını hesaplamak için yüklenen durumu sakla
+        instance._loaded_pax_state = (instance.__dict__.get('operation_id'), instance.__dict__.get('is_active'))
+        return instance
 
-        # Müşteri eklendiğinde veya silindiğinde total_pax'i güncelle
-        if is_new or not self.is_active:
-            active_customers = OperationCustomer.objects.filter(
-                operation=self.operation,
-                is_active=True
-            ).count()
+    def _pax_state(self):
+        return self.operation_id, self.is_active
 
-            self.operation.total_pax = active_customers
-            self.operation.save(update_fields=['total_pax'])
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            old_operation_id, was_active = None, False
+        else:
+            old_operation_id, was_active = getattr(self, '_loaded_pax_state', (None, None))
+            if old_operation_id is None or was_active is None:
+                old_operation_id, was_active = OperationCustomer.objects.filter(pk=self.pk).values_list(
+                    'operation_id', 'is_active'
+                ).get()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Müşteri eklendiğinde, pasifleştiğinde veya taşındığında total_pax'i sayım yapmadan güncelle
+            if old_operation_id == self.operation_id:
+                Operation.adjust_total_pax({self.operation_id: int(self.is_active) - int(was_active)})
+            else:
+                Operation.adjust_total_pax({
+                    old_operation_id: -int(was_active),
+                    self.operation_id: int(self.is_active),
+                })
+        self._loaded_pax_state = self._pax_state()
 
     def delete(self, *args, **kwargs):
-        operation = self.operation
-        super().delete(*args, **kwargs)
-
-        # Müşteri silindiğinde total_pax'i güncelle
-        active_customers = OperationCustomer.objects.filter(
-            operation=operation,
-            is_active=True
-        ).count()
-
-        operation.total_pax = active_customers
-        operation.save(update_fields=['total_pax'])
+        operation_id, was_active = getattr(self, '_loaded_pax_state', (None, None))
+        if operation_id is None or was_active is None:
+            operation_id, was_active = self._pax_state()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+
+            # Müşteri silindiğinde total_pax'i güncelle
+            Operation.adjust_total_pax({operation_id: -int(was_active)})
+        return result
 
     class Meta:
         verbose_name = "Operation Customer"
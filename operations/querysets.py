@@ -0,0 +1,68 @@
+from django.db.models import Prefetch
+from records.models import Museum
+from records.querysets import (
+    apply_lookups, tour_lookups, transfer_lookups, no_vehicle_tour_lookups,
+    hotel_lookups, museum_lookups, activity_lookups, guide_lookups,
+    vehicle_supplier_lookups, activity_supplier_lookups,
+    vehicle_cost_lookups, activity_cost_lookups
+)
+from .models import OperationDay, OperationItem, OperationSubItem
+
+# Operasyon başlığındaki ilişkiler (CompanyBasic, BranchBasic, BuyerCompany, UserSerializer)
+OPERATION_HEADER_RELATED = [
+    'company',
+    'branch__company',
+    'buyer_company__company',
+    'created_by__company',
+    'created_by__branch__company',
+    'follow_by__company',
+    'follow_by__branch__company',
+]
+
+
+def subitem_queryset():
+    queryset = OperationSubItem.objects.all()
+    queryset = apply_lookups(
+        queryset,
+        tour_lookups('tour'),
+        transfer_lookups('transfer'),
+        hotel_lookups('hotel'),
+        guide_lookups('guide'),
+        activity_lookups('activity'),
+        activity_supplier_lookups('activity_supplier'),
+        activity_cost_lookups('activity_cost'),
+    )
+    return queryset.prefetch_related(
+        Prefetch('museums', queryset=apply_lookups(Museum.objects.all(), museum_lookups()))
+    )
+
+
+def item_queryset():
+    queryset = OperationItem.objects.all()
+    queryset = apply_lookups(
+        queryset,
+        vehicle_supplier_lookups('vehicle_supplier'),
+        vehicle_cost_lookups('vehicle_cost'),
+        no_vehicle_tour_lookups('no_vehicle_tour'),
+        activity_lookups('no_vehicle_activity'),
+        activity_supplier_lookups('activity_supplier'),
+        activity_cost_lookups('activity_cost'),
+    )
+    return queryset.prefetch_related(Prefetch('subitems', queryset=subitem_queryset()))
+
+
+def day_queryset():
+    return OperationDay.objects.prefetch_related(Prefetch('items', queryset=item_queryset()))
+
+
+def with_detail_tree(queryset):
+    """
+    OperationDetailSerializer'ın okuduğu tüm ağacı sabit sayıda sorguyla yükler.
+    Sorgu sayısı gün, öğe ve alt öğe sayısından bağımsızdır; para birimi ve araç tipi
+    gibi referans alanlar core.reference_cache üzerinden çözülür.
+    """
+    return queryset.select_related(*OPERATION_HEADER_RELATED).prefetch_related(
+        'customers',
+        'sales_prices',
+        Prefetch('days', queryset=day_queryset()),
+    )
@@ -94,4 +94,18 @@ class OperationDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Operation
-        fields = '__all__' 
\ No newline at end of file
+        fields = '__all__'
+
+class OperationRescheduleSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    shift_days = serializers.BooleanField(
+        default=True,
+        help_text="Mevcut günler ve öğeleri başlangıç farkı kadar kaydırılsın mı?"
+    )
+
+    def validate(self, attrs):
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError("End date cannot be before start date")
+        return attrs
+
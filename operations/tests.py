@@ -1,3 +1,314 @@
+import uuid
+from io import StringIO
+from datetime import date, time, timedelta
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from companies.models import BranchStats, Company, Branch, City, Currency
+from records.models import (
+    BuyerCompany, Tour, Hotel, Museum, Activity, Guide,
+    VehicleSupplier, VehicleType, VehicleCost, ActivitySupplier, ActivityCost
+)
+from .models import Operation, OperationCustomer, OperationItem, OperationSubItem, ReferenceSequence
 
-# Create your tests here.
+
+class OperationTestMixin:
+    """Operasyon testleri için ortak veri kurulumu."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.currency = Currency.objects.create(code='EUR', name='Euro', symbol='€')
+        cls.city = City.objects.create(name='İstanbul', code='IST')
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555', email='info@testtur.com',
+            tenant_id=uuid.uuid4()
+        )
+        cls.branch = Branch.objects.create(
+            company=cls.company, name='Merkez', email='merkez@testtur.com',
+            phone='555', address='Adres', city=cls.city
+        )
+        cls.user = CustomUser.objects.create_superuser(
+            username='admin', email='admin@testtur.com', password='pass12345',
+            company=cls.company, branch=cls.branch
+        )
+        cls.buyer = BuyerCompany.objects.create(
+            company=cls.company, name='Alıcı', short_name='ALC', contact='info'
+        )
+        cls.vehicle_type = VehicleType.objects.create(name='Minivan')
+
+    def create_operation(self, days, **kwargs):
+        start = kwargs.pop('start_date', date(2030, 1, 1))
+        return Operation.objects.create(
+            company=self.company, branch=self.branch, buyer_company=self.buyer,
+            created_by=self.user, follow_by=self.user, start_date=start,
+            end_date=start + timedelta(days=days - 1), **kwargs
+        )
+
+
+class OperationDetailQueryCountTests(OperationTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def populate(self, operation):
+        valid_until = timezone.now().date() + timedelta(days=30)
+        for index, day in enumerate(operation.days.all()):
+            supplier = VehicleSupplier.objects.create(company=self.company, name=f'Araç {index}')
+            supplier.cities.add(self.city)
+            tour = Tour.objects.create(
+                company=self.company, name=f'Tur {index}', start_city=self.city, end_city=self.city
+            )
+            vehicle_cost = VehicleCost.objects.create(
+                company=self.company, supplier=supplier, tour=tour, car_cost=1, minivan_cost=2,
+                minibus_cost=3, midibus_cost=4, bus_cost=5, currency=self.currency,
+                valid_until=valid_until
+            )
+            activity = Activity.objects.create(company=self.company, name=f'Aktivite {index}')
+            activity.cities.add(self.city)
+            activity_supplier = ActivitySupplier.objects.create(company=self.company, name=f'Tedarikçi {index}')
+            activity_supplier.cities.add(self.city)
+            activity_cost = ActivityCost.objects.create(
+                company=self.company, activity=activity, supplier=activity_supplier, price=10,
+                currency=self.currency, valid_until=valid_until
+            )
+            hotel = Hotel.objects.create(
+                company=self.company, name=f'Otel {index}', city=self.city, single_price=1,
+                double_price=2, triple_price=3, currency=self.currency, valid_until=valid_until
+            )
+            museum = Museum.objects.create(
+                company=self.company, name=f'Müze {index}', city=self.city, local_price=1,
+                foreign_price=2, currency=self.currency, valid_until=valid_until
+            )
+            guide = Guide.objects.create(
+                company=self.company, name=f'Rehber {index}', phone='555', document_no='1'
+            )
+            guide.cities.add(self.city)
+
+            vehicle_item = OperationItem.objects.create(
+                operation_day=day, item_type=OperationItem.VEHICLE, pick_time=time(9), vehicle_type=self.vehicle_type,
+                vehicle_supplier=supplier, vehicle_cost=vehicle_cost, sales_currency=self.currency
+            )
+            OperationSubItem.objects.create(
+                operation_item=vehicle_item, ordering=1, subitem_type=OperationSubItem.TOUR, tour=tour
+            )
+            OperationSubItem.objects.create(
+                operation_item=vehicle_item, ordering=2, subitem_type=OperationSubItem.HOTEL,
+                hotel=hotel, room_type='DOUBLE'
+            )
+            museum_subitem = OperationSubItem.objects.create(
+                operation_item=vehicle_item, ordering=3, subitem_type=OperationSubItem.MUSEUM
+            )
+            museum_subitem.museums.add(museum)
+            OperationSubItem.objects.create(
+                operation_item=vehicle_item, ordering=4, subitem_type=OperationSubItem.GUIDE,
+                is_guide=True, guide=guide
+            )
+            OperationItem.objects.create(
+                operation_day=day, item_type=OperationItem.NO_VEHICLE_ACTIVITY, pick_time=time(14),
+                no_vehicle_activity=activity, activity_supplier=activity_supplier,
+                activity_cost=activity_cost
+            )
+
+    def count_detail_queries(self, operation):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/operations/operations/{operation.id}/')
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_detail_query_count_is_constant(self):
+        short = self.create_operation(days=2)
+        long = self.create_operation(days=6, start_date=date(2030, 2, 1))
+        self.populate(short)
+        self.populate(long)
+
+        cold_queries, _ = self.count_detail_queries(short)
+        short_queries, _ = self.count_detail_queries(short)
+        long_queries, data = self.count_detail_queries(long)
+
+        # Referans veriler ilk istekten sonra önbellekten okunur
+        self.assertLess(short_queries, cold_queries)
+
+        self.assertEqual(short_queries, long_queries)
+        self.assertEqual(len(data['days']), 6)
+        vehicle_item = data['days'][0]['items'][0]
+        self.assertIsNotNone(vehicle_item['vehicle_cost_detail']['current_price'])
+        hotel_detail = vehicle_item['subitems'][1]['hotel_detail']
+        self.assertEqual(hotel_detail['current_price']['currency'], 'EUR')
+
+
+class OperationDayReconciliationTests(OperationTestMixin, TestCase):
+
+    def add_item(self, operation, day_date):
+        day = operation.days.get(date=day_date)
+        return OperationItem.objects.create(
+            operation_day=day, item_type=OperationItem.VEHICLE, vehicle_type=self.vehicle_type
+        )
+
+    def test_extending_range_keeps_existing_days(self):
+        operation = self.create_operation(days=3)
+        item = self.add_item(operation, date(2030, 1, 2))
+        kept_day_id = item.operation_day_id
+
+        operation.end_date = date(2030, 1, 5)
+        operation.save()
+
+        self.assertEqual(
+            list(operation.days.values_list('date', flat=True)),
+            [date(2030, 1, day) for day in range(1, 6)]
+        )
+        self.assertTrue(OperationItem.objects.filter(pk=item.pk, operation_day_id=kept_day_id).exists())
+
+    def test_shrinking_range_deletes_only_out_of_range_days(self):
+        operation = self.create_operation(days=4)
+        kept = self.add_item(operation, date(2030, 1, 2))
+        dropped = self.add_item(operation, date(2030, 1, 4))
+
+        operation.end_date = date(2030, 1, 2)
+        operation.save()
+
+        self.assertEqual(operation.days.count(), 2)
+        self.assertTrue(OperationItem.objects.filter(pk=kept.pk).exists())
+        self.assertFalse(OperationItem.objects.filter(pk=dropped.pk).exists())
+
+    def test_shift_moves_itinerary(self):
+        operation = self.create_operation(days=3)
+        item = self.add_item(operation, date(2030, 1, 3))
+
+        operation.start_date = date(2030, 1, 11)
+        operation.end_date = date(2030, 1, 13)
+        operation.save(shift_days=True)
+
+        item.refresh_from_db()
+        self.assertEqual(item.operation_day.date, date(2030, 1, 13))
+        self.assertEqual(operation.days.count(), 3)
+
+    def test_reschedule_query_count_is_constant(self):
+        counts = []
+        for length in (5, 30):
+            operation = self.create_operation(days=length, start_date=date(2030, 3, 1) + timedelta(days=length))
+            operation = Operation.objects.get(pk=operation.pk)
+            operation.start_date += timedelta(days=7)
+            operation.end_date += timedelta(days=10)
+            with CaptureQueriesContext(connection) as context:
+                operation.save(shift_days=True)
+            counts.append(len(context.captured_queries))
+            self.assertEqual(operation.days.count(), length + 3)
+        self.assertEqual(counts[0], counts[1])
+
+
+class ReferenceNumberTests(OperationTestMixin, TestCase):
+
+    def test_sequential_references_per_prefix(self):
+        first = self.create_operation(days=1)
+        second = self.create_operation(days=1)
+        other_day = self.create_operation(days=1, start_date=date(2030, 1, 2))
+
+        self.assertEqual(first.reference_number, 'ALC010130001')
+        self.assertEqual(second.reference_number, 'ALC010130002')
+        self.assertEqual(other_day.reference_number, 'ALC020130001')
+
+    def test_allocation_query_count_does_not_grow(self):
+        self.create_operation(days=1)
+        with CaptureQueriesContext(connection) as early:
+            ReferenceSequence.next_value('ALC', '010130')
+        for _ in range(20):
+            ReferenceSequence.next_value('ALC', '010130')
+        with CaptureQueriesContext(connection) as late:
+            value = ReferenceSequence.next_value('ALC', '010130')
+        self.assertEqual(value, 23)
+        self.assertEqual(len(early.captured_queries), len(late.captured_queries))
+
+
+class TotalPaxTests(OperationTestMixin, TestCase):
+
+    def add_customer(self, operation, **kwargs):
+        return OperationCustomer.objects.create(
+            operation=operation, first_name='Ali', last_name='Veli', customer_type='ADULT', **kwargs
+        )
+
+    def test_incremental_updates(self):
+        operation = self.create_operation(days=1)
+        first = self.add_customer(operation)
+        second = self.add_customer(operation)
+        operation.refresh_from_db()
+        self.assertEqual(operation.total_pax, 2)
+
+        second.is_active = False
+        second.save()
+        first.delete()
+        operation.refresh_from_db()
+        self.assertEqual(operation.total_pax, 0)
+
+        other = self.create_operation(days=1)
+        second.operation = other
+        second.is_active = True
+        second.save()
+        operation.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((operation.total_pax, other.total_pax), (0, 1))
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.stats.active_customers, 1)
+        self.assertEqual(BranchStats.objects.get(branch=self.branch).active_customers, 1)
+
+    def test_customer_counters_use_loaded_operation(self):
+        operation = self.create_operation(days=1)
+        with CaptureQueriesContext(connection) as context:
+            self.add_customer(operation)
+        selects = [q['sql'] for q in context.captured_queries if q['sql'].startswith('SELECT') and 'operations_operation"' in q['sql']]
+        self.assertEqual(selects, [])
+        self.assertEqual(BranchStats.objects.get(branch=self.branch).active_customers, 1)
+
+    def test_moving_operation_moves_active_customers(self):
+        operation = self.create_operation(days=1)
+        self.add_customer(operation)
+        self.add_customer(operation, is_active=False)
+        other = Branch.objects.create(
+            company=self.company, name='Şube 2', email='sube2@testtur.com', phone='555', address='Adres'
+        )
+        operation = Operation.objects.get(pk=operation.pk)
+        operation.branch = other
+        operation.save()
+
+        self.assertEqual(BranchStats.objects.get(branch=self.branch).active_customers, 0)
+        self.assertEqual(BranchStats.objects.get(branch=other).active_customers, 1)
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.stats.active_customers, 1)
+
+    def test_bulk_import(self):
+        operation = self.create_operation(days=1)
+        staff = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='pass12345',
+            company=self.company, is_company_admin=True
+        )
+        client = APIClient()
+        client.force_authenticate(staff)
+        rows = [
+            {'operation': operation.pk, 'first_name': f'Ad {index}', 'last_name': 'Soyad',
+             'customer_type': 'ADULT', 'is_active': index != 0}
+            for index in range(5)
+        ]
+        response = client.post('/api/operations/customers/bulk/', rows, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 5)
+        operation.refresh_from_db()
+        self.assertEqual(operation.total_pax, 4)
+        self.assertEqual(client.get('/api/operations/customers/').status_code, 200)
+
+    def test_reconcile_command(self):
+        operation = self.create_operation(days=1)
+        self.add_customer(operation)
+        Operation.objects.filter(pk=operation.pk).update(total_pax=7)
+
+        call_command('reconcile_total_pax', '--dry-run', stdout=StringIO())
+        operation.refresh_from_db()
+        self.assertEqual(operation.total_pax, 7)
+
+        call_command('reconcile_total_pax', stdout=StringIO())
+        operation.refresh_from_db()
+        self.assertEqual(operation.total_pax, 1)
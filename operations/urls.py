@@ -24,6 +24,14 @@ urlpatterns = [
          OperationViewSet.as_view({'post': 'update_status'}),
          name='operation-update-status'),
          
+    path('operations/<int:pk>/reschedule/',
+         OperationViewSet.as_view({'post': 'reschedule'}),
+         name='operation-reschedule'),
+         
+    path('customers/bulk/',
+         OperationCustomerViewSet.as_view({'post': 'bulk'}),
+         name='customer-bulk'),
+         
     path('items/<int:pk>/calculate-cost/',
          OperationItemViewSet.as_view({'get': 'calculate_cost'}),
          name='item-calculate-cost'),
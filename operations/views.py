@@ -7,6 +7,8 @@ from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.utils import timezone
+from django.db import transaction
+from collections import Counter
 from .models import (
     Operation, OperationCustomer, OperationSalesPrice,
     OperationDay, OperationItem, OperationSubItem
@@ -15,28 +17,41 @@ from .serializers import (
     OperationListSerializer, OperationDetailSerializer,
     OperationCustomerSerializer, OperationSalesPriceSerializer,
     OperationDaySerializer, OperationItemSerializer,
-    OperationSubItemSerializer
+    OperationSubItemSerializer, OperationRescheduleSerializer
 )
+from core.tenant import TenantScopedMixin
+from companies.stats import record_created
+from .querysets import OPERATION_HEADER_RELATED, with_detail_tree
 
-class BaseOperationViewSet(viewsets.ModelViewSet):
+class BaseOperationViewSet(TenantScopedMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    operation_lookup = ''  # Alt modellerde operasyona giden yol, ör. 'operation__'
+
+    def scope_queryset(self, queryset, operation_lookup=''):
+        # Şirket yöneticisi şirketini, şube yöneticisi şubesini, diğerleri takip ettiklerini görür
+        return self.tenant.scope(
+            queryset,
+            company=f'{operation_lookup}company',
+            branch=f'{operation_lookup}branch',
+            owner=f'{operation_lookup}follow_by'
+        )
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return self.queryset
-        elif user.is_company_admin:
-            return self.queryset.filter(company=user.company)
-        elif user.is_branch_admin:
-            return self.queryset.filter(branch=user.branch)
-        return self.queryset.filter(follow_by=user)
+        return self.scope_queryset(self.queryset, self.operation_lookup)
 
 class OperationViewSet(BaseOperationViewSet):
     queryset = Operation.objects.all()
     filterset_fields = ['status', 'is_active', 'branch', 'buyer_company']
     search_fields = ['reference_number', 'buyer_company__name']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # Detay ağacı sabit sayıda sorguyla yüklenir
+            return with_detail_tree(queryset)
+        return queryset.select_related(*OPERATION_HEADER_RELATED)
+
     def get_serializer_class(self):
         if self.action == 'list':
             return OperationListSerializer
@@ -73,25 +88,90 @@ class OperationViewSet(BaseOperationViewSet):
         serializer = OperationDetailSerializer(operation)
         return Response(serializer.data)
 
+    @swagger_auto_schema(
+        operation_summary="Operasyon Tarihlerini Değiştir",
+        operation_description=(
+            "Operasyonun tarih aralığını değiştirir. Aralıkta kalan günler korunur, eksik günler "
+            "eklenir, aralık dışındakiler silinir. `shift_days` ile mevcut program başlangıç "
+            "farkı kadar kaydırılır."
+        ),
+        request_body=OperationRescheduleSerializer,
+        responses={
+            200: OperationDetailSerializer,
+            400: "Geçersiz tarih",
+            404: "Operasyon bulunamadı"
+        }
+    )
+    @action(detail=True, methods=['post'])
+    def reschedule(self, request, pk=None):
+        operation = self.get_object()
+        serializer = OperationRescheduleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        operation.start_date = serializer.validated_data['start_date']
+        operation.end_date = serializer.validated_data['end_date']
+        operation.save(shift_days=serializer.validated_data['shift_days'])
+        operation = with_detail_tree(Operation.objects.filter(pk=operation.pk)).get()
+        return Response(OperationDetailSerializer(operation).data)
+
 class OperationCustomerViewSet(BaseOperationViewSet):
     queryset = OperationCustomer.objects.all()
     serializer_class = OperationCustomerSerializer
+    operation_lookup = 'operation__'
     filterset_fields = ['operation', 'customer_type', 'is_active', 'is_buyer']
     search_fields = ['first_name', 'last_name', 'passport_no']
 
+    @swagger_auto_schema(
+        operation_summary="Toplu Müşteri Ekle",
+        operation_description=(
+            "Müşteri listesini tek seferde ekler. Kayıtlar bulk_create ile yazılır ve "
+            "her operasyonun total_pax değeri tek bir UPDATE ile artırılır."
+        ),
+        request_body=OperationCustomerSerializer(many=True),
+        responses={
+            201: OperationCustomerSerializer(many=True),
+            400: "Geçersiz veri",
+            404: "Operasyon bulunamadı"
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = OperationCustomerSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        operation_ids = {row['operation'].pk for row in serializer.validated_data}
+        visible = self.scope_queryset(Operation.objects.filter(pk__in=operation_ids))
+        if visible.count() != len(operation_ids):
+            return Response({"detail": "Operasyon bulunamadı."}, status=404)
+
+        customers = [OperationCustomer(**row) for row in serializer.validated_data]
+        deltas = Counter(customer.operation_id for customer in customers if customer.is_active)
+        with transaction.atomic():
+            OperationCustomer.objects.bulk_create(customers, batch_size=500)
+            Operation.adjust_total_pax(deltas)
+            record_created('customer', customers)
+
+        return Response(
+            OperationCustomerSerializer(customers, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
 class OperationSalesPriceViewSet(BaseOperationViewSet):
     queryset = OperationSalesPrice.objects.all()
     serializer_class = OperationSalesPriceSerializer
+    operation_lookup = 'operation__'
     filterset_fields = ['operation', 'currency', 'is_active']
 
 class OperationDayViewSet(BaseOperationViewSet):
     queryset = OperationDay.objects.all()
     serializer_class = OperationDaySerializer
+    operation_lookup = 'operation__'
     filterset_fields = ['operation', 'is_active']
 
 class OperationItemViewSet(BaseOperationViewSet):
     queryset = OperationItem.objects.all()
     serializer_class = OperationItemSerializer
+    operation_lookup = 'operation_day__operation__'
     filterset_fields = ['operation_day', 'item_type', 'is_active']
 
     @swagger_auto_schema(
@@ -123,6 +203,7 @@ class OperationItemViewSet(BaseOperationViewSet):
 class OperationSubItemViewSet(BaseOperationViewSet):
     queryset = OperationSubItem.objects.all()
     serializer_class = OperationSubItemSerializer
+    operation_lookup = 'operation_item__operation_day__operation__'
     filterset_fields = ['operation_item', 'subitem_type', 'is_active']
 
     @swagger_auto_schema(
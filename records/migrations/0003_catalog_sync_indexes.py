@@ -0,0 +1,85 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_alter_company_tax_number'),
+        ('records', '0002_alter_museum_city_alter_transfer_end_city_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_type', models.CharField(max_length=50, verbose_name='Record Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Object ID')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Deleted At')),
+            ],
+            options={
+                'verbose_name': 'Deleted Record',
+                'verbose_name_plural': 'Deleted Records',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['company', 'updated_at'], name='records_act_company_882b5e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitycost',
+            index=models.Index(fields=['company', 'updated_at'], name='records_act_company_e0a661_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitysupplier',
+            index=models.Index(fields=['company', 'updated_at'], name='records_act_company_2a6660_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='buyercompany',
+            index=models.Index(fields=['company', 'updated_at'], name='records_buy_company_1a72aa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guide',
+            index=models.Index(fields=['company', 'updated_at'], name='records_gui_company_779d30_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['company', 'updated_at'], name='records_hot_company_74b3c3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='museum',
+            index=models.Index(fields=['company', 'updated_at'], name='records_mus_company_c0b81b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='novehicletour',
+            index=models.Index(fields=['company', 'updated_at'], name='records_nov_company_fef6aa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['company', 'updated_at'], name='records_tou_company_71afc0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transfer',
+            index=models.Index(fields=['company', 'updated_at'], name='records_tra_company_8d0c7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclecost',
+            index=models.Index(fields=['company', 'updated_at'], name='records_veh_company_ae284c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclesupplier',
+            index=models.Index(fields=['company', 'updated_at'], name='records_veh_company_be1c8a_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedrecord',
+            name='company',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='companies.company', verbose_name='Company'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedrecord',
+            index=models.Index(fields=['company', 'deleted_at'], name='records_del_company_8c5438_idx'),
+        ),
+    ]
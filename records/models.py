@@ -3,6 +3,7 @@ from companies.models import Company, Currency, City
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from .pricing import price_index_for, invalidate_price_index, saves_price_history
 
 class VehicleType(models.Model):
     name = models.CharField(verbose_name="Vehicle Type", max_length=50)  # Binek, Minivan vs.
@@ -28,6 +29,9 @@ class BuyerCompany(models.Model):
 
     class Meta:
         verbose_name_plural = "Buyer Companies"
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
 
 class Tour(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
@@ -41,6 +45,11 @@ class Tour(models.Model):
     def __str__(self):
         return f"{self.name} ({self.start_city} - {self.end_city})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
 class NoVehicleTour(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
     name = models.CharField(verbose_name="Tour Name", max_length=255)
@@ -52,6 +61,11 @@ class NoVehicleTour(models.Model):
     def __str__(self):
         return f"{self.name} ({self.city})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
 class Transfer(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
     name = models.CharField(verbose_name="Transfer Name", max_length=255)
@@ -64,6 +78,11 @@ class Transfer(models.Model):
     def __str__(self):
         return f"{self.name} ({self.start_city} - {self.end_city})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
 class Hotel(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
     name = models.CharField(verbose_name="Hotel Name", max_length=255)
@@ -89,6 +108,7 @@ class Hotel(models.Model):
         if self.valid_until and self.valid_until < timezone.now().date():
             raise ValidationError("Geçerlilik tarihi geçmiş tarih olamaz")
 
+    @saves_price_history
     def save(self, *args, **kwargs):
         if not self.pk:
             super().save(*args, **kwargs)
@@ -122,14 +142,17 @@ class Hotel(models.Model):
                     double_price=self.double_price,
                     triple_price=self.triple_price
                 )
+                invalidate_price_index(self)
             
             super().save(*args, **kwargs)
 
     def get_price_for_date(self, target_date):
-        return self.price_history.filter(
-            valid_from__lte=target_date,
-            valid_until__gte=target_date
-        ).first()
+        return price_index_for(self).lookup(target_date)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
 
 class Museum(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
@@ -160,6 +183,7 @@ class Museum(models.Model):
         if self.valid_until and self.valid_until < timezone.now().date():
             raise ValidationError("Geçerlilik tarihi geçmiş tarih olamaz")
 
+    @saves_price_history
     def save(self, *args, **kwargs):
         if not self.pk:
             super().save(*args, **kwargs)
@@ -190,14 +214,17 @@ class Museum(models.Model):
                     local_price=self.local_price,
                     foreign_price=self.foreign_price
                 )
+                invalidate_price_index(self)
             
             super().save(*args, **kwargs)
 
     def get_price_for_date(self, target_date):
-        return self.price_history.filter(
-            valid_from__lte=target_date,
-            valid_until__gte=target_date
-        ).first()
+        return price_index_for(self).lookup(target_date)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
 
 class Activity(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
@@ -213,6 +240,9 @@ class Activity(models.Model):
     class Meta:
         verbose_name = "Activity"
         verbose_name_plural = "Activities"
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
 
     def clean(self):
         if self.valid_until and self.valid_until < timezone.now().date():
@@ -231,6 +261,11 @@ class Guide(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
 class VehicleSupplier(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
     name = models.CharField(verbose_name="Supplier Name", max_length=255)
@@ -242,6 +277,11 @@ class VehicleSupplier(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
 class ActivitySupplier(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
     name = models.CharField(verbose_name="Supplier Name", max_length=255)
@@ -253,6 +293,11 @@ class ActivitySupplier(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
 class VehicleCost(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
     supplier = models.ForeignKey(VehicleSupplier, verbose_name="Supplier", on_delete=models.CASCADE)
@@ -281,6 +326,7 @@ class VehicleCost(models.Model):
         if not self.tour and not self.transfer:
             raise ValidationError("Must select either tour or transfer")
 
+    @saves_price_history
     def save(self, *args, **kwargs):
         self.clean()
         if not self.pk:
@@ -321,6 +367,7 @@ class VehicleCost(models.Model):
                     midibus_cost=self.midibus_cost,
                     bus_cost=self.bus_cost
                 )
+                invalidate_price_index(self)
             
             super().save(*args, **kwargs)
 
@@ -328,11 +375,12 @@ class VehicleCost(models.Model):
         return f"{self.supplier.name} - {'Tour' if self.tour else 'Transfer'}"
 
     def get_price_for_date(self, target_date):
-        return self.price_history.filter(
-            valid_from__lte=target_date,
-            valid_until__gte=target_date,
-            is_active=True
-        ).first()
+        return price_index_for(self, active_only=True).lookup(target_date)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
 
 class ActivityCost(models.Model):
     company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE)
@@ -353,6 +401,7 @@ class ActivityCost(models.Model):
     def __str__(self):
         return f"{self.activity.name} - {self.supplier.name}"
 
+    @saves_price_history
     def save(self, *args, **kwargs):
         if not self.pk:
             super().save(*args, **kwargs)
@@ -380,15 +429,35 @@ class ActivityCost(models.Model):
                     valid_until=self.valid_until,
                     price=self.price
                 )
+                invalidate_price_index(self)
             
             super().save(*args, **kwargs)
 
     def get_price_for_date(self, target_date):
-        return self.price_history.filter(
-            valid_from__lte=target_date,
-            valid_until__gte=target_date,
-            is_active=True
-        ).first()
+        return price_index_for(self, active_only=True).lookup(target_date)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'updated_at']),
+        ]
+
+# Senkronizasyon için silinen kayıtların izi (tombstone)
+class DeletedRecord(models.Model):
+    # Şirket silinirken de yazılabildiği için veritabanı FK kısıtı yok
+    company = models.ForeignKey(Company, verbose_name="Company", on_delete=models.CASCADE, db_constraint=False)
+    record_type = models.CharField(verbose_name="Record Type", max_length=50)
+    object_id = models.PositiveBigIntegerField(verbose_name="Object ID")
+    deleted_at = models.DateTimeField(verbose_name="Deleted At", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.record_type} #{self.object_id}"
+
+    class Meta:
+        verbose_name = "Deleted Record"
+        verbose_name_plural = "Deleted Records"
+        indexes = [
+            models.Index(fields=['company', 'deleted_at']),
+        ]
 
 # Fiyat geçmişi için abstract base model
 class PriceHistoryBase(models.Model):
@@ -0,0 +1,135 @@
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+
+# get_price_for_date için fiyat aralığı indeksi.
+# Bir kaydın (Hotel, Museum, VehicleCost, ActivityCost) tüm fiyat geçmişi bir kez okunur,
+# çakışan aralıklar ayrık segmentlere çözülür ve tarih sorguları bisect ile O(log n) yanıtlanır.
+
+
+class PriceIntervalIndex:
+    """
+    Fiyat geçmişi satırlarından oluşturulan ayrık tarih segmentleri.
+    Aynı tarihi birden fazla satır kapsıyorsa `-valid_from` sıralamasındaki ilk satır
+    (eşitlikte en son oluşturulan) kazanır; bu, filtre + first() sorgusuyla aynı sonuçtur.
+    """
+
+    def __init__(self, rows, active_only=False):
+        rows = [row for row in rows if row.is_active or not active_only]
+        bounds = sorted(
+            {row.valid_from for row in rows} |
+            {row.valid_until + timedelta(days=1) for row in rows}
+        )
+        self.starts = []
+        self.segments = []
+        for start, next_start in zip(bounds, bounds[1:]):
+            end = next_start - timedelta(days=1)
+            covering = [row for row in rows if row.valid_from <= start and row.valid_until >= end]
+            if not covering:
+                continue
+            winner = max(covering, key=lambda row: (row.valid_from, row.pk or 0))
+            if self.segments and self.segments[-1][1] is winner and self.segments[-1][0] == start - timedelta(days=1):
+                # Aynı satırın ardışık segmentlerini birleştir
+                self.segments[-1] = (end, winner)
+                continue
+            self.starts.append(start)
+            self.segments.append((end, winner))
+
+    def lookup(self, target_date):
+        position = bisect.bisect_right(self.starts, target_date) - 1
+        if position < 0:
+            return None
+        end, row = self.segments[position]
+        return row if target_date <= end else None
+
+
+class _ProcessCache:
+    """İsteğe bağlı, süreç genelinde paylaşılan LRU indeks önbelleği."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+            return index
+
+    def set(self, key, index, max_entries):
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, label, pk):
+        with self._lock:
+            for active_only in (False, True):
+                self._entries.pop((label, pk, active_only), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+process_cache = _ProcessCache()
+
+
+def _config():
+    config = {'PROCESS_CACHE': False, 'MAX_ENTRIES': 10000}
+    config.update(getattr(settings, 'PRICE_INDEX', {}))
+    return config
+
+
+def price_index_for(owner, active_only=False):
+    """
+    Kaydın fiyat indeksini döndürür.
+    Öncelik sırası: örnek üzerindeki indeks, süreç önbelleği, prefetch edilmiş
+    `price_history` (liste sorgularında tek toplu sorgu), son olarak tek bir sorgu.
+    """
+    memo = owner.__dict__.setdefault('_price_indexes', {})
+    if active_only in memo:
+        return memo[active_only]
+
+    config = _config()
+    key = (owner._meta.label, owner.pk, active_only)
+    index = process_cache.get(key) if config['PROCESS_CACHE'] else None
+    if index is None:
+        if 'price_history' in getattr(owner, '_prefetched_objects_cache', {}):
+            rows = owner.price_history.all()
+        else:
+            rows = owner.price_history.select_related('currency')
+        index = PriceIntervalIndex(rows, active_only=active_only)
+        if config['PROCESS_CACHE']:
+            process_cache.set(key, index, config['MAX_ENTRIES'])
+
+    memo[active_only] = index
+    return index
+
+
+def invalidate_price_index(owner):
+    """Kaydın fiyat geçmişi değiştiğinde tüm indeks kopyalarını geçersiz kılar."""
+    owner.__dict__.pop('_price_indexes', None)
+    getattr(owner, '_prefetched_objects_cache', {}).pop('price_history', None)
+    process_cache.discard(owner._meta.label, owner.pk)
+
+
+def saves_price_history(save):
+    """
+    Geçmiş satırı yazan save() metodları için. Çağrı süresince kayıt `_saving_price_history`
+    taşır; geçmiş sinyali (records.signals) bu sırada sahibin updated_at'ini ayrıca güncellemez,
+    çünkü sahibin kendi kaydı zaten auto_now ile ilerletir.
+    """
+    @wraps(save)
+    def wrapper(self, *args, **kwargs):
+        self._saving_price_history = True
+        try:
+            return save(self, *args, **kwargs)
+        finally:
+            self._saving_price_history = False
+    return wrapper
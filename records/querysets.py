@@ -0,0 +1,94 @@
+from django.db.models import Prefetch
+from .models import (
+    HotelPriceHistory, MuseumPriceHistory,
+    VehicleCostHistory, ActivityCostHistory
+)
+
+# Serializer'ların iç içe okuduğu ilişkiler için select_related / prefetch_related planları.
+# Şehir ve para birimi gibi referans FK'lar JOIN edilmez; core.reference_cache'ten okunur.
+# Her fonksiyon (select_related, prefetch_related) listelerini döndürür; `prefix` verilirse
+# lookup'lar o ilişki yolunun altına taşınır (ör. 'days__items__vehicle_cost').
+
+
+def _join(prefix, field):
+    return f"{prefix}__{field}" if prefix else field
+
+
+def _price_history(prefix, history_model):
+    return Prefetch(
+        _join(prefix, 'price_history'),
+        queryset=history_model.objects.select_related('currency')
+    )
+
+
+def buyer_company_lookups(prefix=''):
+    return [_join(prefix, 'company')], []
+
+
+def tour_lookups(prefix=''):
+    return [_join(prefix, 'company')], []
+
+
+def transfer_lookups(prefix=''):
+    return [_join(prefix, 'company')], []
+
+
+def no_vehicle_tour_lookups(prefix=''):
+    return [_join(prefix, 'company')], []
+
+
+def hotel_lookups(prefix=''):
+    return [_join(prefix, 'company')], [_price_history(prefix, HotelPriceHistory)]
+
+
+def museum_lookups(prefix=''):
+    return [_join(prefix, 'company')], [_price_history(prefix, MuseumPriceHistory)]
+
+
+def city_list_lookups(prefix=''):
+    """Activity, Guide ve tedarikçiler: şirket + çoklu şehir."""
+    return [_join(prefix, 'company')], [_join(prefix, 'cities')]
+
+
+activity_lookups = city_list_lookups
+guide_lookups = city_list_lookups
+vehicle_supplier_lookups = city_list_lookups
+activity_supplier_lookups = city_list_lookups
+
+
+def vehicle_cost_lookups(prefix=''):
+    select = [_join(prefix, 'company')]
+    prefetch = [_price_history(prefix, VehicleCostHistory)]
+    for nested in (
+        vehicle_supplier_lookups(_join(prefix, 'supplier')),
+        tour_lookups(_join(prefix, 'tour')),
+        transfer_lookups(_join(prefix, 'transfer')),
+    ):
+        select += nested[0]
+        prefetch += nested[1]
+    return select, prefetch
+
+
+def activity_cost_lookups(prefix=''):
+    select = [_join(prefix, 'company')]
+    prefetch = [_price_history(prefix, ActivityCostHistory)]
+    for nested in (
+        activity_lookups(_join(prefix, 'activity')),
+        activity_supplier_lookups(_join(prefix, 'supplier')),
+    ):
+        select += nested[0]
+        prefetch += nested[1]
+    return select, prefetch
+
+
+def apply_lookups(queryset, *plans):
+    """Birden fazla planı tek bir queryset'e uygular."""
+    select, prefetch = [], []
+    for plan in plans:
+        select += plan[0]
+        prefetch += plan[1]
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
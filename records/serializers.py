@@ -8,8 +8,9 @@ from .models import (
 )
 from companies.serializers import CompanyBasicSerializer, CurrencySerializer, CitySerializer
 from django.utils import timezone
+from core.reference_cache import CachedReferenceMixin
 
-class VehicleTypeSerializer(serializers.ModelSerializer):
+class VehicleTypeSerializer(CachedReferenceMixin, serializers.ModelSerializer):
     class Meta:
         model = VehicleType
         fields = '__all__'
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from core.reference_cache import reference_cache
+from .models import (
+    Hotel, Museum, VehicleCost, ActivityCost,
+    HotelPriceHistory, MuseumPriceHistory,
+    VehicleCostHistory, ActivityCostHistory, DeletedRecord, VehicleType
+)
+from .pricing import process_cache
+from .sync import SYNC_RECORD_TYPES
+
+# Fiyat geçmişi doğrudan (ör. *-price-history endpoint'leri) değiştirildiğinde
+# süreç önbelleğindeki indeksi düşür ve sahibin updated_at'ini ilerlet; current_price
+# değiştiği için liste ETag'leri ve delta senkronizasyonu sahibi değişmiş görmeli.
+# Satırı sahibin kendi save()'i yazıyorsa (saves_price_history) ek UPDATE yapılmaz.
+HISTORY_OWNERS = {
+    HotelPriceHistory: (Hotel, 'hotel'),
+    MuseumPriceHistory: (Museum, 'museum'),
+    VehicleCostHistory: (VehicleCost, 'vehicle_cost'),
+    ActivityCostHistory: (ActivityCost, 'activity_cost'),
+}
+
+
+def on_price_history_change(sender, instance, **kwargs):
+    owner_model, owner_field = HISTORY_OWNERS[sender]
+    owner_id = getattr(instance, sender._meta.get_field(owner_field).attname)
+    process_cache.discard(owner_model._meta.label, owner_id)
+    owner = instance._state.fields_cache.get(owner_field)
+    if getattr(owner, '_saving_price_history', False):
+        return
+    # update() sinyal göndermez; sahibin kendi kaydı (ve AuditLog) tetiklenmez
+    owner_model.objects.filter(pk=owner_id).update(updated_at=timezone.now())
+
+
+for history_model in HISTORY_OWNERS:
+    post_save.connect(on_price_history_change, sender=history_model)
+    post_delete.connect(on_price_history_change, sender=history_model)
+
+
+# Silinen katalog kayıtları delta senkronizasyonu için tombstone bırakır
+def record_deletion(sender, instance, **kwargs):
+    DeletedRecord.objects.create(
+        company_id=instance.company_id,
+        record_type=SYNC_RECORD_TYPES[sender],
+        object_id=instance.pk
+    )
+
+
+for catalog_model in SYNC_RECORD_TYPES:
+    post_delete.connect(record_deletion, sender=catalog_model)
+
+
+reference_cache.register(VehicleType)
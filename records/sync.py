@@ -0,0 +1,158 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import (
+    BuyerCompany, Tour, NoVehicleTour, Transfer, Hotel, Museum, Activity,
+    Guide, VehicleSupplier, ActivitySupplier, VehicleCost, ActivityCost,
+    DeletedRecord
+)
+from .querysets import (
+    apply_lookups, buyer_company_lookups, tour_lookups, transfer_lookups, no_vehicle_tour_lookups,
+    hotel_lookups, museum_lookups, activity_lookups, guide_lookups,
+    vehicle_supplier_lookups, activity_supplier_lookups,
+    vehicle_cost_lookups, activity_cost_lookups
+)
+from .serializers import (
+    BuyerCompanySerializer, TourSerializer, NoVehicleTourSerializer,
+    TransferSerializer, HotelSerializer, MuseumSerializer, ActivitySerializer,
+    GuideSerializer, VehicleSupplierSerializer, ActivitySupplierSerializer,
+    VehicleCostSerializer, ActivityCostSerializer
+)
+
+# Delta senkronizasyonuna dahil katalog tipleri: anahtar -> (model, serializer, lookup planı)
+# Anahtarlar records URL önekleriyle aynıdır.
+SYNC_SOURCES = {
+    'buyer-companies': (BuyerCompany, BuyerCompanySerializer, buyer_company_lookups),
+    'tours': (Tour, TourSerializer, tour_lookups),
+    'no-vehicle-tours': (NoVehicleTour, NoVehicleTourSerializer, no_vehicle_tour_lookups),
+    'transfers': (Transfer, TransferSerializer, transfer_lookups),
+    'hotels': (Hotel, HotelSerializer, hotel_lookups),
+    'museums': (Museum, MuseumSerializer, museum_lookups),
+    'activities': (Activity, ActivitySerializer, activity_lookups),
+    'guides': (Guide, GuideSerializer, guide_lookups),
+    'vehicle-suppliers': (VehicleSupplier, VehicleSupplierSerializer, vehicle_supplier_lookups),
+    'activity-suppliers': (ActivitySupplier, ActivitySupplierSerializer, activity_supplier_lookups),
+    'vehicle-costs': (VehicleCost, VehicleCostSerializer, vehicle_cost_lookups),
+    'activity-costs': (ActivityCost, ActivityCostSerializer, activity_cost_lookups),
+}
+
+SYNC_RECORD_TYPES = {model: key for key, (model, _, _) in SYNC_SOURCES.items()}
+
+# Watermark'tan hemen önce başlayıp sonra commit edilen işlemleri kaçırmamak için
+# yeni watermark biraz geriye çekilir; istemci tekrar gelen satırları upsert eder.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Sayfalı yanıtlarda DeletedRecord konumunun cursor'daki anahtarı
+DELETED_KEY = 'deleted'
+CURSOR_SALT = 'records.sync.cursor'
+
+
+def _config():
+    return {
+        # Tip başına yanıttaki en fazla kayıt; fazlası cursor ile sonraki sayfalarda gelir
+        'PAGE_SIZE': 1000,
+        **getattr(settings, 'CATALOG_SYNC', {}),
+    }
+
+
+def empty_changes():
+    """Hiçbir kayda erişimi olmayan kullanıcılar için boş yanıt (ör. şirketsiz kullanıcı)."""
+    return {
+        'watermark': (timezone.now() - SYNC_OVERLAP).isoformat(),
+        'changes': {key: [] for key in SYNC_SOURCES},
+        'tombstones': {key: [] for key in SYNC_SOURCES},
+        'has_more': False,
+        'cursor': None,
+    }
+
+
+def read_cursor(token):
+    """İstemcinin geri gönderdiği cursor; imzası bozuksa ValueError."""
+    try:
+        return signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature as error:
+        raise ValueError("Geçersiz cursor") from error
+
+
+def _page(queryset, field, position, size):
+    """
+    (field, pk) sırasıyla `position`dan sonraki en fazla `size` kayıt ve devam konumu.
+    Konum son kaydın [field değeri, pk] çiftidir; kayıt kalmadıysa None.
+    """
+    queryset = queryset.order_by(field, 'pk')
+    if position is not None:
+        moment, pk = parse_datetime(position[0]), position[1]
+        queryset = queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk}))
+    rows = list(queryset[:size + 1])
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, [getattr(rows[-1], field).isoformat(), rows[-1].pk]
+
+
+def collect_changes(company_id=None, since=None, cursor=None):
+    """
+    `since` sonrasında değişen kayıtları ve tombstone'ları döndürür.
+    company_id None ise (süper kullanıcı) tüm şirketler dahildir.
+    Her tip için (company, updated_at) indeksinden (updated_at, pk) sırasıyla en fazla PAGE_SIZE
+    kayıt okunur. Kalan kayıt varsa `has_more` True olur ve istemci `cursor` ile devam eder;
+    cursor ilk sayfanın since/watermark değerlerini ve bitmemiş tiplerin son (updated_at, pk)
+    konumunu taşır. Watermark yalnızca has_more False olduğunda saklanmalıdır.
+    """
+    size = _config()['PAGE_SIZE']
+    if cursor is None:
+        watermark = (timezone.now() - SYNC_OVERLAP).isoformat()
+        positions = {key: None for key in SYNC_SOURCES}
+        if since is not None:
+            positions[DELETED_KEY] = None
+    else:
+        watermark = cursor['watermark']
+        since = parse_datetime(cursor['since']) if cursor['since'] else None
+        positions = cursor['positions']
+
+    changes = {key: [] for key in SYNC_SOURCES}
+    tombstones = {key: [] for key in SYNC_SOURCES}
+    remaining = {}
+
+    for key, (model, serializer_class, lookups) in SYNC_SOURCES.items():
+        if key not in positions:
+            continue
+        queryset = apply_lookups(model.objects.all(), lookups())
+        if company_id is not None:
+            queryset = queryset.filter(company_id=company_id)
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        else:
+            # İlk senkronizasyonda pasif kayıtların istemcide karşılığı yoktur
+            queryset = queryset.filter(is_active=True)
+
+        rows, remaining[key] = _page(queryset, 'updated_at', positions[key], size)
+        active, inactive = [], []
+        for instance in rows:
+            (active if instance.is_active else inactive).append(instance)
+        changes[key] = serializer_class(active, many=True).data
+        tombstones[key] = [instance.pk for instance in inactive]
+
+    if DELETED_KEY in positions:
+        deleted = DeletedRecord.objects.filter(deleted_at__gte=since).only('record_type', 'object_id', 'deleted_at')
+        if company_id is not None:
+            deleted = deleted.filter(company_id=company_id)
+        rows, remaining[DELETED_KEY] = _page(deleted, 'deleted_at', positions[DELETED_KEY], size)
+        for record in rows:
+            tombstones.setdefault(record.record_type, []).append(record.object_id)
+
+    remaining = {key: position for key, position in remaining.items() if position is not None}
+    return {
+        'watermark': watermark,
+        'changes': changes,
+        'tombstones': tombstones,
+        'has_more': bool(remaining),
+        'cursor': signing.dumps({
+            'since': since.isoformat() if since is not None else None,
+            'watermark': watermark,
+            'positions': remaining,
+        }, salt=CURSOR_SALT, compress=True) if remaining else None,
+    }
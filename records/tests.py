@@ -1,3 +1,299 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from companies import audit
+from companies.models import AuditLog, Company, City, Currency
+from .models import Guide, Hotel, HotelPriceHistory
 
-# Create your tests here.
+
+class RecordsTestMixin:
+    """Kayıt testleri için ortak veri kurulumu."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.currency = Currency.objects.create(code='EUR', name='Euro', symbol='€')
+        cls.city = City.objects.create(name='İstanbul', code='IST')
+        cls.company = Company.objects.create(
+            name='Test Tur', tax_number='1234567890', address='Adres', phone='555',
+            email='info@testtur.com', tenant_id=uuid.uuid4()
+        )
+        cls.user = CustomUser.objects.create_user(
+            username='personel', email='personel@testtur.com', password='pass12345',
+            company=cls.company
+        )
+
+    def create_hotel(self, name='Otel', price=100):
+        return Hotel.objects.create(
+            company=self.company, name=name, city=self.city, single_price=price,
+            double_price=price, triple_price=price, currency=self.currency,
+            valid_until=timezone.now().date() + timedelta(days=365)
+        )
+
+
+class PriceIndexTests(RecordsTestMixin, TestCase):
+
+    def test_latest_overlapping_interval_wins(self):
+        hotel = self.create_hotel()
+        today = timezone.now().date()
+        HotelPriceHistory.objects.create(
+            hotel=hotel, currency=self.currency, valid_from=today - timedelta(days=100),
+            valid_until=today + timedelta(days=100), single_price=1, double_price=1, triple_price=1
+        )
+        hotel = Hotel.objects.get(pk=hotel.pk)
+
+        self.assertEqual(hotel.get_price_for_date(today).single_price, Decimal('100'))
+        self.assertEqual(hotel.get_price_for_date(today - timedelta(days=10)).single_price, Decimal('1'))
+        self.assertIsNone(hotel.get_price_for_date(today - timedelta(days=200)))
+
+    def test_save_invalidates_index(self):
+        hotel = self.create_hotel()
+        today = timezone.now().date()
+        self.assertEqual(hotel.get_price_for_date(today).single_price, Decimal('100'))
+
+        hotel.single_price = 150
+        hotel.save()
+
+        self.assertEqual(hotel.get_price_for_date(today).single_price, Decimal('150'))
+
+    def test_hotel_list_query_count_is_constant(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for index in range(2):
+            self.create_hotel(name=f'Otel {index}')
+        client.get('/api/records/hotels/')  # referans önbelleğini ısıt
+        with CaptureQueriesContext(connection) as small:
+            client.get('/api/records/hotels/')
+
+        for index in range(2, 12):
+            self.create_hotel(name=f'Otel {index}')
+        with CaptureQueriesContext(connection) as large:
+            response = client.get('/api/records/hotels/')
+
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(response.data[0]['current_price']['currency'], 'EUR')
+
+
+class ListModeTests(RecordsTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for index in range(5):
+            self.create_hotel(name=f'Otel {index}')
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/records/hotels/')
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 5)
+
+    def test_cursor_pagination_walks_all_rows(self):
+        seen = []
+        url = '/api/records/hotels/?page_size=2&order_by=updated_at'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, list(Hotel.objects.order_by('updated_at', 'id').values_list('id', flat=True)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/records/hotels/?cursor=bozuk')
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream_matches_plain_list(self):
+        plain = self.client.get('/api/records/hotels/').json()
+        response = self.client.get('/api/records/hotels/?stream=1')
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, plain)
+
+
+class CatalogSyncTests(RecordsTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_delta_with_tombstones(self):
+        kept = self.create_hotel(name='Kalan')
+        deactivated = self.create_hotel(name='Pasif')
+        deleted = self.create_hotel(name='Silinen')
+
+        initial = self.client.get('/api/records/sync/').data
+        self.assertEqual(len(initial['changes']['hotels']), 3)
+
+        since = timezone.now()
+        deactivated.is_active = False
+        deactivated.save()
+        deleted_id = deleted.pk
+        deleted.delete()
+
+        response = self.client.get('/api/records/sync/', {'since': since.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changes']['hotels'], [])
+        self.assertCountEqual(response.data['tombstones']['hotels'], [deactivated.pk, deleted_id])
+        self.assertNotIn(kept.pk, response.data['tombstones']['hotels'])
+        self.assertIn('watermark', response.data)
+
+    @override_settings(CATALOG_SYNC={'PAGE_SIZE': 2})
+    def test_pages_continue_with_cursor(self):
+        hotels = [self.create_hotel(name=f'Otel {index}') for index in range(5)]
+        # Aynı updated_at değerini paylaşan kayıtlar pk ile sıralanır
+        Hotel.objects.filter(pk__in=[hotel.pk for hotel in hotels[1:4]]).update(updated_at=hotels[1].updated_at)
+
+        first = self.client.get('/api/records/sync/').data
+        received = [row['id'] for row in first['changes']['hotels']]
+        cursor = first['cursor']
+        while cursor:
+            page = self.client.get('/api/records/sync/', {'cursor': cursor}).data
+            self.assertEqual(page['watermark'], first['watermark'])
+            received += [row['id'] for row in page['changes']['hotels']]
+            cursor = page['cursor']
+        self.assertTrue(first['has_more'])
+        self.assertFalse(page['has_more'])
+        self.assertEqual(received, [hotel.pk for hotel in hotels])
+
+        response = self.client.get('/api/records/sync/', {'cursor': 'bozuk'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_watermark(self):
+        response = self.client.get('/api/records/sync/', {'since': 'dün'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/records/sync/', {'since': '2024-02-30T00:00:00'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_without_company_sees_nothing(self):
+        self.create_hotel()
+        loner = CustomUser.objects.create_user(username='sirketsiz', email='sirketsiz@test.com', password='pass12345')
+        self.client.force_authenticate(loner)
+
+        response = self.client.get('/api/records/sync/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changes']['hotels'], [])
+
+
+class ConditionalListTests(RecordsTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.hotel = self.create_hotel()
+
+    def test_not_modified_until_change(self):
+        etag = self.client.get('/api/records/hotels/')['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/records/hotels/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 1)
+
+        self.hotel.name = 'Yeni Otel'
+        self.hotel.save()
+        response = self.client.get('/api/records/hotels/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_price_history_and_references_change_etag(self):
+        etag = self.client.get('/api/records/hotels/')['ETag']
+        history = self.hotel.price_history.get()
+        history.single_price = 120
+        history.save()
+        changed = self.client.get('/api/records/hotels/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+
+        etag = changed['ETag']
+        self.city.name = 'İzmir'
+        self.city.save()
+        self.assertEqual(self.client.get('/api/records/hotels/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_owner_save_does_not_bump_itself_again(self):
+        self.hotel.single_price = 150
+        with CaptureQueriesContext(connection) as context:
+            self.hotel.save()
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "records_hotel"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_query_params_change_etag(self):
+        plain = self.client.get('/api/records/hotels/')['ETag']
+        searched = self.client.get('/api/records/hotels/', {'search': 'Otel'})['ETag']
+        self.assertNotEqual(plain, searched)
+
+
+@override_settings(AUDIT={'ASYNC': False, 'FLUSH_INTERVAL': 3600, 'MAX_PENDING': 1000})
+class AuditLogTests(RecordsTestMixin, TestCase):
+
+    def setUp(self):
+        audit.audit_writer.discard()
+
+    def capture(self, func):
+        with self.captureOnCommitCallbacks(execute=True), audit.request_queue():
+            func()
+        audit.audit_writer.flush()
+
+    def test_field_level_diffs(self):
+        guide = Guide.objects.create(company=self.company, name='Ayşe', phone='555', document_no='A1')
+        guide = Guide.objects.get(pk=guide.pk)
+
+        def edit():
+            guide.phone = '556'
+            guide.save()
+            guide.save()
+
+        self.capture(edit)
+        log = AuditLog.objects.get()
+        self.assertEqual((log.action, log.model_name, log.object_id), ('update', 'records.Guide', str(guide.pk)))
+        self.assertEqual(log.changes, {'phone': ['555', '556']})
+        self.assertEqual((log.company_id, log.object_repr, log.ip_address), (self.company.pk, 'Ayşe', '127.0.0.1'))
+
+    def test_nested_records_resolve_company_from_queue(self):
+        hotel = None
+
+        def create():
+            nonlocal hotel
+            hotel = self.create_hotel()
+
+        self.capture(create)
+        self.capture(lambda: Hotel.objects.get(pk=hotel.pk).delete())
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list('model_name', 'action', 'company_id')),
+            [
+                ('records.Hotel', 'create', self.company.pk),
+                ('records.Hotel', 'delete', self.company.pk),
+                ('records.HotelPriceHistory', 'create', self.company.pk),
+                ('records.HotelPriceHistory', 'delete', self.company.pk),
+            ]
+        )
+        self.assertEqual(AuditLog.objects.get(model_name='records.Hotel', action='create').changes['single_price'],
+                         [None, 100])
+
+    def test_rollback_and_opt_out_are_not_logged(self):
+        def work():
+            with transaction.atomic():
+                Guide.objects.create(company=self.company, name='Geri', phone='1', document_no='X')
+                transaction.set_rollback(True)
+            with audit.disabled():
+                Guide.objects.create(company=self.company, name='Toplu', phone='1', document_no='Y')
+
+        self.capture(work)
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_login_is_logged_at_request_end(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(
+                '/api/accounts/token/', {'username': 'personel@testtur.com', 'password': 'pass12345'},
+                format='json', headers={'User-Agent': 'tarayici'}
+            )
+        self.assertEqual(response.status_code, 200)
+        audit.audit_writer.flush()
+        log = AuditLog.objects.get()
+        self.assertEqual((log.action, log.user_id, log.user_agent), ('login', self.user.pk, 'tarayici'))
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
@@ -7,7 +7,8 @@ from .views import (
     GuideViewSet, VehicleSupplierViewSet, ActivitySupplierViewSet,
     VehicleCostViewSet, ActivityCostViewSet,
     HotelPriceHistoryViewSet, MuseumPriceHistoryViewSet,
-    VehicleCostHistoryViewSet, ActivityCostHistoryViewSet
+    VehicleCostHistoryViewSet, ActivityCostHistoryViewSet,
+    CatalogSyncView
 )
 
 app_name = 'records'
@@ -37,6 +38,8 @@ router.register(r'activity-cost-history', ActivityCostHistoryViewSet)
 
 urlpatterns = [
     # Özel endpoint'ler buraya eklenebilir
+    path('sync/', CatalogSyncView.as_view(), name='catalog-sync'),
+
     path('hotels/<int:pk>/price-history/',
          HotelViewSet.as_view({'get': 'price_history'}),
          name='hotel-price-history'),
@@ -3,12 +3,18 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from companies.models import City
 from companies.serializers import CitySerializer
+from core.conditional import ConditionalListMixin
+from core.pagination import KeysetPagination
+from core.streaming import StreamingListMixin
+from core.tenant import TenantContext, TenantScopedMixin
 from .models import (
     VehicleType, BuyerCompany, Tour, NoVehicleTour,
     Transfer, Hotel, Museum, Activity, Guide,
@@ -25,20 +31,34 @@ from .serializers import (
     HotelPriceHistorySerializer, MuseumPriceHistorySerializer,
     VehicleCostHistorySerializer, ActivityCostHistorySerializer
 )
+from .querysets import (
+    apply_lookups, buyer_company_lookups, tour_lookups, transfer_lookups, no_vehicle_tour_lookups,
+    hotel_lookups, museum_lookups, activity_lookups, guide_lookups,
+    vehicle_supplier_lookups, activity_supplier_lookups,
+    vehicle_cost_lookups, activity_cost_lookups
+)
+from .sync import collect_changes, empty_changes, read_cursor
 
-class BaseCompanyViewSet(viewsets.ModelViewSet):
+class BaseCompanyViewSet(TenantScopedMixin, ConditionalListMixin, StreamingListMixin, viewsets.ModelViewSet):
     """
     Temel şirket ViewSet'i.
     Tüm ViewSet'ler için ortak özellikleri içerir.
+
+    Listeler varsayılan olarak sayfalanmamış dizi döner; `cursor`/`page_size` ile
+    keyset sayfalama, `stream=1` ile akış yanıtı istenebilir. Liste yanıtları ETag taşır,
+    `If-None-Match` eşleşirse 304 döner.
     """
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    pagination_class = None  # Sayfalama kapatıldı
+    pagination_class = KeysetPagination  # İsteğe bağlı; parametre yoksa sayfalama yapılmaz
+    eager_lookups = None  # records.querysets planı; fiyat geçmişi dahil ilişkileri toplu yükler
+    etag_include_date = True  # current_price güne bağlı
+
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return self.queryset
-        return self.queryset.filter(company=user.company)
+        queryset = self.queryset
+        if self.eager_lookups is not None:
+            queryset = apply_lookups(queryset, self.eager_lookups())
+        return self.tenant.scope(queryset)
 
     @swagger_auto_schema(
         operation_summary="Liste",
@@ -121,13 +141,14 @@ class VehicleTypeViewSet(BaseCompanyViewSet):
     serializer_class = VehicleTypeSerializer
     search_fields = ['name']
     filterset_fields = ['is_active']
-    pagination_class = None  # Sayfalama kapatıldı
+
 class BuyerCompanyViewSet(BaseCompanyViewSet):
     """
     Alıcı şirketler için API endpoint'leri.
     """
     queryset = BuyerCompany.objects.all()
     serializer_class = BuyerCompanySerializer
+    eager_lookups = staticmethod(buyer_company_lookups)
     search_fields = ['name', 'short_name', 'contact']
     filterset_fields = ['is_active']
 
@@ -137,9 +158,9 @@ class TourViewSet(BaseCompanyViewSet):
     """
     queryset = Tour.objects.all()
     serializer_class = TourSerializer
+    eager_lookups = staticmethod(tour_lookups)
     search_fields = ['name', 'start_city__name', 'end_city__name']
     filterset_fields = ['start_city', 'end_city', 'is_active']
-    pagination_class = None  # Sayfalama kapatıldı
 
 
 class NoVehicleTourViewSet(BaseCompanyViewSet):
@@ -148,9 +169,9 @@ class NoVehicleTourViewSet(BaseCompanyViewSet):
     """
     queryset = NoVehicleTour.objects.all()
     serializer_class = NoVehicleTourSerializer
+    eager_lookups = staticmethod(no_vehicle_tour_lookups)
     search_fields = ['name', 'city__name']
     filterset_fields = ['city', 'is_active']
-    pagination_class = None  # Sayfalama kapatıldı
 
 
 class TransferViewSet(BaseCompanyViewSet):
@@ -159,9 +180,9 @@ class TransferViewSet(BaseCompanyViewSet):
     """
     queryset = Transfer.objects.all()
     serializer_class = TransferSerializer
+    eager_lookups = staticmethod(transfer_lookups)
     search_fields = ['name', 'start_city__name', 'end_city__name']
     filterset_fields = ['start_city', 'end_city', 'is_active']
-    pagination_class = None
 
 class HotelViewSet(BaseCompanyViewSet):
     """
@@ -169,9 +190,9 @@ class HotelViewSet(BaseCompanyViewSet):
     """
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
+    eager_lookups = staticmethod(hotel_lookups)
     search_fields = ['name', 'city__name']
     filterset_fields = ['city', 'is_active']
-    pagination_class = None
 
     @swagger_auto_schema(
         operation_summary="Fiyat Geçmişi",
@@ -195,9 +216,9 @@ class MuseumViewSet(BaseCompanyViewSet):
     """
     queryset = Museum.objects.all()
     serializer_class = MuseumSerializer
+    eager_lookups = staticmethod(museum_lookups)
     search_fields = ['name', 'city__name']
     filterset_fields = ['city', 'is_active']
-    pagination_class = None
 
     @swagger_auto_schema(
         operation_summary="Fiyat Geçmişi",
@@ -221,9 +242,9 @@ class ActivityViewSet(BaseCompanyViewSet):
     """
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
+    eager_lookups = staticmethod(activity_lookups)
     search_fields = ['name']
     filterset_fields = ['cities', 'is_active']
-    pagination_class = None
 
 class GuideViewSet(BaseCompanyViewSet):
     """
@@ -231,9 +252,9 @@ class GuideViewSet(BaseCompanyViewSet):
     """
     queryset = Guide.objects.all()
     serializer_class = GuideSerializer
+    eager_lookups = staticmethod(guide_lookups)
     search_fields = ['name', 'phone', 'document_no']
     filterset_fields = ['cities', 'is_active']
-    pagination_class = None
 
 class VehicleSupplierViewSet(BaseCompanyViewSet):
     """
@@ -241,9 +262,9 @@ class VehicleSupplierViewSet(BaseCompanyViewSet):
     """
     queryset = VehicleSupplier.objects.all()
     serializer_class = VehicleSupplierSerializer
+    eager_lookups = staticmethod(vehicle_supplier_lookups)
     search_fields = ['name']
     filterset_fields = ['cities', 'is_active']
-    pagination_class = None
 
 class ActivitySupplierViewSet(BaseCompanyViewSet):
     """
@@ -251,9 +272,9 @@ class ActivitySupplierViewSet(BaseCompanyViewSet):
     """
     queryset = ActivitySupplier.objects.all()
     serializer_class = ActivitySupplierSerializer
+    eager_lookups = staticmethod(activity_supplier_lookups)
     search_fields = ['name']
     filterset_fields = ['cities', 'is_active']
-    pagination_class = None
 
 class VehicleCostViewSet(BaseCompanyViewSet):
     """
@@ -261,9 +282,9 @@ class VehicleCostViewSet(BaseCompanyViewSet):
     """
     queryset = VehicleCost.objects.all()
     serializer_class = VehicleCostSerializer
+    eager_lookups = staticmethod(vehicle_cost_lookups)
     search_fields = ['supplier__name']
     filterset_fields = ['supplier', 'tour', 'transfer', 'is_active']
-    pagination_class = None
 
     @swagger_auto_schema(
         operation_summary="Fiyat Geçmişi",
@@ -321,9 +342,9 @@ class ActivityCostViewSet(BaseCompanyViewSet):
     """
     queryset = ActivityCost.objects.all()
     serializer_class = ActivityCostSerializer
+    eager_lookups = staticmethod(activity_cost_lookups)
     search_fields = ['activity__name', 'supplier__name']
     filterset_fields = ['activity', 'supplier', 'is_active']
-    pagination_class = None
 
     @swagger_auto_schema(
         operation_summary="Fiyat Geçmişi",
@@ -382,7 +403,6 @@ class HotelPriceHistoryViewSet(BaseCompanyViewSet):
     queryset = HotelPriceHistory.objects.all()
     serializer_class = HotelPriceHistorySerializer
     filterset_fields = ['hotel', 'currency', 'is_active']
-    pagination_class = None
 
 class MuseumPriceHistoryViewSet(BaseCompanyViewSet):
     """
@@ -391,7 +411,6 @@ class MuseumPriceHistoryViewSet(BaseCompanyViewSet):
     queryset = MuseumPriceHistory.objects.all()
     serializer_class = MuseumPriceHistorySerializer
     filterset_fields = ['museum', 'currency', 'is_active']
-    pagination_class = None
 
 class VehicleCostHistoryViewSet(BaseCompanyViewSet):
     """
@@ -400,7 +419,6 @@ class VehicleCostHistoryViewSet(BaseCompanyViewSet):
     queryset = VehicleCostHistory.objects.all()
     serializer_class = VehicleCostHistorySerializer
     filterset_fields = ['vehicle_cost', 'currency', 'is_active']
-    pagination_class = None
 
 class ActivityCostHistoryViewSet(BaseCompanyViewSet):
     """
@@ -409,4 +427,75 @@ class ActivityCostHistoryViewSet(BaseCompanyViewSet):
     queryset = ActivityCostHistory.objects.all()
     serializer_class = ActivityCostHistorySerializer
     filterset_fields = ['activity_cost', 'currency', 'is_active']
-    pagination_class = None
+
+class CatalogSyncView(APIView):
+    """
+    Katalog kayıtları için delta senkronizasyon endpoint'i.
+    `since` watermark'ından sonra değişen kayıt tiplerini döndürür; tip başına kayıt sayısı
+    sınırlıdır, kalan kayıtlar `has_more` ve `cursor` ile sonraki isteklerde gelir.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Delta Senkronizasyon",
+        operation_description=(
+            "Watermark sonrasında değişen katalog kayıtlarını, pasifleştirilen veya silinen "
+            "kayıtlar için tombstone'ları ve yeni watermark'ı döndürür. `since` verilmezse "
+            "tüm aktif kayıtlar döner. Her tipten en fazla CATALOG_SYNC['PAGE_SIZE'] kayıt gelir; "
+            "`has_more` True ise yanıttaki `cursor` ile tekrar istenir ve watermark ancak "
+            "`has_more` False olduğunda saklanır."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'since',
+                openapi.IN_QUERY,
+                description="Önceki yanıttaki watermark (ISO 8601)",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATETIME,
+                required=False
+            ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description="Önceki yanıttaki cursor (has_more True iken); verilirse since yok sayılır",
+                type=openapi.TYPE_STRING,
+                required=False
+            )
+        ],
+        responses={
+            200: openapi.Response('Başarılı'),
+            400: 'Geçersiz watermark veya cursor',
+            401: 'Yetkilendirme hatası'
+        }
+    )
+    def get(self, request):
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                cursor = read_cursor(cursor)
+            except ValueError:
+                return Response({"detail": "Geçersiz cursor."}, status=400)
+        else:
+            cursor = None
+
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                # Biçimi doğru ama geçersiz tarihler (ör. 2024-02-30)
+                since = None
+            if since is None:
+                return Response({"detail": "Geçersiz watermark. ISO 8601 kullanın."}, status=400)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        else:
+            since = None
+
+        tenant = TenantContext.for_request(request)
+        if tenant.is_superuser:
+            return Response(collect_changes(since=since, cursor=cursor))
+        # company_id None, collect_changes için "tüm şirketler" demektir
+        if tenant.company_id is None:
+            return Response(empty_changes())
+        return Response(collect_changes(company_id=tenant.company_id, since=since, cursor=cursor))